@@ -0,0 +1,70 @@
+"""
+Compare the conversions of non-integer primary keys to Faker data offsets (SCRUBBER_PK_OFFSET_HASH) on the configured
+database, for UUID and char primary keys:
+
+    python -m benchmarks.pk_offsets [rows]
+
+Runs in a test database, which is destroyed afterwards. Reports the offsets computed per second and how evenly rows
+are spread across offsets (the size of the largest offset group relative to the average one, 1.00 being perfect).
+"""
+
+import os
+import sys
+import time
+import uuid
+
+import django
+
+
+def main(rows=100_000):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "example.settings")
+    django.setup()
+
+    from django.db import connection, models  # noqa: PLC0415
+
+    from django_scrubber import settings_with_fallback  # noqa: PLC0415
+    from django_scrubber.management.commands.scrub_data import PK_OFFSET_HASHES, _rows_per_second  # noqa: PLC0415
+
+    class UUIDRow(models.Model):  # noqa: DJ008
+        id = models.UUIDField(primary_key=True)
+
+        class Meta:
+            app_label = "benchmarks"
+
+    class CharRow(models.Model):  # noqa: DJ008
+        id = models.CharField(max_length=40, primary_key=True)
+
+        class Meta:
+            app_label = "benchmarks"
+
+    entries = settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")
+    test_database_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(UUIDRow)
+            schema_editor.create_model(CharRow)
+        UUIDRow.objects.bulk_create(UUIDRow(id=uuid.uuid4()) for _ in range(rows))
+        CharRow.objects.bulk_create(CharRow(id=uuid.uuid4().hex + "0" * 8) for _ in range(rows))
+
+        sys.stdout.write(f"{connection.vendor}, {rows} rows, {entries} offsets\n")
+        for model in (UUIDRow, CharRow):
+            for name, pk_to_int in PK_OFFSET_HASHES.items():
+                queryset = model.objects.annotate(offset=pk_to_int(models.F("pk")) % entries)
+                durations = []
+                for _ in range(3):
+                    started = time.perf_counter()
+                    groups = list(
+                        queryset.values("offset").annotate(rows=models.Count("pk")).values_list("rows", flat=True),
+                    )
+                    durations.append(time.perf_counter() - started)
+                duration = min(durations)
+                sys.stdout.write(
+                    f"  {model.__name__:8} {name:8} {_rows_per_second(rows, duration):>12,} rows/s, "
+                    f"largest offset group {max(groups) / (rows / entries):.2f}x the average\n",
+                )
+    finally:
+        connection.creation.destroy_test_db(test_database_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
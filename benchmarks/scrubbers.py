@@ -0,0 +1,374 @@
+"""
+Benchmark the built-in scrubbers, the scrub_data command and the validator on the example app's DataToBeScrubbed:
+
+    python -m benchmarks.scrubbers [rows] [--vendor sqlite|postgresql|mysql] [--save-baseline]
+
+Seeds the given number of rows (10,000 by default) per primary key type into a test database, which is destroyed
+afterwards. With `--vendor`, an in-memory SQLite database or the PostgreSQL or MySQL service of compose.yaml is used
+instead of the configured database, e.g. `docker compose run app python -m benchmarks.scrubbers --vendor postgresql`;
+an unavailable database is skipped.
+
+Reports rows per second of every scrubber and primary key type (the best of `--repeat` runs), the time taken to
+generate the Faker data, the statements and queries run, the offsets computed per second by StringToInt and the
+duration of the validator. Results are compared to a JSON baseline, and the command fails if any of them regressed
+by more than `--threshold`. Baselines depend on the machine, so only compare to ones recorded on the same machine.
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from io import StringIO
+from pathlib import Path
+
+import django
+
+PK_TYPES = ("int", "uuid", "char")
+VALIDATOR_CALLS = 100
+BASELINE_DIRECTORY = Path(__file__).parent / "baselines"
+# an in-memory database, and the services of compose.yaml as in example/settings.py
+VENDOR_DATABASES = {
+    "sqlite": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+    "postgresql": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": "app",
+        "USER": "app",
+        "PASSWORD": "app",
+        "HOST": os.environ.get("DATABASE_HOST", "postgres"),
+        "PORT": "5432",
+    },
+    "mysql": {
+        "ENGINE": "django.db.backends.mysql",
+        "NAME": "app",
+        "USER": "app",
+        "PASSWORD": "app",
+        "HOST": os.environ.get("DATABASE_HOST", "mysql"),
+        "PORT": "3306",
+        "TEST": {
+            "NAME": "app",
+        },
+    },
+}
+# higher is better for these metrics, lower for all others; counts must not grow at all
+THROUGHPUT_METRICS = ("rows_per_second",)
+COUNT_METRICS = ("statements", "queries")
+
+
+def get_scenarios():
+    """
+    The scrubbers to benchmark, by name, each as SCRUBBER_GLOBAL_SCRUBBERS.
+    """
+    from django_scrubber import scrubbers  # noqa: PLC0415
+
+    return {
+        "Hash": {"first_name": scrubbers.Hash},
+        "Faker": {"company": scrubbers.Faker("company")},
+        "IfNotEmpty": {"description": scrubbers.IfNotEmpty(scrubbers.Hash)},
+    }
+
+
+def get_models(pk_types):
+    """
+    DataToBeScrubbed for integer primary keys, and copies of it with the other primary key types, by type. The copies
+    are only built once, and only registered with the app registry by `register_models`.
+    """
+    from example.models import DataToBeScrubbed  # noqa: PLC0415
+
+    return {pk_type: DataToBeScrubbed if pk_type == "int" else _build_model(pk_type) for pk_type in pk_types}
+
+
+@functools.cache
+def _build_model(pk_type):
+    from django.apps.registry import Apps  # noqa: PLC0415
+    from django.db import models  # noqa: PLC0415
+
+    from example.models import DataToBeScrubbed  # noqa: PLC0415
+
+    pk_fields = {
+        "uuid": lambda: models.UUIDField(primary_key=True, default=uuid.uuid4),
+        "char": lambda: models.CharField(max_length=32, primary_key=True),
+    }
+    attrs = {
+        "__module__": __name__,
+        # a registry of its own, so defining the model doesn't add it to the global one
+        "Meta": type("Meta", (), {"app_label": "example", "apps": Apps()}),
+        "id": pk_fields[pk_type](),
+    }
+    for field in DataToBeScrubbed._meta.concrete_fields:
+        if not field.primary_key:
+            attrs[field.name] = field.clone()
+    return type(f"{pk_type.title()}DataToBeScrubbed", (models.Model,), attrs)
+
+
+@contextlib.contextmanager
+def register_models(model_classes):
+    """
+    Register the given models with the global app registry while benchmarking, so scrub_data finds them by label, and
+    remove them again afterwards, so they don't show up in `apps.get_models()` later on.
+    """
+    from django.apps import apps  # noqa: PLC0415
+
+    added = [
+        model_class
+        for model_class in model_classes
+        if model_class._meta.model_name not in apps.all_models[model_class._meta.app_label]
+    ]
+    for model_class in added:
+        apps.register_model(model_class._meta.app_label, model_class)
+    try:
+        yield
+    finally:
+        for model_class in added:
+            del apps.all_models[model_class._meta.app_label][model_class._meta.model_name]
+        apps.clear_cache()
+
+
+def seed(model_class, rows, chunk_size=10_000):
+    """
+    Insert the given number of rows through DataFactory, a third each with an empty, a missing and a filled
+    description.
+    """
+    from example.models import DataFactory  # noqa: PLC0415
+
+    factory = type(
+        f"{model_class.__name__}Factory",
+        (DataFactory,),
+        {"__module__": __name__, "Meta": type("Meta", (), {"model": model_class})},
+    )
+    pk_type = model_class._meta.pk.get_internal_type()
+    for start in range(0, rows, chunk_size):
+        batch = []
+        for i in range(start, min(start + chunk_size, rows)):
+            values = {
+                "first_name": f"{i:08x}"[-8:],
+                "last_name": f"Last {i}",
+                "description": (None, "", f"Description {i}")[i % 3],
+                "ean8": f"{i:08d}"[-8:],
+                "company": f"Company {i}",
+            }
+            if pk_type == "CharField":
+                values["id"] = uuid.uuid4().hex
+            batch.append(factory.build(**values))
+        model_class.objects.bulk_create(batch)
+
+
+def run(rows=10_000, pk_types=PK_TYPES, repeat=3, stdout=sys.stdout):
+    """
+    Benchmark all scenarios on the default database, which must be empty. Returns the results by name.
+    """
+    from django_scrubber.services.validator import ScrubberValidatorService  # noqa: PLC0415
+
+    model_classes = get_models(pk_types)
+    with register_models(model_classes.values()):
+        results = _benchmark_models(model_classes, rows, repeat)
+
+    # validating takes milliseconds, so time many calls
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(VALIDATOR_CALLS):
+            ScrubberValidatorService().process()
+        durations.append((time.perf_counter() - started) / VALIDATOR_CALLS)
+    results["validator"] = {"seconds": min(durations)}
+
+    for name, result in results.items():
+        stdout.write(f"  {name:20} {_format_result(result)}\n")
+    return results
+
+
+def _benchmark_models(model_classes, rows, repeat):
+    """
+    Seed the given models and benchmark all scenarios on each of them. Returns the results by name.
+    """
+    from django.core.management import call_command  # noqa: PLC0415
+    from django.db import connection, models  # noqa: PLC0415
+    from django.test.utils import CaptureQueriesContext, override_settings  # noqa: PLC0415
+
+    from django_scrubber import scrubbers, settings_with_fallback  # noqa: PLC0415
+    from django_scrubber.management.commands.scrub_data import PK_OFFSET_HASHES, _rows_per_second  # noqa: PLC0415
+
+    for model_class in model_classes.values():
+        if model_class._meta.db_table not in connection.introspection.table_names():
+            with connection.schema_editor() as schema_editor:
+                schema_editor.create_model(model_class)
+        seed(model_class, rows)
+
+    entries = settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        report_path = Path(directory) / "report.json"
+        for pk_type, model_class in model_classes.items():
+            for name, global_scrubbers in get_scenarios().items():
+                durations, faker_durations = [], []
+                for _ in range(repeat):
+                    # generate the Faker data anew every time, as a first run would
+                    scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+                    with (
+                        # scrub_data refuses to run without DEBUG, which test runners turn off
+                        override_settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS=global_scrubbers),
+                        CaptureQueriesContext(connection) as queries,
+                    ):
+                        call_command(
+                            "scrub_data",
+                            "--model",
+                            model_class._meta.label,
+                            "--keep-sessions",
+                            "--remove-fake-data",
+                            "--report-json",
+                            str(report_path),
+                            stdout=StringIO(),
+                        )
+                    report = json.loads(report_path.read_text())
+                    model_report = report["models"][model_class._meta.label]
+                    durations.append(model_report["duration"])
+                    faker_durations.append(sum(timing["duration"] for timing in report["faker_providers"].values()))
+                result = {
+                    "rows_per_second": _rows_per_second(model_report["rows"], min(durations)),
+                    "statements": model_report["statements"],
+                    "queries": len(queries),
+                }
+                if report["faker_providers"]:
+                    result["faker_seconds"] = min(faker_durations)
+                results[f"{pk_type} {name}"] = result
+
+            if pk_type != "int":
+                pk_to_int = PK_OFFSET_HASHES[settings_with_fallback("SCRUBBER_PK_OFFSET_HASH")]
+                queryset = model_class.objects.annotate(offset=pk_to_int(models.F("pk")) % entries)
+                durations = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    queryset.aggregate(models.Max("offset"))
+                    durations.append(time.perf_counter() - started)
+                results[f"{pk_type} StringToInt"] = {"rows_per_second": _rows_per_second(rows, min(durations))}
+    return results
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Describe every result which is worse than its baseline by more than the given fraction, or which runs more
+    statements or queries.
+    """
+    regressions = []
+    for name, result in results.items():
+        for metric, value in result.items():
+            baseline_value = baseline.get(name, {}).get(metric)
+            if baseline_value is None:
+                continue
+            if metric in THROUGHPUT_METRICS:
+                regressed = value < baseline_value * (1 - threshold)
+            elif metric in COUNT_METRICS:
+                regressed = value > baseline_value
+            else:
+                regressed = value > baseline_value * (1 + threshold)
+            if regressed:
+                regressions.append(
+                    f"{name} {metric}: {_format_value(value)} (baseline {_format_value(baseline_value)})",
+                )
+    return regressions
+
+
+def _format_value(value):
+    return f"{value:,}" if isinstance(value, int) else f"{value:.4f}"
+
+
+def _format_result(result):
+    parts = []
+    if "rows_per_second" in result:
+        parts.append(f"{result['rows_per_second']:>12,} rows/s")
+    if "statements" in result:
+        parts.append(f"{result['statements']} statements, {result['queries']} queries")
+    if "faker_seconds" in result:
+        parts.append(f"Faker data in {result['faker_seconds']:.2f}s")
+    if "seconds" in result:
+        parts.append(f"{result['seconds'] * 1000:.2f}ms")
+    return ", ".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.scrubbers", description=__doc__.split("\n\n")[0])
+    parser.add_argument("rows", nargs="?", type=int, default=10_000, help="Rows seeded per primary key type.")
+    parser.add_argument(
+        "--vendor",
+        choices=VENDOR_DATABASES,
+        help="Benchmark an in-memory SQLite or a compose.yaml database instead of the configured one.",
+    )
+    parser.add_argument("--pk-types", nargs="+", choices=PK_TYPES, default=PK_TYPES)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, of which the best one counts.")
+    parser.add_argument("--baseline", help="Path of the JSON baseline, benchmarks/baselines/<vendor>.json by default.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Tolerated regression, as a fraction.")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "example.settings")
+    from django.conf import settings  # noqa: PLC0415
+    from django.core.exceptions import ImproperlyConfigured  # noqa: PLC0415
+
+    if args.vendor:
+        settings.DATABASES["default"] = VENDOR_DATABASES[args.vendor]
+        if args.vendor == "postgresql" and "django.contrib.postgres" not in settings.INSTALLED_APPS:
+            settings.INSTALLED_APPS = [*settings.INSTALLED_APPS, "django.contrib.postgres"]
+    try:
+        django.setup()
+    except ImproperlyConfigured as e:
+        # e.g. the database driver isn't installed
+        sys.stdout.write(f"{args.vendor} is not available ({e}), skipping\n")
+        return 0
+
+    from django.db import DatabaseError, connection  # noqa: PLC0415
+
+    try:
+        connection.ensure_connection()
+    except DatabaseError as e:
+        sys.stdout.write(f"{connection.vendor} is not available ({e}), skipping\n")
+        return 0
+
+    sys.stdout.write(f"{connection.vendor}, {args.rows} rows per primary key type\n")
+    test_database_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = run(args.rows, args.pk_types, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(test_database_name, verbosity=0)
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_DIRECTORY / f"{connection.vendor}.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(
+            json.dumps({"rows": args.rows, "results": results}, indent=2, sort_keys=True) + "\n",
+        )
+        sys.stdout.write(f"Saved the baseline to {baseline_path}\n")
+        return 0
+    return compare_to_baseline(results, args.rows, baseline_path, args.threshold)
+
+
+def compare_to_baseline(results, rows, baseline_path, threshold):
+    """
+    Report regressions compared to the baseline stored at the given path, if any. Returns the exit status.
+    """
+    if not baseline_path.exists():
+        sys.stdout.write(f"No baseline at {baseline_path}, store one with --save-baseline\n")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline["rows"] != rows:
+        sys.stdout.write(f"The baseline was recorded with {baseline['rows']} rows, not comparing\n")
+        return 0
+    regressions = find_regressions(results, baseline["results"], threshold)
+    if regressions:
+        sys.stdout.write(f"Regressions of more than {threshold:.0%} compared to {baseline_path}:\n")
+        for regression in regressions:
+            sys.stdout.write(f"  {regression}\n")
+        return 1
+    sys.stdout.write(f"No regressions compared to {baseline_path}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
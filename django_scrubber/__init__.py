@@ -1,5 +1,8 @@
+import threading
+from contextlib import contextmanager
+
 from django.conf import settings
-from django.db import models
+from django.db import models, router
 
 defaults = {
     "SCRUBBER_RANDOM_SEED": 42,  # we prefer idempotent scrubbing
@@ -9,7 +12,16 @@ defaults = {
     "SCRUBBER_APPS_LIST": None,
     "SCRUBBER_ADDITIONAL_FAKER_PROVIDERS": {*()},
     "SCRUBBER_FAKER_LOCALE": None,
+    "SCRUBBER_FAKER_PROCESSES": None,
+    "SCRUBBER_FAKER_CHUNK_SIZE": 1000,
+    "SCRUBBER_FAKER_INSERT_BATCH_SIZE": 1000,
+    "SCRUBBER_FAKER_UPDATE_STRATEGY": "subquery",
+    "SCRUBBER_FAKER_INLINE_MAX_ENTRIES": 0,
+    "SCRUBBER_PYTHON_PROCESSES": None,
+    "SCRUBBER_PYTHON_CHUNK_SIZE": 1000,
+    "SCRUBBER_PK_OFFSET_HASH": "md5",
     "SCRUBBER_MAPPING": {},
+    "SCRUBBER_TRUNCATE_MODELS": (),
     "SCRUBBER_STRICT_MODE": False,
     "SCRUBBER_REQUIRED_FIELD_TYPES": (
         models.CharField,
@@ -27,6 +39,10 @@ defaults = {
         "sessions.Session",
         "sites.Site",
         "django_scrubber.FakeData",
+        "django_scrubber.FakeDataProvider",
+        "django_scrubber.ScrubRun",
+        "django_scrubber.ScrubCheckpoint",
+        "django_scrubber.ScrubWatermark",
     ),
     "SCRUBBER_HASH_TEMPLATE": None,
     "SCRUBBER_HASH_TEMPLATE_MAX_LENGTH": None,
@@ -39,3 +55,31 @@ def settings_with_fallback(key):
 
 class ScrubberInitError(Exception):
     pass
+
+
+_pinned_database = threading.local()
+
+
+@contextmanager
+def use_database(alias):
+    """
+    Scrub in the given database within the current thread, regardless of the database routers, including the Faker data
+    and the bookkeeping of runs. `None` restores routing.
+    """
+    previous = getattr(_pinned_database, "alias", None)
+    _pinned_database.alias = alias
+    try:
+        yield
+    finally:
+        _pinned_database.alias = previous
+
+
+def db_for_write(model):
+    """
+    The database to scrub the given model in: the one set by `use_database`, or the one picked by the routers.
+    """
+    return getattr(_pinned_database, "alias", None) or router.db_for_write(model)
+
+
+def db_for_read(model):
+    return getattr(_pinned_database, "alias", None) or router.db_for_read(model)
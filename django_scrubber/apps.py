@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 from django.utils.translation import gettext_lazy as _
 
 
@@ -6,3 +7,8 @@ class DjangoScrubberConfig(AppConfig):
     name = "django_scrubber"
     verbose_name = _("Django Scrubber")
     default_auto_field = "django.db.models.AutoField"
+
+    def ready(self):
+        from . import sql  # noqa: PLC0415
+
+        connection_created.connect(sql.register_sqlite_functions, dispatch_uid="django_scrubber_sqlite_functions")
@@ -1,20 +1,35 @@
-import importlib
-import warnings
-from inspect import getmembers
+import hashlib
+import itertools
+import json
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from pathlib import Path
 
 from django.apps import apps
 from django.conf import settings
 from django.contrib.sessions.models import Session
 from django.core.exceptions import FieldDoesNotExist
 from django.core.management.base import BaseCommand, CommandError
-from django.db.models import F, IntegerField, Model
+from django.db import DatabaseError, connection, connections, router, transaction
+from django.db.models import BigIntegerField, F, IntegerField, Max, Min, Model, Q, UUIDField
 from django.db.models.expressions import Func
 from django.db.utils import DataError, IntegrityError
+from django.utils import timezone
 
-from django_scrubber import settings_with_fallback
-from django_scrubber.models import FakeData
-from django_scrubber.scrubbers import Keep
+from django_scrubber import db_for_read, db_for_write, settings_with_fallback, signals, sql, use_database
+from django_scrubber.models import FakeData, FakeDataProvider, ScrubCheckpoint, ScrubRun, ScrubWatermark
+from django_scrubber.plan import ScrubPlan, _get_scrubber_class
+from django_scrubber.scrubbers import Faker, PythonTransform, UniqueFakerLookup, apply_python_transforms
 from django_scrubber.services.validator import ScrubberValidatorService
+from django_scrubber.tracing import Tracer
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
 
 class StringToInt(Func):
@@ -22,6 +37,8 @@ class StringToInt(Func):
     database-specific implementations for reproducible conversion of a field value to an integer
     """
 
+    output_field = BigIntegerField()
+
     def as_sqlite(self, compiler, connection, **extra_context):
         return self.as_sql(
             compiler,
@@ -47,9 +64,77 @@ class StringToInt(Func):
         )
 
 
+class StringToIntBuiltin(Func):
+    """
+    cheaper database-specific implementations for reproducible conversion of a field value to an integer, using hash
+    functions built into the database instead of MD5
+    """
+
+    output_field = BigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite has no builtin hash function, see sql.register_sqlite_functions
+        return self.as_sql(compiler, connection, template="SCRUBBER_CRC32(%(expressions)s)", **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="CRC32(%(expressions)s)", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        # hash native UUIDs without formatting them as text first
+        if isinstance(self.get_source_expressions()[0].output_field, UUIDField):
+            template = "ABS(CAST(UUID_HASH(%(expressions)s) AS BIGINT))"
+        else:
+            template = "ABS(CAST(HASHTEXT(CAST(%(expressions)s AS TEXT)) AS BIGINT))"
+        return self.as_sql(compiler, connection, template=template, **extra_context)
+
+
+class StatementObserver:
+    """
+    Database execute wrapper counting the statements run while scrubbing a model, and sending their timing.
+    """
+
+    def __init__(self, model_class):
+        self.model_class = model_class
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            signals.statement_executed.send(
+                sender=self.model_class,
+                sql=sql,
+                many=many,
+                duration=time.monotonic() - started,
+            )
+
+
+class _PrefixedOutput:
+    """
+    Stream prefixing every line with the database alias written by a concurrently scrubbed database.
+    """
+
+    def __init__(self, out, prefix):
+        self.out = out
+        self.prefix = prefix
+
+    def write(self, text):
+        self.out.write("".join(f"[{self.prefix}] {line}" for line in text.splitlines(keepends=True)), ending="")
+
+    def flush(self):
+        self.out.flush()
+
+    def isatty(self):
+        return False
+
+
 class Command(BaseCommand):
     help = "Replace database data according to model-specific or global scrubbing rules."
     leave_locale_alone = True
+    # the database alias set with --database this command scrubs, otherwise the routers decide
+    database = None
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -72,6 +157,88 @@ class Command(BaseCommand):
             "If you want to do multiple iterations of scrubbing, it will save you time to keep "
             "them. If not, you will add a huge bunch of data to your dump size.",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            required=False,
+            help="Scrub models in primary key ranges of this many rows, committing each range separately. "
+            "Can be overridden per model by setting `batch_size` on the scrubbers' Meta class.",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            required=False,
+            help="Scrub up to this many models concurrently, each on its own database connection. "
+            "Largest tables are scheduled first.",
+        )
+        parser.add_argument(
+            "--shards",
+            type=int,
+            default=1,
+            required=False,
+            help="Split every model's primary key space into this many disjoint ranges, which are scrubbed "
+            "concurrently. Can be overridden per model by setting `shards` on the scrubbers' Meta class.",
+        )
+        parser.add_argument(
+            "--strategy",
+            choices=STRATEGIES,
+            default="update",
+            required=False,
+            help="How to scrub tables: `update` them in place, or `copy` them into scrubbed tables replacing the "
+            "original ones (PostgreSQL only). Can be overridden per model by setting `strategy` on the scrubbers' "
+            "Meta class.",
+        )
+        parser.add_argument(
+            "--plan",
+            action="store_true",
+            required=False,
+            help="Only print the statement run for every model, its estimated row count and the database's query "
+            "plan. Neither modifies any data nor generates Faker data.",
+        )
+        parser.add_argument(
+            "--report-json",
+            type=str,
+            required=False,
+            help="Write a JSON report with rows, time and statements per model, Faker data initialization time per "
+            "provider, truncation time and peak memory to this file, or to stdout if `-`.",
+        )
+        parser.add_argument(
+            "--trace",
+            type=str,
+            required=False,
+            help="Write the spans of the run, its models, statements and Faker providers to this file, in the Trace "
+            "Event Format understood by chrome://tracing and Perfetto.",
+        )
+        parser.add_argument(
+            "--prometheus-textfile",
+            type=str,
+            required=False,
+            help="Write counters of the run to this file in the Prometheus text format, e.g. for node_exporter's "
+            "textfile collector.",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            required=False,
+            help="Only scrub rows beyond the highest primary key, or the value of the field set as "
+            "`incremental_field` on the scrubbers' Meta class, scrubbed by the last successful incremental run.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            required=False,
+            help="Continue the last interrupted run with its options, skipping models, shards and batches it has "
+            "already committed.",
+        )
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            required=False,
+            help="Scrub this database alias instead of the ones picked by the database routers, along with its own "
+            "Faker data and runs. Can be given several times to scrub several databases concurrently.",
+        )
 
     def handle(self, *args, **kwargs):
         if not settings.DEBUG:
@@ -79,10 +246,13 @@ class Command(BaseCommand):
             self.stderr.write("This command should only be run with DEBUG=True, to avoid running on live systems")
             return False
 
+        # resolve scrubbers once, for strict mode and scrubbing alike
+        self.scrub_plan = ScrubPlan()
+
         # Check STRICT mode
         if settings_with_fallback("SCRUBBER_STRICT_MODE"):
             service = ScrubberValidatorService()
-            non_scrubbed_field_list = service.process()
+            non_scrubbed_field_list = service.process(self.scrub_plan)
             if len(non_scrubbed_field_list) > 0:
                 self.stderr.write(
                     'When "SCRUBBER_STRICT_MODE" is enabled, you have to define a scrubbing policy '
@@ -90,80 +260,793 @@ class Command(BaseCommand):
                 )
                 return False
 
-        global_scrubbers = settings_with_fallback("SCRUBBER_GLOBAL_SCRUBBERS")
-
-        # run only for selected model
-        if kwargs.get("model") is not None:
-            app_label, model_name = kwargs.get("model").rsplit(".", 1)
+        databases = list(dict.fromkeys(kwargs.get("databases") or ()))
+        unknown_databases = [alias for alias in databases if alias not in connections]
+        if unknown_databases:
+            raise CommandError(f"Unknown database alias(es): {', '.join(unknown_databases)}")
+        if not databases:
+            self.scrub_run = self._start_run(kwargs)
+        models = _get_models(kwargs.get("model"))
+        tracer = Tracer() if kwargs.get("trace") or kwargs.get("prometheus_textfile") else None
+        started = time.monotonic()
+        error = None
+        with tracer or nullcontext():
+            signals.scrub_started.send(sender=type(self), models=models)
             try:
-                models = [apps.get_model(app_label=app_label, model_name=model_name)]
-            except LookupError as e:
-                raise CommandError("--model should be defined as <app_label>.<model_name>") from e
+                if databases:
+                    report = self._run_databases(databases, started, kwargs)
+                else:
+                    report = self._run(models, started, **kwargs)
+                if report is not None and kwargs.get("report_json"):
+                    self._write_report(kwargs["report_json"], report)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                signals.scrub_finished.send(sender=type(self), duration=time.monotonic() - started, error=error)
+                if kwargs.get("trace"):
+                    tracer.write_trace(kwargs["trace"])
+                if kwargs.get("prometheus_textfile"):
+                    tracer.write_prometheus_textfile(kwargs["prometheus_textfile"])
+        return None
 
-        # run for all models of all apps
-        else:
-            models = apps.get_models()
+    def _run(self, models, started, **kwargs):
+        batch_size = _check_positive(kwargs.get("batch_size"), "--batch-size")
+        jobs = _check_positive(kwargs.get("jobs") or 1, "--jobs")
+        shards = _check_positive(kwargs.get("shards") or 1, "--shards")
+        strategy = kwargs.get("strategy") or "update"
+        plan = kwargs.get("plan", False)
+        incremental = kwargs.get("incremental", False)
+        self.task_reports = []
+        self.incremental_filters = {}
+        self.rank_tables = []
+        watermarks = {}
 
-        scrubber_apps_list = settings_with_fallback("SCRUBBER_APPS_LIST")
-        for model_class in models:
-            self._scrub_model(model_class, scrubber_apps_list, global_scrubbers)
+        # don't waste time on scrubbing rows which are removed anyway
+        purged_models, truncation_timings = self._purge(models, kwargs.get("keep_sessions", False), plan)
 
-        # Truncate session data
-        if not kwargs.get("keep_sessions", False):
-            Session.objects.all().delete()
+        # realize all scrubbers up front, so Faker data is fully initialized before any update is running
+        scrub_tasks = []
+        # an interrupted run must continue with the same data, even if it was generated without a fixed seed
+        with Faker.deferred_initialization(
+            initialize=not plan,
+            reuse_unseeded=kwargs.get("resume", False),
+        ) as faker_timings:
+            for model_class in models:
+                if model_class in purged_models:
+                    continue
+                realized_scrubbers = self._realize_scrubbers(model_class)
+                if not realized_scrubbers:
+                    continue
+                model_shards = _get_shards(model_class, shards, strategy)
+                if incremental:
+                    self.incremental_filters[model_class], watermarks[model_class] = self._get_incremental_filter(
+                        model_class,
+                        realized_scrubbers,
+                        strategy,
+                    )
+                if plan:
+                    self._plan_model(model_class, realized_scrubbers, batch_size, model_shards, strategy)
+                    continue
+                self._rank_rows(model_class, realized_scrubbers, strategy, kwargs.get("resume", False))
+                jobs = max(jobs, model_shards)
+                for pk_range in get_shard_ranges(model_class, model_shards):
+                    scrub_tasks.append((model_class, realized_scrubbers, pk_range))
 
-        # Truncate Faker data
+        if plan:
+            return None
+
+        self._scrub(scrub_tasks, jobs, batch_size, strategy)
+        # an interrupted run keeps its ranks, to continue with them
+        for rank_table, using in self.rank_tables:
+            sql.drop_ranks(rank_table, using)
+        # only advance once all rows up to the watermarks are scrubbed
+        for model_class, (field_name, value) in watermarks.items():
+            if value is not None:
+                ScrubWatermark.objects.db_manager(db_for_write(ScrubWatermark)).update_or_create(
+                    model=model_class._meta.label,
+                    defaults={"field": field_name, "value": str(value)},
+                )
         if kwargs.get("remove_fake_data", False):
-            FakeData.objects.all().delete()
+            started_truncation = time.monotonic()
+            sql.truncate([FakeData, FakeDataProvider], db_for_write(FakeData))
+            truncation_timings["fake_data"] = time.monotonic() - started_truncation
+        self._finish_run()
+
+        return {
+            "duration": time.monotonic() - started,
+            "models": _summarize_task_reports(self.task_reports),
+            "faker_providers": faker_timings,
+            "truncation": truncation_timings,
+            "peak_memory_bytes": _get_peak_memory(),
+        }
+
+    def _run_databases(self, databases, started, kwargs):
+        """
+        Scrub every given database as a run of its own, with its own Faker data and bookkeeping, each in a thread of
+        its own. A failing database does not stop the others; all failures are reported once every database is done,
+        following a summary of all of them. Returns the reports of all databases.
+        """
+        runners = {}
+        for alias in databases:
+            runner = Command(stdout=_PrefixedOutput(self.stdout, alias), stderr=_PrefixedOutput(self.stderr, alias))
+            runner.scrub_plan = self.scrub_plan
+            runners[alias] = runner
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=len(runners)) as executor:
+            futures = {
+                executor.submit(runner._run_database, alias, dict(kwargs)): alias for alias, runner in runners.items()
+            }
+            for future in as_completed(futures):
+                alias = futures[future]
+                try:
+                    results[alias] = future.result()
+                # anything raised by a database is its own failure, which must not hide how the others went
+                except Exception as e:  # noqa: BLE001
+                    self.stderr.write(f"Scrubbing database {alias} failed: {e!r}")
+                    results[alias] = e
+
+        self.stdout.write("Summary:")
+        for alias, runner in runners.items():
+            result = results[alias]
+            if isinstance(result, Exception):
+                self.stdout.write(f"  {alias}: failed ({result!r})")
+            elif result is None:
+                self.stdout.write(f"  {alias}: planned")
+            else:
+                rows = sum(model_report["rows"] for model_report in result["models"].values())
+                self.stdout.write(
+                    f"  {alias}: {rows} rows of {len(result['models'])} models in {runner.duration:.2f}s "
+                    f"({_rows_per_second(rows, runner.duration)} rows/s)",
+                )
+
+        failed_databases = [alias for alias in runners if isinstance(results[alias], Exception)]
+        if failed_databases:
+            raise CommandError(
+                f"Scrubbing failed for {len(failed_databases)} database(s): {', '.join(failed_databases)}",
+            ) from results[failed_databases[0]]
+        if all(result is None for result in results.values()):
             return None
-        return None
+        return {
+            "duration": time.monotonic() - started,
+            "databases": {alias: results[alias] for alias in runners},
+            "peak_memory_bytes": _get_peak_memory(),
+        }
 
-    def _scrub_model(self, model_class, scrubber_apps_list, global_scrubbers):
-        if (
-            model_class._meta.proxy
-            or (settings_with_fallback("SCRUBBER_SKIP_UNMANAGED") and not model_class._meta.managed)
-            or (scrubber_apps_list and model_class._meta.app_config.name not in scrubber_apps_list)
-        ):
+    def _run_database(self, alias, kwargs):
+        """
+        Scrub the models stored in the given database, which everything done within this thread is pinned to.
+        """
+        self.database = alias
+        started = time.monotonic()
+        try:
+            with use_database(alias):
+                self.scrub_run = self._start_run(kwargs)
+                models = [
+                    model_class
+                    for model_class in _get_models(kwargs.get("model"))
+                    if router.allow_migrate_model(alias, model_class)
+                ]
+                return self._run(models, started, **kwargs)
+        finally:
+            self.duration = time.monotonic() - started
+            # connections are thread-local, don't leak the ones opened by this thread
+            connections.close_all()
+
+    def _start_run(self, kwargs):
+        """
+        Record a new run, or with --resume load the last interrupted one and continue with its options.
+        Nothing is recorded when only planning.
+        """
+        if kwargs.get("plan"):
+            return None
+        if not kwargs.get("resume"):
+            return ScrubRun.objects.db_manager(db_for_write(ScrubRun)).create(
+                options={name: kwargs.get(name) for name in RESUMABLE_OPTIONS},
+            )
+
+        # only the last run can be resumed, any run started since has scrubbed data restored before it
+        scrub_run = ScrubRun.objects.using(db_for_write(ScrubRun)).order_by("-pk").first()
+        if scrub_run is None or scrub_run.finished is not None:
+            raise CommandError("There is no interrupted run to resume, the last run has finished")
+        self.stdout.write(f"Resuming {scrub_run} with {scrub_run.options}")
+        kwargs.update(scrub_run.options)
+        return scrub_run
+
+    def _finish_run(self):
+        # checkpoints are only needed to resume
+        self.scrub_run.checkpoints.all().delete()
+        self.scrub_run.finished = timezone.now()
+        self.scrub_run.save(update_fields=["finished"])
+
+    def _get_checkpoint(self, model_class, pk_range, stage=None):
+        if self.scrub_run is None:
+            return None
+        checkpoint, _ = ScrubCheckpoint.objects.db_manager(db_for_write(ScrubCheckpoint)).get_or_create(
+            run=self.scrub_run,
+            model=model_class._meta.label,
+            shard=_get_shard_key(pk_range, stage),
+        )
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint, last_pk=None, completed=False):
+        if checkpoint is None:
             return
+        checkpoint.last_pk = None if last_pk is None else str(last_pk)
+        checkpoint.completed = completed
+        checkpoint.save(update_fields=["last_pk", "completed"])
+
+    def _rank_rows(self, model_class, realized_scrubbers, strategy, resume):
+        """
+        Rank the rows of a model scrubbed with UniqueFaker once for the whole run, see `sql.rank_rows`.
+        """
+        # the copy strategy refuses UniqueFaker anyway
+        if _get_strategy(model_class, strategy) == "copy":
+            return
+        using = db_for_write(model_class)
+        rank_table = sql.rank_rows(_get_queryset(model_class).using(using), realized_scrubbers, reuse=resume)
+        if rank_table is not None:
+            self.rank_tables.append((rank_table, using))
+
+    def _get_incremental_filter(self, model_class, realized_scrubbers, strategy):
+        """
+        Restrict scrubbing a model to the rows beyond its watermark, up to the current highest value of its incremental
+        field. Rows added while scrubbing are left to the next run. Returns the filter and the new watermark.
+        """
+        field_name = _get_scrubber_option(model_class, "incremental_field", "pk")
+        if _get_strategy(model_class, strategy) == "copy":
+            self.stdout.write("  the copy strategy scrubs whole tables, ignoring --incremental")
+            return Q(), (field_name, None)
+
+        try:
+            field = model_class._meta.pk if field_name == "pk" else model_class._meta.get_field(field_name)
+        except FieldDoesNotExist as e:
+            raise CommandError(f"{model_class._meta.label} has no incremental_field {field_name}") from e
+        if any(
+            isinstance(lookup, UniqueFakerLookup)
+            for value in realized_scrubbers.values()
+            for lookup in sql.find_faker_lookups(value)
+        ):
+            # values are assigned by rank within the whole table, which rows added since the last run shift
+            raise CommandError(
+                f"{model_class._meta.label} can't be scrubbed incrementally, as UniqueFaker assigns values by the "
+                "rank of rows within the whole table",
+            )
+        if field.primary_key and not is_primary_key_integer(model_class):
+            # new UUID or char keys may sort below the watermark, and their rows would never be scrubbed
+            raise CommandError(
+                f"{model_class._meta.label} can't be scrubbed incrementally by its non-integer primary key, set "
+                "incremental_field to a field increasing with every added or changed row",
+            )
+        highest = model_class.objects.using(db_for_write(model_class)).aggregate(highest=Max(field_name))["highest"]
+        watermark = (
+            ScrubWatermark.objects.using(db_for_write(ScrubWatermark))
+            .filter(model=model_class._meta.label, field=field_name)
+            .first()
+        )
+        if watermark is None:
+            self.stdout.write(f"  no watermark on {field_name} yet, scrubbing all rows")
+            return Q(), (field_name, highest)
+
+        lowest = field.to_python(watermark.value)
+        self.stdout.write(f"  incremental: {lowest!r} < {field_name} <= {highest!r}")
+        if highest is None:
+            return Q(**{f"{field_name}__gt": lowest}), (field_name, None)
+        return Q(**{f"{field_name}__gt": lowest, f"{field_name}__lte": highest}), (field_name, highest)
+
+    def _purge(self, models, keep_sessions, plan):
+        """
+        Remove rows before scrubbing: all sessions, all rows of models listed in SCRUBBER_TRUNCATE_MODELS or with
+        `purge = True` on their scrubbers' Meta class, and the rows matching a filter set as `purge`.
+        Returns the models which have been truncated, and the time spent per model or per tables truncated together.
+        """
+        truncate_models = set(settings_with_fallback("SCRUBBER_TRUNCATE_MODELS"))
+        purges = {Session: True}
+        for model_class in models:
+            purge = True if model_class._meta.label in truncate_models else _get_scrubber_option(model_class, "purge")
+            if purge:
+                purges[model_class] = purge() if callable(purge) else purge
+        if keep_sessions:
+            del purges[Session]
+
+        # tables referencing each other have to be truncated together, so truncate all tables of a database at once
+        truncations = {}
+        filters = {}
+        for model_class, purge in purges.items():
+            if purge is True:
+                truncations.setdefault(db_for_write(model_class), []).append(model_class)
+            else:
+                filters[model_class] = purge
+        truncations = {alias: _get_truncated_models(alias, truncated) for alias, truncated in truncations.items()}
 
-        scrubbers = {}
-        for field in model_class._meta.fields:
-            if field.name in global_scrubbers:
-                scrubbers[field] = global_scrubbers[field.name]
-            elif type(field) in global_scrubbers:
-                scrubbers[field] = global_scrubbers[type(field)]
+        truncated_models = {model_class for truncated in truncations.values() for model_class in truncated}
+        if plan:
+            for model_class, purge in purges.items():
+                self.stdout.write(f"Purging {model_class._meta.label}: {'all rows' if purge is True else purge}")
+            return truncated_models, {}
+        return truncated_models, self._run_purges(truncations, filters)
 
-        scrubbers.update(_get_model_scrubbers(model_class))
+    def _run_purges(self, truncations, filters):
+        """
+        Truncate the given models by database, then delete the rows matching the given filters by model. Returns the
+        time spent per model or per tables truncated together.
+        """
+        timings = {}
+        for alias, truncated in truncations.items():
+            labels = [model_class._meta.label for model_class in truncated]
+            started = time.monotonic()
+            try:
+                sql.truncate(truncated, alias)
+            except DatabaseError as e:
+                raise CommandError(f"Purging {', '.join(labels)} failed ({e})") from e
+            for label in labels:
+                self.stdout.write(f"Truncated {label}")
+            timings[", ".join(labels)] = time.monotonic() - started
+        for model_class, purge in filters.items():
+            label = model_class._meta.label
+            started = time.monotonic()
+            try:
+                rows = sql.delete(model_class.objects.using(db_for_write(model_class)).filter(purge))
+            except DatabaseError as e:
+                raise CommandError(f"Purging {label} failed ({e})") from e
+            self.stdout.write(f"Purged {rows} rows of {label}")
+            timings[label] = time.monotonic() - started
+        return timings
 
-        # Filter out all fields marked as "to be kept"
-        scrubbers_without_kept_fields = {}
-        for field, scrubbing_method in scrubbers.items():
-            if scrubbing_method != Keep:
-                scrubbers_without_kept_fields[field] = scrubbing_method
-        scrubbers = scrubbers_without_kept_fields
+    def _write_report(self, path, report):
+        content = json.dumps(report, indent=2, sort_keys=True)
+        if path == "-":
+            self.stdout.write(content)
+        else:
+            Path(path).write_text(content)
 
+    def _realize_scrubbers(self, model_class):
+        scrubbers = self.scrub_plan.get_scrubbers(model_class)
         if not scrubbers:
-            return
+            return {}
 
         realized_scrubbers = _filter_out_disabled(_call_callables(scrubbers))
+        if settings_with_fallback("SCRUBBER_PYTHON_PROCESSES"):
+            _check_picklable(model_class, realized_scrubbers)
 
         self.stdout.write(f"Scrubbing {model_class._meta.label} with {realized_scrubbers}")
+        return realized_scrubbers
+
+    def _scrub(self, scrub_tasks, jobs, batch_size, strategy):
+        if jobs > 1 and (connections[self.database] if self.database else connection).vendor == "sqlite":
+            self.stdout.write("SQLite does not support concurrent writes, ignoring --jobs and --shards")
+            jobs = 1
+
+        if jobs > 1:
+            self._scrub_models_concurrently(scrub_tasks, jobs, batch_size, strategy)
+        else:
+            for model_class, realized_scrubbers, pk_range in scrub_tasks:
+                self._scrub_model(model_class, realized_scrubbers, batch_size, pk_range, strategy)
+
+    def _scrub_models_concurrently(self, scrub_tasks, jobs, batch_size, strategy="update"):
+        """
+        Scrub models (or shards of models) in a pool of worker threads. Every worker uses its own database connection.
+        A failing model does not stop the others; all failures are reported once every worker has finished.
+        """
+        # schedule the largest tables first, so they don't end up as stragglers
+        row_counts = {model_class: estimate_row_count(model_class) for model_class, _, _ in scrub_tasks}
+        scrub_tasks = sorted(scrub_tasks, key=lambda task: row_counts[task[0]], reverse=True)
 
+        failed_models = {}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(
+                    self._scrub_model_in_thread,
+                    model_class,
+                    realized_scrubbers,
+                    batch_size,
+                    pk_range,
+                    strategy,
+                ): model_class
+                for model_class, realized_scrubbers, pk_range in scrub_tasks
+            }
+            for future in as_completed(futures):
+                model_label = futures[future]._meta.label
+                try:
+                    future.result()
+                # anything raised by a model is its own failure, which must not hide how the others went
+                except Exception as e:  # noqa: BLE001
+                    self.stderr.write(f"Scrubbing {model_label} failed: {e!r}")
+                    failed_models[model_label] = e
+
+        if failed_models:
+            raise CommandError(
+                f"Scrubbing failed for {len(failed_models)} model(s): {', '.join(sorted(failed_models))}",
+            ) from next(iter(failed_models.values()))
+
+    def _scrub_model_in_thread(self, model_class, realized_scrubbers, batch_size, pk_range, strategy):
         try:
-            if is_primary_key_integer(model_class=model_class):
-                model_class.objects.annotate(
-                    mod_pk=F("pk") % settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"),
-                ).update(**realized_scrubbers)
-            else:
-                model_class.objects.annotate(
-                    mod_pk=StringToInt(F("pk")) % settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"),
-                ).update(**realized_scrubbers)
+            with use_database(self.database):
+                self._scrub_model(model_class, realized_scrubbers, batch_size, pk_range, strategy)
+        finally:
+            # connections are thread-local, don't leak the one opened by this worker
+            connections.close_all()
+
+    def _plan_model(self, model_class, realized_scrubbers, batch_size, shards, strategy):
+        """
+        Print what scrubbing a model would run, without running it.
+        """
+        using = db_for_write(model_class)
+        queryset = _get_queryset(model_class).filter(self.incremental_filters.get(model_class, Q()))
+        strategy = _get_strategy(model_class, strategy)
+        batch_size = _get_scrubber_option(model_class, "batch_size", batch_size)
+
+        details = [f"~{estimate_row_count(model_class)} rows", f"strategy {strategy}"]
+        python_transforms, realized_scrubbers = _split_python_transforms(realized_scrubbers)
+        if python_transforms:
+            self.stdout.write(
+                f"  Python: {', '.join(python_transforms)} in chunks of "
+                f"{settings_with_fallback('SCRUBBER_PYTHON_CHUNK_SIZE')} rows",
+            )
+        if not realized_scrubbers:
+            self.stdout.write(f"  {', '.join(details)}, nothing to scrub in SQL")
+            return
+        rank_table = None
+        if strategy == "copy":
+            self._check_copy_strategy(model_class, realized_scrubbers)
+            _, statement, params = sql.compile_copy_select(
+                _get_queryset(model_class, base_manager=True),
+                realized_scrubbers,
+            )
+        else:
+            details += [f"batches of {batch_size} rows"] if batch_size else []
+            details += [f"{shards} shards"] if shards > 1 else []
+            queryset, realized_scrubbers = sql.exclude_unchanged_rows(queryset, realized_scrubbers)
+            rank_table = sql.plan_ranks(model_class, realized_scrubbers, using)
+            compiled = sql.compile_update(queryset, realized_scrubbers)
+            if compiled is None:
+                self.stdout.write(f"  {', '.join(details)}, no rows to scrub")
+                return
+            statement, params = compiled
+
+        self.stdout.write(f"  {', '.join(details)}")
+        self.stdout.write(f"  SQL: {statement}")
+        self.stdout.write(f"  Params: {params!r}")
+        if rank_table:
+            # the statement joins the ranks, which don't exist until the run materializes them
+            self.stdout.write(
+                f"  Ranks: materialized into {rank_table} by the run before scrubbing, "
+                "the statement can't be explained before",
+            )
+            return
+        try:
+            plan_lines = sql.explain(statement, params, using)
+        except DatabaseError as e:
+            self.stderr.write(f"  EXPLAIN failed: {e}")
+            return
+        self.stdout.write("  Plan:")
+        for line in plan_lines:
+            self.stdout.write(f"    {line}")
+
+    def _scrub_model(
+        self,
+        model_class,
+        realized_scrubbers,
+        batch_size=None,
+        pk_range=(None, None),
+        strategy="update",
+    ):
+        statement_observer = StatementObserver(model_class)
+        signals.model_scrub_started.send(sender=model_class, pk_range=pk_range)
+        started = time.monotonic()
+        rows = error = None
+        try:
+            with connections[db_for_write(model_class)].execute_wrapper(statement_observer):
+                rows = self._scrub_model_rows(model_class, realized_scrubbers, batch_size, pk_range, strategy)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration = time.monotonic() - started
+            signals.model_scrub_finished.send(
+                sender=model_class,
+                pk_range=pk_range,
+                rows=rows,
+                duration=duration,
+                statements=statement_observer.count,
+                error=error,
+            )
+
+        # list.append is thread-safe, so workers can report concurrently
+        self.task_reports.append(
+            {
+                "model": model_class._meta.label,
+                "rows": rows,
+                "started": started,
+                "finished": started + duration,
+                "statements": statement_observer.count,
+            },
+        )
+        return rows
+
+    def _scrub_model_rows(self, model_class, realized_scrubbers, batch_size, pk_range, strategy):
+        queryset = _get_queryset(model_class).filter(self.incremental_filters.get(model_class, Q()))
+
+        if pk_range != (None, None):
+            self.stdout.write(f"  {model_class._meta.label}: shard {pk_range[0]!r} < pk <= {pk_range[1]!r}")
+            queryset = _filter_pk_range(queryset, pk_range)
+
+        python_transforms, realized_scrubbers = _split_python_transforms(realized_scrubbers)
+        rows = 0
+        try:
+            if realized_scrubbers:
+                rows = self._update_model_rows(
+                    model_class,
+                    queryset,
+                    realized_scrubbers,
+                    batch_size,
+                    pk_range,
+                    strategy,
+                )
+            if python_transforms:
+                # rows rewritten in Python have been counted already if they were updated in SQL before
+                rows = max(rows, self._scrub_in_python(model_class, queryset, python_transforms, pk_range))
         except IntegrityError as e:
             raise CommandError(
-                f"Integrity error while scrubbing {model_class} ({e}); maybe increase SCRUBBER_ENTRIES_PER_PROVIDER?",
+                f"Integrity error while scrubbing {model_class} ({e}); scrubbers of fields with a unique constraint "
+                "must not assign the same value to several rows, use UniqueFaker for them",
             ) from e
         except DataError as e:
             raise CommandError(f"DataError while scrubbing {model_class} ({e})") from e
+        return rows
+
+    def _update_model_rows(self, model_class, queryset, realized_scrubbers, batch_size, pk_range, strategy):
+        batch_size = _get_scrubber_option(model_class, "batch_size", batch_size)
+        strategy = _get_strategy(model_class, strategy)
+        if strategy != "copy":
+            queryset, realized_scrubbers = sql.exclude_unchanged_rows(queryset, realized_scrubbers)
+        checkpoint = self._get_checkpoint(model_class, pk_range)
+        if checkpoint is not None and checkpoint.completed:
+            self.stdout.write(f"  {model_class._meta.label}: already scrubbed by the interrupted run, skipping")
+            return 0
+
+        if batch_size and strategy != "copy":
+            return self._update_in_batches(
+                model_class,
+                queryset,
+                realized_scrubbers,
+                batch_size,
+                checkpoint,
+            )
+        # the checkpoint is committed along with the scrubbed data, so an interruption can't tell them apart
+        with transaction.atomic(using=db_for_write(model_class)):
+            if strategy == "copy":
+                rows = self._copy_and_swap(model_class, realized_scrubbers)
+            else:
+                rows = sql.update(queryset, realized_scrubbers)
+            self._save_checkpoint(checkpoint, completed=True)
+        return rows
+
+    def _scrub_in_python(self, model_class, queryset, python_transforms, pk_range):
+        """
+        Apply PythonScrubbers to the rows of the queryset. Rows are read in chunks of SCRUBBER_PYTHON_CHUNK_SIZE, each
+        a query of its own continuing after the primary key of the previous one, and transformed by
+        SCRUBBER_PYTHON_PROCESSES worker processes. The changed rows of every chunk are written back in a transaction
+        of their own, along with the checkpoint. No cursor stays open while the table is updated, and memory is
+        bounded by the chunk size no matter the size of the table.
+        """
+        using = db_for_write(model_class)
+        checkpoint = self._get_checkpoint(model_class, pk_range, stage="python")
+        if checkpoint is not None and checkpoint.completed:
+            self.stdout.write(f"  {model_class._meta.label}: already scrubbed in Python by the interrupted run")
+            return 0
+        last_pk = None
+        if checkpoint is not None and checkpoint.last_pk is not None:
+            last_pk = model_class._meta.pk.to_python(checkpoint.last_pk)
+            self.stdout.write(f"  continuing after pk {last_pk!r}")
+
+        transforms = list(python_transforms.values())
+        fields = [model_class._meta.get_field(name) for name in python_transforms]
+        columns = list(dict.fromkeys(("pk", *(column for transform in transforms for column in transform.columns))))
+        chunk_size = settings_with_fallback("SCRUBBER_PYTHON_CHUNK_SIZE")
+        processes = settings_with_fallback("SCRUBBER_PYTHON_PROCESSES")
+        rows = queryset.using(using).order_by("pk").values_list(*columns)
+
+        chunk_count = total_rows = 0
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=processes) if processes else nullcontext() as executor:
+            while chunk := list((rows if last_pk is None else rows.filter(pk__gt=last_pk))[:chunk_size]):
+                if executor is None:
+                    changes = apply_python_transforms(transforms, columns, chunk)
+                else:
+                    slice_size = -(-len(chunk) // processes)
+                    slices = [chunk[start : start + slice_size] for start in range(0, len(chunk), slice_size)]
+                    changes = [
+                        change
+                        for slice_changes in executor.map(
+                            apply_python_transforms,
+                            itertools.repeat(transforms),
+                            itertools.repeat(columns),
+                            slices,
+                        )
+                        for change in slice_changes
+                    ]
+                with transaction.atomic(using=using):
+                    total_rows += sql.update_rows(model_class, fields, changes, using)
+                    self._save_checkpoint(checkpoint, last_pk=chunk[-1][0])
+                chunk_count += 1
+                last_pk = chunk[-1][0]
+        self._save_checkpoint(checkpoint, completed=True)
+
+        duration = time.monotonic() - started
+        self.stdout.write(
+            f"  {total_rows} rows rewritten in Python in {chunk_count} chunks, {duration:.2f}s "
+            f"({_rows_per_second(total_rows, duration)} rows/s)",
+        )
+        return total_rows
+
+    def _check_copy_strategy(self, model_class, realized_scrubbers):
+        using = db_for_write(model_class)
+        if connections[using].vendor != "postgresql":
+            raise CommandError(f"Scrubbing {model_class._meta.label} failed: the copy strategy requires PostgreSQL")
+        if uncopyable := sql.find_uncopyable_features(model_class, using):
+            raise CommandError(
+                f"Scrubbing {model_class._meta.label} failed: the copy strategy can't carry over its "
+                f"{', '.join(uncopyable)}",
+            )
+        if any(lookup for value in realized_scrubbers.values() for lookup in sql.find_faker_lookups(value)):
+            raise CommandError(
+                f"Scrubbing {model_class._meta.label} failed: the copy strategy does not support "
+                'SCRUBBER_FAKER_UPDATE_STRATEGY = "join" nor UniqueFaker',
+            )
+
+    def _copy_and_swap(self, model_class, realized_scrubbers):
+        self._check_copy_strategy(model_class, realized_scrubbers)
+
+        started = time.monotonic()
+        # the copy replaces the whole table, including rows the default manager hides
+        rows = sql.copy_and_swap(_get_queryset(model_class, base_manager=True), realized_scrubbers)
+        duration = time.monotonic() - started
+        self.stdout.write(
+            f"  {rows} rows copied in {duration:.2f}s ({_rows_per_second(rows, duration)} rows/s)",
+        )
+        return rows
+
+    def _update_in_batches(
+        self,
+        model_class,
+        queryset,
+        realized_scrubbers,
+        batch_size,
+        checkpoint=None,
+    ):
+        """
+        Walk the primary key in keyset ranges of `batch_size` rows and commit every range in its own transaction.
+        Ranges are determined by the database's own ordering, so this works for integer, UUID and char keys alike.
+        Only keys of rows matching the queryset are walked, so ranges stay dense when it is filtered.
+        Every range commits the checkpoint along with it, so a resumed run continues after the last committed range.
+        """
+        using = db_for_write(model_class)
+        primary_keys = queryset.using(using).order_by("pk").values_list("pk", flat=True)
+
+        lower_bound = None
+        if checkpoint is not None and checkpoint.last_pk is not None:
+            lower_bound = model_class._meta.pk.to_python(checkpoint.last_pk)
+            self.stdout.write(f"  continuing after pk {lower_bound!r}")
+        batch_count = total_rows = peak_rows = 0
+        started = time.monotonic()
+        while True:
+            remaining_keys = primary_keys if lower_bound is None else primary_keys.filter(pk__gt=lower_bound)
+            batch_queryset = queryset if lower_bound is None else queryset.filter(pk__gt=lower_bound)
+
+            # the last key of the range; None if fewer than batch_size rows are left
+            upper_bound = next(iter(remaining_keys[batch_size - 1 : batch_size]), None)
+            if upper_bound is not None:
+                batch_queryset = batch_queryset.filter(pk__lte=upper_bound)
+
+            batch_started = time.monotonic()
+            with transaction.atomic(using=using):
+                rows = sql.update(batch_queryset, realized_scrubbers)
+                self._save_checkpoint(checkpoint, last_pk=upper_bound, completed=upper_bound is None)
+            batch_duration = time.monotonic() - batch_started
+
+            batch_count += 1
+            total_rows += rows
+            peak_rows = max(peak_rows, rows)
+            self.stdout.write(
+                f"  batch {batch_count}: {rows} rows in {batch_duration:.2f}s "
+                f"({_rows_per_second(rows, batch_duration)} rows/s)",
+            )
+
+            if upper_bound is None:
+                break
+            lower_bound = upper_bound
+
+        duration = time.monotonic() - started
+        self.stdout.write(
+            f"  {total_rows} rows in {batch_count} batches, {duration:.2f}s "
+            f"({_rows_per_second(total_rows, duration)} rows/s), peak transaction size {peak_rows} rows",
+        )
+        return total_rows
+
+
+STRATEGIES = ("update", "copy")
+
+# conversions of non-integer primary keys to Faker data offsets, by SCRUBBER_PK_OFFSET_HASH
+PK_OFFSET_HASHES = {"md5": StringToInt, "builtin": StringToIntBuiltin}
+
+# options of a run a resumed run continues with
+RESUMABLE_OPTIONS = ("model", "batch_size", "shards", "strategy", "incremental", "keep_sessions", "remove_fake_data")
+
+
+def _get_models(model_label):
+    # run for all models of all apps
+    if model_label is None:
+        return apps.get_models()
+
+    # run only for selected model
+    try:
+        app_label, model_name = model_label.rsplit(".", 1)
+        return [apps.get_model(app_label=app_label, model_name=model_name)]
+    except (LookupError, ValueError) as e:
+        raise CommandError("--model should be defined as <app_label>.<model_name>") from e
+
+
+def _get_truncated_models(alias, models):
+    """
+    Complete the models to be truncated on a database with the many-to-many tables referencing them. Raises
+    CommandError if any other model references them, as truncating would fail, or leave dangling references where
+    foreign key checks are turned off while truncating, e.g. on MySQL.
+    """
+    models = list(models)
+    referencing = []
+    for model_class in apps.get_models(include_auto_created=True):
+        if (
+            model_class in models
+            or model_class._meta.proxy
+            or not model_class._meta.managed
+            or not router.allow_migrate_model(alias, model_class)
+        ):
+            continue
+        referenced = [
+            field.related_model._meta.label
+            for field in model_class._meta.concrete_fields
+            if field.is_relation and field.related_model in models
+        ]
+        if not referenced:
+            continue
+        if model_class._meta.auto_created:
+            models.append(model_class)
+        else:
+            referencing.append(f"{model_class._meta.label} references {', '.join(referenced)}")
+    if referencing:
+        raise CommandError(
+            f"Can't truncate {', '.join(model_class._meta.label for model_class in models)}: "
+            f"{'; '.join(referencing)}, purge it as well",
+        )
+    return models
+
+
+def _check_positive(value, option):
+    if value is not None and value < 1:
+        raise CommandError(f"{option} must be a positive integer")
+    return value
+
+
+def _get_queryset(model_class, base_manager=False):
+    # annotate the offset of every row's Faker data
+    manager = model_class._base_manager if base_manager else model_class.objects
+    objects = manager.using(db_for_write(model_class))
+    if is_primary_key_integer(model_class=model_class):
+        return objects.annotate(
+            mod_pk=F("pk") % settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"),
+        )
+    return objects.annotate(
+        mod_pk=_get_pk_to_int()(F("pk")) % settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"),
+    )
+
+
+def _get_pk_to_int():
+    pk_offset_hash = settings_with_fallback("SCRUBBER_PK_OFFSET_HASH")
+    if pk_offset_hash not in PK_OFFSET_HASHES:
+        raise CommandError(f"SCRUBBER_PK_OFFSET_HASH must be one of {', '.join(PK_OFFSET_HASHES)}")
+    return PK_OFFSET_HASHES[pk_offset_hash]
 
 
 def is_primary_key_integer(model_class: Model):
@@ -174,6 +1057,104 @@ def is_primary_key_integer(model_class: Model):
     raise Exception("no primary key defined in model")
 
 
+def get_shard_ranges(model_class: Model, shards: int):
+    """
+    Split the primary key space of a model into up to `shards` disjoint ranges of similar size.
+    Ranges are (lower, upper) tuples, to be read as `lower < pk <= upper`, where None means unbounded.
+    """
+    if shards <= 1:
+        return [(None, None)]
+
+    primary_keys = model_class._default_manager.using(db_for_write(model_class)).order_by("pk")
+    if is_primary_key_integer(model_class=model_class):
+        # split the key range arithmetically, which only needs the index bounds
+        bounds = primary_keys.aggregate(min_pk=Min("pk"), max_pk=Max("pk"))
+        if bounds["min_pk"] is None:
+            return [(None, None)]
+        key_span = bounds["max_pk"] - bounds["min_pk"] + 1
+        boundaries = [bounds["min_pk"] + key_span * i // shards - 1 for i in range(1, shards)]
+    else:
+        # split by row position for keys we can't do arithmetic on
+        row_count = primary_keys.count()
+        primary_keys = primary_keys.values_list("pk", flat=True)
+        boundaries = [primary_keys[row_count * i // shards - 1] for i in range(1, shards) if row_count * i // shards]
+
+    boundaries = sorted(set(boundaries))
+    return list(zip([None, *boundaries], [*boundaries, None], strict=True))
+
+
+def _get_shard_key(pk_range, stage=None):
+    if pk_range == (None, None):
+        return stage or ""
+    shard_key = f"{stage} {pk_range!r}" if stage else repr(pk_range)
+    # long character primary keys don't fit the checkpoint
+    if len(shard_key) > ScrubCheckpoint._meta.get_field("shard").max_length:
+        return hashlib.sha256(shard_key.encode()).hexdigest()
+    return shard_key
+
+
+def _filter_pk_range(queryset, pk_range):
+    lower, upper = pk_range
+    if lower is not None:
+        queryset = queryset.filter(pk__gt=lower)
+    if upper is not None:
+        queryset = queryset.filter(pk__lte=upper)
+    return queryset
+
+
+def _rows_per_second(rows, duration):
+    return int(rows / duration) if duration > 0 else rows
+
+
+def _summarize_task_reports(task_reports):
+    """
+    Combine the reports of all tasks scrubbing the same model, e.g. its shards, into one report per model.
+    """
+    summary = {}
+    for label in dict.fromkeys(task_report["model"] for task_report in task_reports):
+        model_reports = [task_report for task_report in task_reports if task_report["model"] == label]
+        rows = sum(task_report["rows"] for task_report in model_reports)
+        duration = max(r["finished"] for r in model_reports) - min(r["started"] for r in model_reports)
+        summary[label] = {
+            "rows": rows,
+            "duration": duration,
+            "rows_per_second": _rows_per_second(rows, duration),
+            "statements": sum(task_report["statements"] for task_report in model_reports),
+        }
+    return summary
+
+
+def _get_peak_memory():
+    # peak resident set size of this process in bytes, None if unknown
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # reported in kilobytes on Linux, in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def estimate_row_count(model_class: Model):
+    # cheap row count estimation from the database's catalog statistics, falls back to counting
+    db_connection = connections[db_for_read(model_class)]
+    table_name = model_class._meta.db_table
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)", [table_name])
+            row = cursor.fetchone()
+            # -1 if the table has never been analyzed
+            if row is not None and row[0] >= 0:
+                return int(row[0])
+        elif db_connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s",
+                [table_name],
+            )
+            row = cursor.fetchone()
+            if row is not None and row[0] is not None:
+                return int(row[0])
+    return model_class._base_manager.using(db_connection.alias).count()
+
+
 def _call_callables(d):
     """
     Helper to realize lazy scrubbers, like Faker, or global field-type scrubbers
@@ -181,54 +1162,61 @@ def _call_callables(d):
     return {k.name: (v(k) if callable(v) else v) for k, v in d.items()}
 
 
-def _parse_scrubber_class_from_string(path: str):
+def _get_scrubber_option(model, name, default=None):
     """
-    Takes a string to a certain scrubber class and returns a python class definition - not an instance.
+    Helper to read per-model options from the `Meta` class nested in a model's scrubbers, e.g.::
+
+        class Scrubbers:
+            first_name = scrubbers.Faker("first_name")
+
+            class Meta:
+                batch_size = 10000
     """
-    try:
-        module_name, class_name = path.rsplit(".", 1)
-        module = importlib.import_module(module_name)
-        return getattr(module, class_name)
-    except (ImportError, ValueError) as e:
-        raise ImportError(f'Mapped scrubber class "{path}" could not be found.') from e
+    meta = getattr(_get_scrubber_class(model), "Meta", None)
+    return getattr(meta, name, default)
 
 
-def _get_model_scrubbers(model):
-    # Get model-scrubber-mapping from settings
-    scrubber_mapping = settings_with_fallback("SCRUBBER_MAPPING")
+def _get_strategy(model, default):
+    strategy = _get_scrubber_option(model, "strategy", default)
+    if strategy not in STRATEGIES:
+        raise CommandError(f"Unsupported strategy '{strategy}' for {model._meta.label}")
+    return strategy
 
-    # Initialise scrubber list
-    scrubbers = {}
 
-    # Check if model has a settings-defined...
-    if model._meta.label in scrubber_mapping:
-        scrubber_cls = _parse_scrubber_class_from_string(scrubber_mapping[model._meta.label])
-    # If not...
-    else:
-        # Try to get the scrubber metaclass from the given model
-        try:
-            scrubber_cls = model.Scrubbers
-        except AttributeError:
-            return scrubbers  # no model-specific scrubbers
+def _get_shards(model, default, strategy):
+    # the copy strategy copies tables as a whole
+    if _get_strategy(model, strategy) == "copy":
+        return 1
+    return _check_positive(_get_scrubber_option(model, "shards", default) or 1, "shards")
 
-    # Get field mappings from scrubber class
-    for k, v in _get_fields(scrubber_cls):
-        try:
-            field = model._meta.get_field(k)
-            scrubbers[field] = v
-        except FieldDoesNotExist:
-            warnings.warn(f"Scrubber defined for {model.__name__}.{k} but field does not exist", stacklevel=2)
 
-    # Return scrubber-field-mapping
-    return scrubbers
+def _split_python_transforms(realized_scrubbers):
+    """
+    Split realized scrubbers into those applied in Python and those compiled into the update, both by field name.
+    """
+    python_transforms = {}
+    sql_scrubbers = {}
+    for name, scrubber in realized_scrubbers.items():
+        if isinstance(scrubber, PythonTransform):
+            python_transforms[name] = scrubber
+        else:
+            sql_scrubbers[name] = scrubber
+    return python_transforms, sql_scrubbers
 
 
-def _get_fields(d):
+def _check_picklable(model_class, realized_scrubbers):
     """
-    Helper to get "normal" (i.e.: non-magic and non-dunder) instance attributes.
-    Returns an iterator of (field_name, field) tuples.
+    Worker processes receive the transforms pickled, which fails for lambdas and local functions. Tell so before
+    scrubbing starts instead of in the middle of it.
     """
-    return ((k, v) for k, v in getmembers(d) if not k.startswith("_"))
+    for name, transform in _split_python_transforms(realized_scrubbers)[0].items():
+        try:
+            pickle.dumps(transform)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            raise CommandError(
+                f"The PythonScrubber of {model_class._meta.label}.{name} can't be passed to the worker processes of "
+                f"SCRUBBER_PYTHON_PROCESSES, use a module-level function ({e})",
+            ) from e
 
 
 def _filter_out_disabled(d):
@@ -1,15 +1,36 @@
 import sys
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from django_scrubber import settings_with_fallback
 from django_scrubber.services.validator import ScrubberValidatorService
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cache",
+            type=str,
+            required=False,
+            help="Cache the results per app in this file, and only validate apps whose models, fields or scrubbers "
+            "classes changed since.",
+        )
+        parser.add_argument(
+            "--changed-only",
+            action="store_true",
+            required=False,
+            help="Only report apps changed since the state of the --cache file, e.g. to validate a change in CI.",
+        )
+
     def handle(self, *args, **options):
+        if options.get("changed_only") and not options.get("cache"):
+            raise CommandError("--changed-only requires --cache")
+
         service = ScrubberValidatorService()
-        non_scrubbed_field_list = service.process()
+        non_scrubbed_field_list = service.process(
+            cache_path=options.get("cache"),
+            changed_only=options.get("changed_only", False),
+        )
 
         found_models = 0
         found_fields = 0
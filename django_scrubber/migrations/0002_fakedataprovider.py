@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_scrubber', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FakeDataProvider',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Faker provider')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='Fingerprint of the generated data')),
+            ],
+        ),
+    ]
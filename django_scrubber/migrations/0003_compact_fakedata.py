@@ -0,0 +1,72 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def delete_fake_data(apps, schema_editor):
+    # the stored data is a cache keyed by provider name, it is regenerated on the next scrubbing
+    apps.get_model("django_scrubber", "FakeData").objects.using(schema_editor.connection.alias).all().delete()
+    apps.get_model("django_scrubber", "FakeDataProvider").objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_scrubber', '0002_fakedataprovider'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_fake_data, delete_fake_data),
+        migrations.AlterUniqueTogether(
+            name='fakedata',
+            unique_together=set(),
+        ),
+        migrations.RemoveIndex(
+            model_name='fakedata',
+            name='django_scru_provide_d7f250_idx',
+        ),
+        migrations.RemoveField(
+            model_name='fakedata',
+            name='provider',
+        ),
+        migrations.AddField(
+            model_name='fakedata',
+            name='provider',
+            field=models.ForeignKey(
+                db_index=False,
+                default=0,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='data',
+                to='django_scrubber.fakedataprovider',
+                verbose_name='Faker provider',
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='fakedata',
+            name='content_int',
+            field=models.BigIntegerField(null=True, verbose_name='Fake content as integer'),
+        ),
+        migrations.AddField(
+            model_name='fakedata',
+            name='content_decimal',
+            field=models.DecimalField(
+                decimal_places=30, max_digits=65, null=True, verbose_name='Fake content as decimal',
+            ),
+        ),
+        migrations.AddField(
+            model_name='fakedata',
+            name='content_date',
+            field=models.DateField(null=True, verbose_name='Fake content as date'),
+        ),
+        migrations.AddField(
+            model_name='fakedata',
+            name='content_datetime',
+            field=models.DateTimeField(null=True, verbose_name='Fake content as datetime'),
+        ),
+        migrations.AddConstraint(
+            model_name='fakedata',
+            constraint=models.UniqueConstraint(
+                fields=('provider', 'provider_offset'), name='django_scrubber_fakedata_provider_offset',
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_scrubber', '0003_compact_fakedata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrubRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField(auto_now_add=True, verbose_name='Started at')),
+                ('finished', models.DateTimeField(null=True, verbose_name='Finished at')),
+                ('options', models.JSONField(default=dict, verbose_name='Command options')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScrubCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255, verbose_name='Model label')),
+                ('shard', models.CharField(blank=True, max_length=255, verbose_name='Primary key range of the shard')),
+                ('last_pk', models.CharField(max_length=255, null=True, verbose_name='Last scrubbed primary key')),
+                ('completed', models.BooleanField(default=False)),
+                ('run', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='django_scrubber.scrubrun')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('run', 'model', 'shard'), name='django_scrubber_scrubcheckpoint_shard')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_scrubber', '0004_scrubrun'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScrubWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255, unique=True, verbose_name='Model label')),
+                ('field', models.CharField(max_length=255, verbose_name='Incremental field')),
+                ('value', models.CharField(max_length=255, verbose_name='Watermark')),
+            ],
+        ),
+    ]
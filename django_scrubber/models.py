@@ -1,25 +1,100 @@
 from typing import ClassVar
 
-from django.db.models import CharField, Count, Index, Manager, Model, PositiveSmallIntegerField
+from django.db.models import (
+    CASCADE,
+    BigIntegerField,
+    BooleanField,
+    CharField,
+    Count,
+    DateField,
+    DateTimeField,
+    DecimalField,
+    ForeignKey,
+    JSONField,
+    Manager,
+    Model,
+    PositiveSmallIntegerField,
+    UniqueConstraint,
+)
 
 
 class FakeDataManager(Manager):
     def provider_count(self, provider):
-        return self.filter(provider=provider).values("provider").annotate(count=Count("provider")).values("count")
+        return self.filter(provider__key=provider).values("provider").annotate(count=Count("provider")).values("count")
+
+
+class FakeDataProvider(Model):
+    key = CharField(max_length=255, unique=True, verbose_name="Faker provider")
+    fingerprint = CharField(max_length=64, verbose_name="Fingerprint of the generated data")
+
+    def __str__(self):
+        return self.key
 
 
 class FakeData(Model):
-    provider = CharField(max_length=255, verbose_name="Faker provider", db_index=True)
+    # indexed by the unique constraint below
+    provider = ForeignKey(
+        FakeDataProvider,
+        on_delete=CASCADE,
+        related_name="data",
+        db_index=False,
+        verbose_name="Faker provider",
+    )
     provider_offset = PositiveSmallIntegerField()
     content = CharField(max_length=255, verbose_name="Fake content")
+    # typed copies of the content, set if the provider generated a value of the respective type
+    content_int = BigIntegerField(null=True, verbose_name="Fake content as integer")
+    content_decimal = DecimalField(
+        max_digits=65,
+        decimal_places=30,
+        null=True,
+        verbose_name="Fake content as decimal",
+    )
+    content_date = DateField(null=True, verbose_name="Fake content as date")
+    content_datetime = DateTimeField(null=True, verbose_name="Fake content as datetime")
 
     objects = FakeDataManager()
 
     class Meta:
-        indexes: ClassVar[list[Index]] = [
-            Index(fields=["provider", "provider_offset"]),
+        constraints: ClassVar[list[UniqueConstraint]] = [
+            UniqueConstraint(fields=["provider", "provider_offset"], name="django_scrubber_fakedata_provider_offset"),
         ]
-        unique_together = (("provider", "provider_offset"),)
 
     def __str__(self):
         return f"{self.provider}: '{self.content}'"
+
+
+class ScrubRun(Model):
+    started = DateTimeField(auto_now_add=True, verbose_name="Started at")
+    finished = DateTimeField(null=True, verbose_name="Finished at")
+    options = JSONField(default=dict, verbose_name="Command options")
+
+    def __str__(self):
+        return f"Scrub run started at {self.started}"
+
+
+class ScrubCheckpoint(Model):
+    run = ForeignKey(ScrubRun, on_delete=CASCADE, related_name="checkpoints", db_index=False)
+    model = CharField(max_length=255, verbose_name="Model label")
+    shard = CharField(max_length=255, blank=True, verbose_name="Primary key range of the shard")
+    # the primary key of the last row of the last completed batch
+    last_pk = CharField(max_length=255, null=True, verbose_name="Last scrubbed primary key")  # noqa: DJ001
+    completed = BooleanField(default=False)
+
+    class Meta:
+        constraints: ClassVar[list[UniqueConstraint]] = [
+            UniqueConstraint(fields=["run", "model", "shard"], name="django_scrubber_scrubcheckpoint_shard"),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.shard}".strip()
+
+
+class ScrubWatermark(Model):
+    model = CharField(max_length=255, unique=True, verbose_name="Model label")
+    field = CharField(max_length=255, verbose_name="Incremental field")
+    # the highest value of the field scrubbed so far
+    value = CharField(max_length=255, verbose_name="Watermark")
+
+    def __str__(self):
+        return f"{self.model}.{self.field} <= {self.value}"
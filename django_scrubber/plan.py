@@ -0,0 +1,136 @@
+"""
+The scrubbers of all models, resolved once and shared by scrub_data, scrub_validation and strict mode.
+"""
+
+import importlib
+import warnings
+from inspect import getmembers
+
+from django.core.exceptions import FieldDoesNotExist
+
+from . import settings_with_fallback
+from .scrubbers import Keep
+
+
+class ScrubPlan:
+    """
+    Maps the fields of every model to the scrubbers resolved for them from SCRUBBER_GLOBAL_SCRUBBERS, SCRUBBER_MAPPING
+    and the model's own scrubbers class. Models are resolved once they are needed, and scrubbers are not realized yet,
+    so a plan neither queries the database nor generates Faker data.
+    """
+
+    def __init__(self):
+        # (scrubbers by field name, names of the fields declared on the model's scrubbers class) by model label
+        self.models = {}
+
+    def _add(self, model):
+        model_scrubbers = _get_model_scrubbers(model)
+        scrubbers = _get_scrubbers(
+            model,
+            settings_with_fallback("SCRUBBER_APPS_LIST"),
+            settings_with_fallback("SCRUBBER_GLOBAL_SCRUBBERS"),
+            model_scrubbers,
+        )
+        self.models[model._meta.label] = (
+            {field.name: scrubber for field, scrubber in scrubbers.items()},
+            tuple(field.name for field in model_scrubbers),
+        )
+
+    def get_scrubbers(self, model):
+        """
+        The scrubbers to be applied to the model, by field. Empty for skipped models.
+        """
+        if model._meta.label not in self.models:
+            self._add(model)
+        return {model._meta.get_field(name): scrubber for name, scrubber in self.models[model._meta.label][0].items()}
+
+    def get_declared_fields(self, model):
+        """
+        The names of the fields the model's scrubbers class declares a scrubber for, including kept fields.
+        """
+        if model._meta.label not in self.models:
+            self._add(model)
+        return self.models[model._meta.label][1]
+
+
+def _get_scrubbers(model_class, scrubber_apps_list, global_scrubbers, model_scrubbers=None):
+    """
+    Resolve the scrubbers to be applied to a model, mapped by field. Returns an empty dict for skipped models.
+    The model's own scrubbers can be passed if they have been resolved already.
+    """
+    if (
+        model_class._meta.proxy
+        # the scrubber's own bookkeeping, which a run relies on while scrubbing
+        or model_class._meta.app_label == "django_scrubber"
+        or (settings_with_fallback("SCRUBBER_SKIP_UNMANAGED") and not model_class._meta.managed)
+        or (scrubber_apps_list and model_class._meta.app_config.name not in scrubber_apps_list)
+    ):
+        return {}
+
+    scrubbers = {}
+    for field in model_class._meta.fields:
+        if field.name in global_scrubbers:
+            scrubbers[field] = global_scrubbers[field.name]
+        elif type(field) in global_scrubbers:
+            scrubbers[field] = global_scrubbers[type(field)]
+
+    scrubbers.update(_get_model_scrubbers(model_class) if model_scrubbers is None else model_scrubbers)
+
+    # Filter out all fields marked as "to be kept"
+    scrubbers_without_kept_fields = {}
+    for field, scrubbing_method in scrubbers.items():
+        if scrubbing_method != Keep:
+            scrubbers_without_kept_fields[field] = scrubbing_method
+    return scrubbers_without_kept_fields
+
+
+def _parse_scrubber_class_from_string(path: str):
+    """
+    Takes a string to a certain scrubber class and returns a python class definition - not an instance.
+    """
+    try:
+        module_name, class_name = path.rsplit(".", 1)
+        module = importlib.import_module(module_name)
+        return getattr(module, class_name)
+    except (ImportError, ValueError) as e:
+        raise ImportError(f'Mapped scrubber class "{path}" could not be found.') from e
+
+
+def _get_scrubber_class(model):
+    # Get model-scrubber-mapping from settings
+    scrubber_mapping = settings_with_fallback("SCRUBBER_MAPPING")
+
+    # Check if model has a settings-defined...
+    if model._meta.label in scrubber_mapping:
+        return _parse_scrubber_class_from_string(scrubber_mapping[model._meta.label])
+
+    # If not, try to get the scrubber metaclass from the given model
+    return getattr(model, "Scrubbers", None)
+
+
+def _get_model_scrubbers(model):
+    # Initialise scrubber list
+    scrubbers = {}
+
+    scrubber_cls = _get_scrubber_class(model)
+    if scrubber_cls is None:
+        return scrubbers  # no model-specific scrubbers
+
+    # Get field mappings from scrubber class
+    for k, v in _get_fields(scrubber_cls):
+        try:
+            field = model._meta.get_field(k)
+            scrubbers[field] = v
+        except FieldDoesNotExist:
+            warnings.warn(f"Scrubber defined for {model.__name__}.{k} but field does not exist", stacklevel=2)
+
+    # Return scrubber-field-mapping
+    return scrubbers
+
+
+def _get_fields(d):
+    """
+    Helper to get "normal" (i.e.: non-magic, non-dunder and non-Meta) instance attributes.
+    Returns an iterator of (field_name, field) tuples.
+    """
+    return ((k, v) for k, v in getmembers(d) if not k.startswith("_") and k != "Meta")
@@ -1,17 +1,41 @@
+import copy
+import datetime as dt
+import hashlib
 import importlib
+import itertools
+import json
 import logging
+import threading
+import time
 from builtins import str as text
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
 from typing import ClassVar
 
 import faker
-from django.db import connections, router
-from django.db.models import Case, ExpressionWrapper, F, Field, Func, OuterRef, Q, Subquery, Value, When
-from django.db.models.functions import Cast
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import (
+    Case,
+    CharField,
+    Expression,
+    ExpressionWrapper,
+    F,
+    Field,
+    Func,
+    OuterRef,
+    Q,
+    Subquery,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce
 from django.db.models.functions import Concat as DjangoConcat
 from django.db.utils import IntegrityError
+from django.utils import timezone
 from django.utils.translation import get_language, to_locale
 
-from . import ScrubberInitError, settings_with_fallback
+from . import ScrubberInitError, db_for_write, settings_with_fallback, signals
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +52,7 @@ class FieldFunc(Func):
         if isinstance(field, Field):
             super().__init__(field.name, *args, **kwargs)
             self.extra.update(field.__dict__)
-            self.connection_setup(connections[router.db_for_write(field.model)])
+            self.connection_setup(connections[db_for_write(field.model)])
         else:
             super().__init__(field, *args, **kwargs)
 
@@ -168,89 +192,324 @@ class Concat:
         return DjangoConcat(*realized_expressions, **self.kwargs)
 
 
+def _get_locale():
+    # get locale from config and fall back to django's default one
+    locale = settings_with_fallback("SCRUBBER_FAKER_LOCALE")
+    if not locale:
+        locale = to_locale(get_language())
+    return locale
+
+
+def _get_faker_instance(locale, additional_providers):
+    faker_instance = faker.Faker(locale=locale)
+
+    # load additional faker providers
+    for provider_name in additional_providers:
+        # try to load module
+        try:
+            module_name, class_name = text(provider_name).rsplit(".", 1)
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            raise ScrubberInitError(
+                f"module not found for provider defined in SCRUBBER_ADDITIONAL_FAKER_PROVIDERS: {provider_name}",
+            ) from e
+
+        # add provider to faker instance
+        provider = getattr(module, class_name, None)
+        if provider is None:
+            raise ScrubberInitError(
+                "faker provider not found for provider defined in "
+                f"SCRUBBER_ADDITIONAL_FAKER_PROVIDERS: {provider_name}",
+            )
+        faker_instance.add_provider(provider)
+
+    return faker_instance
+
+
+def _generate_fake_data_chunk(faker_scrubber, locale, additional_providers, seed, size):
+    """
+    Generate a chunk of fake data in a worker process.
+    Everything needed is passed explicitly, as django settings might not be configured in the worker.
+    """
+    faker_instance = _get_faker_instance(locale, additional_providers)
+    faker_instance.seed_instance(seed)
+    return faker_scrubber._format(faker_instance, size)
+
+
+def _generate_distinct_fake_data(unique_faker_scrubber, locale, additional_providers, seed, size, max_length):
+    """
+    Generate all distinct fake data of a UniqueFaker scrubber in a worker process, like `_generate_fake_data_chunk`.
+    """
+    faker_instance = _get_faker_instance(locale, additional_providers)
+    faker_instance.seed_instance(seed)
+    return list(itertools.islice(unique_faker_scrubber._generate_distinct(faker_instance, max_length), size))
+
+
+def _get_typed_content(value):
+    """
+    Map a value generated by Faker to the typed content column of FakeData it fits into, if any.
+    """
+    if isinstance(value, bool):
+        return {}
+    if isinstance(value, int):
+        return {"content_int": value} if -(2**63) <= value < 2**63 else {}
+    if isinstance(value, Decimal):
+        return {"content_decimal": value} if value.is_finite() and abs(value) < 10**35 else {}
+    if isinstance(value, dt.datetime):
+        if settings.USE_TZ and timezone.is_naive(value):
+            value = timezone.make_aware(value, dt.timezone.utc)
+        elif not settings.USE_TZ and timezone.is_aware(value):
+            value = timezone.make_naive(value, dt.timezone.utc)
+        return {"content_datetime": value}
+    if isinstance(value, dt.date):
+        return {"content_date": value}
+    return {}
+
+
 class Faker:
-    INITIALIZED_PROVIDERS: ClassVar[set[str]] = set()
+    # (database alias, provider key) of all providers whose data is ready
+    INITIALIZED_PROVIDERS: ClassVar[set[tuple[str, str]]] = set()
+    DEFERRED_PROVIDERS: ClassVar[dict[str, "Faker"] | None] = None
+    # held while deferring, so threads scrubbing different databases don't initialize each other's providers
+    DEFERRED_LOCK: ClassVar[threading.Lock] = threading.Lock()
+    # typed content columns of FakeData, by internal type of the scrubbed field
+    TYPED_CONTENT_COLUMNS: ClassVar[dict[str, str]] = {
+        "BigIntegerField": "content_int",
+        "IntegerField": "content_int",
+        "PositiveBigIntegerField": "content_int",
+        "PositiveIntegerField": "content_int",
+        "PositiveSmallIntegerField": "content_int",
+        "SmallIntegerField": "content_int",
+        "DecimalField": "content_decimal",
+        "DateField": "content_date",
+        "DateTimeField": "content_datetime",
+    }
 
     def __init__(self, provider, *args, **kwargs):
         self.provider = provider
         self.provider_args = args
         self.provider_kwargs = kwargs
-        args_hash = hash(self.provider_args) ^ hash(tuple(self.provider_kwargs.items()))
-        self.provider_key = f"{self.provider} - {args_hash}"
+        # unlike hash(), the digest is stable across processes, so generated data can be reused by later runs
+        args_digest = hashlib.sha256(repr((args, sorted(kwargs.items()))).encode()).hexdigest()[:16]
+        self.provider_key = f"{self.provider} - {args_digest}"
 
-    def _initialize_data(self):
-        from .models import FakeData  # noqa: PLC0415
+    def _get_fingerprint(self, locale):
+        """
+        Digest of everything that influences the generated data. Stored alongside the data, so an unchanged pool can
+        be reused instead of being regenerated.
+        """
+        return hashlib.sha256(
+            repr(
+                (
+                    self.provider,
+                    self.provider_args,
+                    sorted(self.provider_kwargs.items()),
+                    settings_with_fallback("SCRUBBER_RANDOM_SEED"),
+                    locale,
+                    settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"),
+                    faker.VERSION,
+                    sorted(settings_with_fallback("SCRUBBER_ADDITIONAL_FAKER_PROVIDERS")),
+                    # chunked generation yields different data than generating it in one go
+                    settings_with_fallback("SCRUBBER_FAKER_CHUNK_SIZE")
+                    if settings_with_fallback("SCRUBBER_FAKER_PROCESSES")
+                    else None,
+                ),
+            ).encode(),
+        ).hexdigest()
+
+    def _is_initialized(self, fingerprint, reuse_unseeded=False):
+        from .models import FakeData, FakeDataProvider  # noqa: PLC0415
+
+        # without a fixed seed, every scrubbing is meant to generate new data, unless continuing an interrupted one
+        if settings_with_fallback("SCRUBBER_RANDOM_SEED") is None and not reuse_unseeded:
+            return False
+
+        using = db_for_write(FakeData)
+        if not FakeDataProvider.objects.using(using).filter(key=self.provider_key, fingerprint=fingerprint).exists():
+            return False
+
+        # make sure the data is complete, it might have been removed in the meantime
+        entries = settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")
+        return FakeData.objects.using(using).filter(provider__key=self.provider_key).count() == entries
 
-        # get locale from config and fall back to django's default one
-        locale = settings_with_fallback("SCRUBBER_FAKER_LOCALE")
-        if not locale:
-            locale = to_locale(get_language())
-        faker_instance = faker.Faker(locale=locale)
+    @classmethod
+    @contextmanager
+    def deferred_initialization(cls, initialize=True, reuse_unseeded=False):
+        """
+        Collect the providers of all Faker scrubbers realized within this context and initialize them together when
+        leaving it, which allows generating the data of all providers concurrently.
+        With `initialize=False`, the providers are not initialized at all, e.g. to inspect the resulting queries.
+        With `reuse_unseeded=True`, data is reused even without SCRUBBER_RANDOM_SEED, e.g. to resume a scrubbing.
 
-        # load additional faker providers
-        for provider_name in settings_with_fallback("SCRUBBER_ADDITIONAL_FAKER_PROVIDERS"):
-            # try to load module
+        Yields a dict, which is filled with the initialization time of every provider by key once leaving the context.
+        """
+        with cls.DEFERRED_LOCK:
+            cls.DEFERRED_PROVIDERS = {}
+            timings = {}
             try:
-                module_name, class_name = text(provider_name).rsplit(".", 1)
-                module = importlib.import_module(module_name)
-            except Exception as e:
-                raise ScrubberInitError(
-                    f"module not found for provider defined in SCRUBBER_ADDITIONAL_FAKER_PROVIDERS: {provider_name}",
-                ) from e
-
-            # add provider to faker instance
-            provider = getattr(module, class_name, None)
-            if provider is None:
-                raise ScrubberInitError(
-                    "faker provider not found for provider defined in "
-                    f"SCRUBBER_ADDITIONAL_FAKER_PROVIDERS: {provider_name}",
-                )
-            faker_instance.add_provider(provider)
+                yield timings
+                deferred = list(cls.DEFERRED_PROVIDERS.values())
+            finally:
+                cls.DEFERRED_PROVIDERS = None
+            if initialize:
+                cls._initialize_many(deferred, timings, reuse_unseeded)
+
+    def _initialize_data(self):
+        self._initialize_many([self])
 
-        provider_args_str = ", ".join(str(i) for i in self.provider_args)
-        provider_kwargs_str = ", ".join(f"{k}={v}" for k, v in self.provider_kwargs.items())
+    @classmethod
+    def _initialize_many(cls, faker_scrubbers, timings=None, reuse_unseeded=False):
+        """
+        Initialize the data of the given Faker scrubbers, recording how long each provider took in `timings`.
+        """
+        timings = {} if timings is None else timings
+        locale = _get_locale()
+
+        pending = []
+        for faker_scrubber in faker_scrubbers:
+            started = time.monotonic()
+            signals.faker_provider_started.send(sender=cls, provider_key=faker_scrubber.provider_key)
+            fingerprint = faker_scrubber._get_fingerprint(locale)
+            if faker_scrubber._is_initialized(fingerprint, reuse_unseeded):
+                faker_scrubber._log("Reusing fake scrub data for provider %s(%s, %s)")
+                cls.INITIALIZED_PROVIDERS.add(faker_scrubber._initialized_key)
+                faker_scrubber._finish_initialization(time.monotonic() - started, timings, reused=True)
+            else:
+                pending.append((faker_scrubber, fingerprint, time.monotonic() - started))
+
+        processes = settings_with_fallback("SCRUBBER_FAKER_PROCESSES")
+        if not pending or not processes:
+            for faker_scrubber, fingerprint, check_duration in pending:
+                faker_scrubber._log("Initializing fake scrub data for provider %s(%s, %s)")
+                started = time.monotonic()
+                faker_scrubber._store_data(faker_scrubber._generate_data(locale), fingerprint)
+                faker_scrubber._finish_initialization(check_duration + time.monotonic() - started, timings)
+            return
+
+        # generate chunks of all pending providers at once, then store them provider by provider
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunk_futures = [faker_scrubber._submit_chunks(executor, locale) for faker_scrubber, _, _ in pending]
+            for (faker_scrubber, fingerprint, check_duration), futures in zip(pending, chunk_futures, strict=True):
+                faker_scrubber._log("Initializing fake scrub data for provider %s(%s, %s) in %s chunks", len(futures))
+                # includes waiting for the provider's chunks, which are generated concurrently to preceding providers
+                started = time.monotonic()
+                faker_scrubber._store_data((content for future in futures for content in future.result()), fingerprint)
+                faker_scrubber._finish_initialization(check_duration + time.monotonic() - started, timings)
+
+    def _finish_initialization(self, duration, timings, reused=False):
+        timings[self.provider_key] = {"duration": duration, "reused": reused}
+        signals.faker_provider_finished.send(
+            sender=type(self),
+            provider_key=self.provider_key,
+            duration=duration,
+            reused=reused,
+        )
+
+    def _log(self, message, *args):
         logger.info(
-            "Initializing fake scrub data for provider %s(%s, %s)",
+            message,
             self.provider,
-            provider_args_str,
-            provider_kwargs_str,
+            ", ".join(str(i) for i in self.provider_args),
+            ", ".join(f"{k}={v}" for k, v in self.provider_kwargs.items()),
+            *args,
         )
-        # TODO: maybe be a bit smarter and only regenerate if needed?
-        FakeData.objects.filter(provider=self.provider_key).delete()
+
+    def _generate_data(self, locale):
+        """
+        Lazily generate the data, so it can be stored while it is being generated.
+        """
+        faker_instance = _get_faker_instance(locale, settings_with_fallback("SCRUBBER_ADDITIONAL_FAKER_PROVIDERS"))
 
         # if we don't reset the seed for each provider, registering a new one might change all
         # data for subsequent providers
         faker.Generator.seed(settings_with_fallback("SCRUBBER_RANDOM_SEED"))
 
-        fakedata: list[FakeData] = [
-            FakeData(
-                provider=self.provider_key,
-                provider_offset=i,
-                content=str(faker_instance.format(self.provider, *self.provider_args, **self.provider_kwargs)),
+        for _ in range(settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")):
+            yield faker_instance.format(self.provider, *self.provider_args, **self.provider_kwargs)
+
+    def _format(self, faker_instance, size):
+        return [faker_instance.format(self.provider, *self.provider_args, **self.provider_kwargs) for _ in range(size)]
+
+    def _submit_chunks(self, executor, locale):
+        """
+        Split the data to be generated into chunks of SCRUBBER_FAKER_CHUNK_SIZE entries, each seeded by its position.
+        This way the generated data does not depend on the number of worker processes.
+        """
+        seed = settings_with_fallback("SCRUBBER_RANDOM_SEED")
+        entries = settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")
+        chunk_size = settings_with_fallback("SCRUBBER_FAKER_CHUNK_SIZE")
+        return [
+            executor.submit(
+                _generate_fake_data_chunk,
+                self,
+                locale,
+                tuple(settings_with_fallback("SCRUBBER_ADDITIONAL_FAKER_PROVIDERS")),
+                None if seed is None else f"{seed}-{self.provider_key}-{start}",
+                min(chunk_size, entries - start),
             )
-            for i in range(settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"))
+            for start in range(0, entries, chunk_size)
         ]
 
+    def _build_fake_data(self, provider, contents):
+        from .models import FakeData  # noqa: PLC0415
+
         # check if fake data is fitting our data structure
         # warn and truncate if not
         max_length: int = FakeData._meta.get_field("content").max_length
-        if any(len(item.content) > max_length for item in fakedata):
-            logger.warning(
-                "Fake data content exceeds max length of %s characters. "
-                "django-scrubber will automatically truncate it. "
-                "This might however lead to invalid data, e.g. cut off email addresses",
-                max_length,
-            )
-            [setattr(x, "content", x.content[:max_length]) for x in fakedata]
+        truncated = False
+        for i, value in enumerate(contents):
+            content = str(value)
+            if len(content) > max_length:
+                if not truncated:
+                    logger.warning(
+                        "Fake data content exceeds max length of %s characters. "
+                        "django-scrubber will automatically truncate it. "
+                        "This might however lead to invalid data, e.g. cut off email addresses",
+                        max_length,
+                    )
+                    truncated = True
+                content = content[:max_length]
+            yield FakeData(provider=provider, provider_offset=i, content=content, **_get_typed_content(value))
+
+    def _store_data(self, contents, fingerprint):
+        """
+        Store the data while consuming it, in batches of SCRUBBER_FAKER_INSERT_BATCH_SIZE entries.
+        """
+        from .models import FakeData, FakeDataProvider  # noqa: PLC0415
+        from .sql import bulk_insert  # noqa: PLC0415
 
+        using = db_for_write(FakeData)
+        batch_size = settings_with_fallback("SCRUBBER_FAKER_INSERT_BATCH_SIZE")
         try:
-            FakeData.objects.bulk_create(fakedata)
+            with transaction.atomic(using=using):
+                provider, _ = FakeDataProvider.objects.using(using).update_or_create(
+                    key=self.provider_key,
+                    defaults={"fingerprint": fingerprint},
+                )
+                FakeData.objects.using(using).filter(provider=provider).delete()
+                fakedata = self._build_fake_data(provider, contents)
+                while batch := list(itertools.islice(fakedata, batch_size)):
+                    bulk_insert(batch, using)
         except IntegrityError as e:
             raise ScrubberInitError(
                 f"Integrity error initializing faker data ({e}); maybe decrease SCRUBBER_ENTRIES_PER_PROVIDER?",
             ) from e
 
-        self.INITIALIZED_PROVIDERS.add(self.provider_key)
+        self.INITIALIZED_PROVIDERS.add(self._initialized_key)
+        FakerInline.clear_cache(self.provider_key)
+
+    @property
+    def _initialized_key(self):
+        from .models import FakeData  # noqa: PLC0415
+
+        return db_for_write(FakeData), self.provider_key
+
+    def _request_initialization(self):
+        if self._initialized_key not in self.INITIALIZED_PROVIDERS:
+            if self.DEFERRED_PROVIDERS is None:
+                self._initialize_data()
+            else:
+                self.DEFERRED_PROVIDERS.setdefault(self.provider_key, self)
 
     def __call__(self, field):
         """
@@ -258,26 +517,280 @@ class Faker:
 
         The Faker scrubber ignores the field parameter.
         """
-        if self.provider_key not in self.INITIALIZED_PROVIDERS:
-            self._initialize_data()
+        self._request_initialization()
+
+        db_connection = connections[db_for_write(field.model)]
+        if (
+            settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")
+            <= settings_with_fallback(
+                "SCRUBBER_FAKER_INLINE_MAX_ENTRIES",
+            )
+            and db_connection.vendor in FakerInline.VENDORS
+        ):
+            return Cast(FakerInline(self.provider_key, F("mod_pk")), field)
+
+        strategy = settings_with_fallback("SCRUBBER_FAKER_UPDATE_STRATEGY")
+        if strategy == "join":
+            from .sql import supports_update_join  # noqa: PLC0415
+
+            if supports_update_join(db_connection):
+                return Cast(FakerLookup(self.provider_key), field)
+        elif strategy != "subquery":
+            raise ScrubberInitError(f"Unsupported SCRUBBER_FAKER_UPDATE_STRATEGY '{strategy}'")
 
         # import it here to enable global scrubbers in settings.py
+        from .models import FakeData, FakeDataProvider  # noqa: PLC0415
+
+        fakedata = FakeData.objects.filter(
+            provider=Subquery(FakeDataProvider.objects.filter(key=self.provider_key).values("pk")),
+            provider_offset=OuterRef("mod_pk"),
+        )
+        typed_column = self.TYPED_CONTENT_COLUMNS.get(field.get_internal_type())
+        if typed_column is None:
+            return Cast(Subquery(fakedata.values("content")[:1]), field)
+
+        # only data generated with another type needs to be cast
+        return Subquery(
+            fakedata.values(typed_content=Coalesce(typed_column, Cast("content", field), output_field=field))[:1],
+        )
+
+
+class UniqueFaker(Faker):
+    """
+    Faker scrubber for fields with a unique constraint, which generates a pool of distinct values and assigns them to
+    the rows of a table by their rank in primary key order. Once a table has more rows than the pool has entries, the
+    pool is reused with a suffix counting how often it has been used up, e.g. "jdoe" becomes "jdoe~1".
+
+    Rows are ranked by a window function, once per run by `scrub_data`, and joined into the update, which requires
+    UPDATE ... FROM, i.e. PostgreSQL, MySQL 8 or SQLite >= 3.33. As values depend on the rank within the whole table,
+    tables with UniqueFaker scrubbers can't be scrubbed incrementally.
+    """
+
+    # never part of the generated values, so suffixed values can't collide with other ones
+    SEPARATOR = "~"
+    # like faker's own unique proxy, give up once that many values in a row have been generated before
+    MAX_ATTEMPTS = 1000
+
+    def __init__(self, provider, *args, **kwargs):
+        super().__init__(provider, *args, **kwargs)
+        # the values of a plain Faker scrubber with the same arguments aren't distinct
+        self.provider_key = f"{self.provider_key} - unique"
+        # the length values are cut to, see `_for_field`
+        self.max_length = None
+
+    def _for_field(self, field):
+        """
+        A copy of this scrubber whose values are distinct within the field's max_length, with a pool of its own.
+        """
+        max_length = self._get_max_length()
+        if field.max_length:
+            max_length = min(max_length, field.max_length)
+        scrubber = copy.copy(self)
+        scrubber.max_length = max_length
+        scrubber.provider_key = f"{self.provider_key} {max_length}"
+        return scrubber
+
+    def _get_max_length(self):
         from .models import FakeData  # noqa: PLC0415
 
-        return Cast(
-            Subquery(
-                FakeData.objects.filter(
-                    provider=self.provider_key,
-                    provider_offset=OuterRef("mod_pk"),
-                ).values("content")[:1],
+        return self.max_length or FakeData._meta.get_field("content").max_length
+
+    def _generate_distinct(self, faker_instance, max_length):
+        seen = set()
+        attempts = 0
+        while True:
+            value = faker_instance.format(self.provider, *self.provider_args, **self.provider_kwargs)
+            # content is cut to the field's length, which must not make values collide either
+            content = str(value)[:max_length]
+            if content in seen or self.SEPARATOR in content:
+                attempts += 1
+                if attempts >= self.MAX_ATTEMPTS:
+                    raise ScrubberInitError(
+                        f"Faker provider {self.provider} did not generate a new distinct value in {attempts} "
+                        f"attempts, after {len(seen)} values; maybe decrease SCRUBBER_ENTRIES_PER_PROVIDER?",
+                    )
+                continue
+            attempts = 0
+            seen.add(content)
+            yield content
+
+    def _generate_data(self, locale):
+        faker_instance = _get_faker_instance(locale, settings_with_fallback("SCRUBBER_ADDITIONAL_FAKER_PROVIDERS"))
+        faker.Generator.seed(settings_with_fallback("SCRUBBER_RANDOM_SEED"))
+        return itertools.islice(
+            self._generate_distinct(faker_instance, self._get_max_length()),
+            settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"),
+        )
+
+    def _submit_chunks(self, executor, locale):
+        """
+        Values of separately generated chunks may collide, so all data is generated as a single chunk.
+        It is still generated concurrently to the data of other providers.
+        """
+        seed = settings_with_fallback("SCRUBBER_RANDOM_SEED")
+        return [
+            executor.submit(
+                _generate_distinct_fake_data,
+                self,
+                locale,
+                tuple(settings_with_fallback("SCRUBBER_ADDITIONAL_FAKER_PROVIDERS")),
+                None if seed is None else f"{seed}-{self.provider_key}-0",
+                settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER"),
+                self._get_max_length(),
             ),
-            field,
+        ]
+
+    def __call__(self, field):
+        """
+        Lazily instantiate the lookup of the ranked data, which is joined into the update by `scrub_data`.
+        Its values are not cast to the field, so databases refuse suffixed values exceeding the field's max_length
+        instead of cutting off the suffix.
+        """
+        from .sql import supports_update_join  # noqa: PLC0415
+
+        scrubber = self._for_field(field)
+        scrubber._request_initialization()
+
+        db_connection = connections[db_for_write(field.model)]
+        if not supports_update_join(db_connection):
+            raise ScrubberInitError(
+                f"UniqueFaker requires UPDATE ... FROM, which is not supported by '{db_connection.vendor}'",
+            )
+        entries = settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")
+        return UniqueFakerLookup(scrubber.provider_key, entries, output_field=field)
+
+
+class FakerLookup(Expression):
+    """
+    Reference to the data of a Faker provider, as joined into the UPDATE statement by the "join" update strategy.
+    Only valid within statements built by `django_scrubber.sql.update_with_join`.
+    """
+
+    TABLE_ALIAS = "scrubber_fake_data"
+    OFFSET_COLUMN = "scrubber_offset"
+
+    def __init__(self, provider_key, output_field=None):
+        super().__init__(output_field=output_field or CharField())
+        self.provider_key = provider_key
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.provider_key!r})"
+
+    @property
+    def column(self):
+        return f"provider_{hashlib.sha256(self.provider_key.encode()).hexdigest()[:16]}"
+
+    def as_sql(self, compiler, connection):
+        return f"{connection.ops.quote_name(self.TABLE_ALIAS)}.{connection.ops.quote_name(self.column)}", []
+
+
+class UniqueFakerLookup(FakerLookup):
+    """
+    Reference to the data of a UniqueFaker provider, as joined into the UPDATE statement by offset of the row's rank
+    within its table, suffixed once the rank exceeds the provider's entries.
+    Only valid within statements built by `django_scrubber.sql.update_with_join`.
+    """
+
+    TABLE_ALIAS = "scrubber_unique_fake_data"
+    RANK_TABLE_ALIAS = "scrubber_rank"
+    RANK_COLUMN = "scrubber_rank"
+    PK_COLUMN = "scrubber_pk"
+
+    def __init__(self, provider_key, entries, rank_table=None, output_field=None):
+        super().__init__(provider_key, output_field=output_field)
+        self.entries = entries
+        # the ranks materialized by `django_scrubber.sql.rank_rows`; ranked by the statement itself if None
+        self.rank_table = rank_table
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.provider_key!r}, {self.entries!r})"
+
+    def as_sql(self, compiler, connection):
+        qn = connection.ops.quote_name
+        content, _ = super().as_sql(compiler, connection)
+        rank = f"{qn(self.RANK_TABLE_ALIAS)}.{qn(self.RANK_COLUMN)}"
+        entries = int(self.entries)
+        if connection.vendor == "mysql":
+            suffixed = f"CONCAT({content}, %s, {rank} DIV {entries})"
+        else:
+            suffixed = f"({content} || %s || CAST({rank} / {entries} AS TEXT))"
+        return f"CASE WHEN {rank} < {entries} THEN {content} ELSE {suffixed} END", [UniqueFaker.SEPARATOR]
+
+
+class FakerInline(Func):
+    """
+    Looks up the data of a Faker provider in a JSON array embedded into the statement, indexed by the row's offset.
+    This avoids any table access for small amounts of data, see SCRUBBER_FAKER_INLINE_MAX_ENTRIES.
+    """
+
+    VENDORS = ("mysql", "postgresql", "sqlite")
+    # the data to be inlined, by database alias and provider key
+    CACHE: ClassVar[dict[tuple[str, str], str]] = {}
+    output_field = CharField()
+
+    def __init__(self, provider_key, offset, **extra):
+        super().__init__(offset, **extra)
+        self.provider_key = provider_key
+
+    @classmethod
+    def clear_cache(cls, provider_key):
+        for cache_key in [cache_key for cache_key in cls.CACHE if cache_key[1] == provider_key]:
+            del cls.CACHE[cache_key]
+
+    def _get_data(self, db_connection):
+        from .models import FakeData  # noqa: PLC0415
+
+        cache_key = (db_connection.alias, self.provider_key)
+        if cache_key in self.CACHE:
+            return self.CACHE[cache_key]
+
+        contents = list(
+            FakeData.objects.using(db_connection.alias)
+            .filter(provider__key=self.provider_key)
+            .order_by("provider_offset")
+            .values_list("content", flat=True),
+        )
+        # don't cache the data of providers which are not initialized yet
+        if not contents:
+            return json.dumps(contents)
+        self.CACHE[cache_key] = json.dumps(contents)
+        return self.CACHE[cache_key]
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        # the placeholder for the data precedes the offset expression in all templates
+        return sql, (self._get_data(connection), *params)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="JSON_EXTRACT(%%s, '$[' || %(expressions)s || ']')",
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="JSON_UNQUOTE(JSON_EXTRACT(%%s, CONCAT('$[', %(expressions)s, ']')))",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler,
+            connection,
+            template="(CAST(%%s AS jsonb) ->> CAST(%(expressions)s AS integer))",
+            **extra_context,
         )
 
 
 class FakerArray:
     """
     Callable scrubber for ArrayField: generates a fixed-size list of fake values using the given faker provider.
+    Elements are drawn from the data of the provider like `Faker` does, by the row's offset, so every row gets its
+    own array and scrubbing is reproducible. PostgreSQL only.
 
     Usage::
 
@@ -297,16 +810,97 @@ class FakerArray:
         self.kwargs = kwargs
 
     def __call__(self, field):
+        from django.contrib.postgres.expressions import ArraySubquery  # noqa: PLC0415
+
+        from .models import FakeData, FakeDataProvider  # noqa: PLC0415
+
         provider = self.provider or self.PROVIDER_DEFAULTS.get(field.base_field.get_internal_type())
 
         if provider is None:
             raise ValueError(f"No default faker provider for {field.base_field}")
 
-        generate = getattr(faker.Faker(), provider)
-        return Value(
-            [generate(**self.kwargs) for _ in range(self.count)],
-            output_field=field,
+        entries = settings_with_fallback("SCRUBBER_ENTRIES_PER_PROVIDER")
+        if self.count > entries:
+            raise ScrubberInitError(f"FakerArray count {self.count} exceeds SCRUBBER_ENTRIES_PER_PROVIDER {entries}")
+
+        faker_scrubber = Faker(provider, **self.kwargs)
+        faker_scrubber._request_initialization()
+
+        # the elements of a row are consecutive entries, wrapping around at the end of the data
+        first_offset = OuterRef("mod_pk") * self.count
+        base_field = field.base_field
+        typed_column = Faker.TYPED_CONTENT_COLUMNS.get(base_field.get_internal_type())
+        element = Cast("content", base_field)
+        if typed_column is not None:
+            element = Coalesce(typed_column, element, output_field=base_field)
+        elements = (
+            FakeData.objects.filter(
+                provider=Subquery(FakeDataProvider.objects.filter(key=faker_scrubber.provider_key).values("pk")),
+                provider_offset__in=[(first_offset + i) % entries for i in range(self.count)],
+            )
+            .annotate(position=((F("provider_offset") - first_offset) % entries + entries) % entries)
+            .order_by("position")
+            .values(element=element)
         )
+        return ArraySubquery(elements, output_field=field)
+
+
+class PythonScrubber:
+    """
+    Scrubber running a Python function on the value of every row, for anything that can't be expressed in SQL.
+    The function is called with the current value, and the values of the given other fields as keyword arguments.
+    Unlike other scrubbers, it is not compiled into the update, but applied by `scrub_data` once all SQL-based
+    scrubbers of the model are done, so other fields have already been scrubbed.
+
+    Usage::
+
+        class Scrubbers:
+            description = PythonScrubber(redact_email_addresses)
+            username = PythonScrubber(make_username, fields=("first_name", "last_name"))
+    """
+
+    def __init__(self, function, fields=()):
+        self.function = function
+        self.fields = tuple(fields)
+
+    def __call__(self, field):
+        return PythonTransform(self.function, field.name, self.fields)
+
+
+class PythonTransform:
+    """
+    A PythonScrubber realized for a field, applied to rows read by `scrub_data`.
+    """
+
+    def __init__(self, function, field_name, fields):
+        self.function = function
+        self.field_name = field_name
+        self.fields = fields
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({getattr(self.function, '__qualname__', self.function)!r})"
+
+    @property
+    def columns(self):
+        return (self.field_name, *self.fields)
+
+    def apply(self, row):
+        return self.function(row[self.field_name], **{name: row[name] for name in self.fields})
+
+
+def apply_python_transforms(transforms, columns, rows):
+    """
+    Apply the transforms to rows holding the given columns, the first one being the primary key.
+    Returns `(pk, values)` tuples of the rows any transform changed, with a value per transform.
+    Runs in worker processes with SCRUBBER_PYTHON_PROCESSES, so everything needed is passed explicitly.
+    """
+    changes = []
+    for row in rows:
+        values = dict(zip(columns, row, strict=True))
+        scrubbed = tuple(transform.apply(values) for transform in transforms)
+        if scrubbed != tuple(values[transform.field_name] for transform in transforms):
+            changes.append((row[0], scrubbed))
+    return changes
 
 
 class IfNotEmpty:
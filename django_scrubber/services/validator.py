@@ -1,8 +1,44 @@
+import hashlib
+import json
 import re
+import sys
+from pathlib import Path
 
 from django.apps import apps
+from django.db.models import Model
 
 from django_scrubber import settings_with_fallback
+from django_scrubber.plan import ScrubPlan, _get_scrubber_class
+
+
+class ModelWhitelist:
+    """
+    Matcher for SCRUBBER_REQUIRED_FIELD_MODEL_WHITELIST, compiled once: full model names are looked up in a set, and
+    regular expression patterns are combined into as few expressions as their flags allow.
+    """
+
+    def __init__(self, patterns):
+        labels = set()
+        regexes_by_flags = {}
+        for pattern in patterns:
+            if isinstance(pattern, str):
+                labels.add(pattern)
+            elif isinstance(pattern, re.Pattern):
+                regexes_by_flags.setdefault(pattern.flags, []).append(pattern)
+            else:
+                raise ValueError("Invalid pattern type")
+
+        self.labels = frozenset(labels)
+        self.regexes = []
+        for flags, regexes in regexes_by_flags.items():
+            try:
+                self.regexes.append(re.compile("|".join(f"(?:{regex.pattern})" for regex in regexes), flags))
+            except (re.error, TypeError):
+                # e.g. named groups used by several patterns
+                self.regexes.extend(regexes)
+
+    def __contains__(self, label):
+        return label in self.labels or any(regex.fullmatch(label) for regex in self.regexes)
 
 
 class ScrubberValidatorService:
@@ -18,45 +54,123 @@ class ScrubberValidatorService:
             return pattern.fullmatch(value)
         raise ValueError("Invalid pattern type")
 
-    def process(self) -> dict:
-        from django_scrubber.management.commands.scrub_data import _get_model_scrubbers  # noqa: PLC0415
+    def process(
+        self,
+        scrub_plan: ScrubPlan | None = None,
+        cache_path: str | None = None,
+        changed_only: bool = False,
+    ) -> dict:
+        """
+        Map the labels of all models to their fields which require scrubbing but are not scrubbed.
+
+        With `cache_path`, the results of every app are cached along with a signature of its models' fields and the
+        modules defining them and their scrubbers classes. Apps with an unchanged signature are not validated again,
+        and with `changed_only` left out of the results entirely.
+        """
+        if scrub_plan is None:
+            scrub_plan = ScrubPlan()
 
         scrubber_required_field_types = settings_with_fallback("SCRUBBER_REQUIRED_FIELD_TYPES")
-        model_whitelist = settings_with_fallback("SCRUBBER_REQUIRED_FIELD_MODEL_WHITELIST")
-
-        # Get a list of all registered models in your Django application
-        model_list = apps.get_models()
+        model_whitelist = ModelWhitelist(settings_with_fallback("SCRUBBER_REQUIRED_FIELD_MODEL_WHITELIST"))
+        cache = _read_cache(cache_path) if cache_path else {}
+        settings_signature = repr(
+            (
+                scrubber_required_field_types,
+                settings_with_fallback("SCRUBBER_REQUIRED_FIELD_MODEL_WHITELIST"),
+                settings_with_fallback("SCRUBBER_MAPPING"),
+            ),
+        )
 
         # Create a dictionary to store the fields of each model
         non_scrubbed_field_list = {}
+        updated_cache = {}
+        file_digests = {}
+
+        # Iterate over each app's registered models
+        for app_config in apps.get_app_configs():
+            model_list = list(app_config.get_models())
+            if cache_path:
+                signature = _get_app_signature(model_list, settings_signature, file_digests)
+                cached = cache.get(app_config.label)
+                if isinstance(cached, dict) and cached.get("signature") == signature:
+                    updated_cache[app_config.label] = cached
+                    if not changed_only:
+                        non_scrubbed_field_list.update(cached["results"])
+                    continue
+
+            app_results = {}
+            for model in model_list:
+                # Check if model is whitelisted
+                if model._meta.label in model_whitelist:
+                    continue
+
+                # Gather list of all fields of the given model that require scrubbing
+                fields_need_scrubbing = [
+                    field.name for field in model._meta.get_fields() if type(field) in scrubber_required_field_types
+                ]
+
+                # We check for every scrubbing requiring field, if the model's scrubber class sets it to be scrubbed
+                for scrubbed_field in scrub_plan.get_declared_fields(model):
+                    if scrubbed_field in fields_need_scrubbing:
+                        fields_need_scrubbing.remove(scrubbed_field)
+
+                # Store per model all non-scrubbed but scrubbing requiring fields
+                if len(fields_need_scrubbing) > 0:
+                    app_results[model._meta.label] = fields_need_scrubbing
+
+            non_scrubbed_field_list.update(app_results)
+            if cache_path:
+                updated_cache[app_config.label] = {"signature": signature, "results": app_results}
+
+        if cache_path and updated_cache != cache:
+            _write_cache(cache_path, updated_cache)
+        return non_scrubbed_field_list
 
-        # Iterate over each model in the list
-        for model in model_list:
-            # Check if model is whitelisted
-            if any(self.check_pattern(pattern, model._meta.label) for pattern in model_whitelist):
-                continue
-
-            fields_need_scrubbing = []
-            # Get the model's name and fields
-            fields = model._meta.get_fields()
-
-            # Gather list of all fields of the given model that require scrubbing
-            for field in fields:
-                if type(field) in scrubber_required_field_types:
-                    fields_need_scrubbing.append(field.name)
-
-            # Get scrubber class
-            scrubber_class = _get_model_scrubbers(model)
-
-            # If we did find a scrubber class...
-            if scrubber_class:
-                # We check for every scrubbing requiring field, if it's set to be scrubbed
-                for scrubbed_field in scrubber_class:
-                    if scrubbed_field.name in fields_need_scrubbing:
-                        fields_need_scrubbing.remove(scrubbed_field.name)
-
-            # Store per model all non-scrubbed but scrubbing requiring fields
-            if len(fields_need_scrubbing) > 0:
-                non_scrubbed_field_list[model._meta.label] = fields_need_scrubbing
 
-        return non_scrubbed_field_list
+def _get_app_signature(model_list, settings_signature, file_digests):
+    """
+    Digest of what validating the given models depends on: their fields by name and class, and the content of the
+    modules defining the models, their abstract bases, their fields' classes and their scrubbers classes. Fields
+    added from elsewhere, e.g. by `add_to_class`, are covered by their names and classes. Content rather than
+    modification times keeps the signature stable across checkouts, e.g. in CI.
+    """
+    digest = hashlib.sha256(settings_signature.encode())
+    for model in model_list:
+        scrubber_class = _get_scrubber_class(model)
+        # forward fields only, unlike get_fields(), which resolves all relations pointing to the model as well
+        fields = [(field.name, type(field)) for field in (*model._meta.fields, *model._meta.many_to_many)]
+        classes = [cls for cls in model.__mro__ if issubclass(cls, Model) and cls is not Model]
+        classes += getattr(scrubber_class, "__mro__", [])
+        classes += [field_class for _, field_class in fields]
+        module_digests = sorted(
+            (module_name, _get_file_digest(module_name, file_digests))
+            for module_name in {cls.__module__ for cls in classes}
+        )
+        field_names = [(name, f"{field_class.__module__}.{field_class.__qualname__}") for name, field_class in fields]
+        scrubber_name = getattr(scrubber_class, "__qualname__", None)
+        digest.update(repr((model._meta.label, scrubber_name, field_names, module_digests)).encode())
+    return digest.hexdigest()
+
+
+def _get_file_digest(module_name, file_digests):
+    # modules are shared by many models, so each one is only read once per validation
+    if module_name not in file_digests:
+        module_file = getattr(sys.modules.get(module_name), "__file__", None)
+        try:
+            file_digests[module_name] = (
+                hashlib.sha256(Path(module_file).read_bytes()).hexdigest() if module_file else None
+            )
+        except OSError:
+            file_digests[module_name] = None
+    return file_digests[module_name]
+
+
+def _read_cache(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(path, cache):
+    Path(path).write_text(json.dumps(cache, indent=2, sort_keys=True))
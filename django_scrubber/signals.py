@@ -0,0 +1,40 @@
+"""
+Signals sent while scrubbing, to observe a run without patching the command.
+
+All signals are sent synchronously from the thread doing the work. When scrubbing with `--jobs` or `--shards`,
+receivers are called from several threads concurrently.
+"""
+
+from django.dispatch import Signal
+
+# Sent by scrub_data before realizing any scrubber. The sender is the command class.
+# Arguments: models (the models to be scrubbed)
+scrub_started = Signal()
+
+# Sent by scrub_data once the run is over, including session and Faker data truncation. The sender is the command
+# class.
+# Arguments: duration (seconds), error (the exception the run failed with, or None)
+scrub_finished = Signal()
+
+# Sent before scrubbing a model, or a shard of it. The sender is the model class.
+# Arguments: pk_range (tuple of the exclusive lower and inclusive upper primary key bound, None if unbounded)
+model_scrub_started = Signal()
+
+# Sent after scrubbing a model, or a shard of it, whether successful or not. The sender is the model class.
+# Arguments: pk_range, rows (None on failure), duration (seconds), statements (number of statements run),
+# error (the exception scrubbing failed with, or None)
+model_scrub_finished = Signal()
+
+# Sent before initializing the data of a Faker provider. The sender is the Faker class.
+# Arguments: provider_key (the provider and a hash of its arguments)
+faker_provider_started = Signal()
+
+# Sent after initializing the data of a Faker provider. The sender is the Faker class.
+# Arguments: provider_key, duration (seconds), reused (whether previously generated data was reused)
+# All providers are checked for reusable data before generating any, so the signals of several providers interleave;
+# duration only covers the time spent on the given provider.
+faker_provider_finished = Signal()
+
+# Sent after every statement run while scrubbing a model. The sender is the model class.
+# Arguments: sql, many, duration (seconds)
+statement_executed = Signal()
@@ -0,0 +1,637 @@
+"""
+Helpers building and running statements the ORM can't express.
+"""
+
+import functools
+import io
+import operator
+import zlib
+
+from django.core.exceptions import EmptyResultSet, FullResultSet
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.backends.utils import truncate_name
+from django.db.models import Case, CharField, F, Max, Q, Value, When
+from django.db.models.functions import Cast, Concat
+from django.db.models.sql import UpdateQuery
+
+from . import db_for_write
+from .scrubbers import Empty, FakerLookup, Null, UniqueFaker, UniqueFakerLookup
+
+
+def register_sqlite_functions(sender, connection, **kwargs):
+    """
+    `connection_created` receiver registering the functions scrubbing relies on with every new SQLite connection, as
+    Django does for the functions it relies on. SQLite has no hash function built in, so SCRUBBER_CRC32 computes the
+    CRC32 of values in Python.
+    """
+    if connection.vendor == "sqlite":
+        connection.connection.create_function("SCRUBBER_CRC32", 1, _crc32, deterministic=True)
+
+
+def _crc32(value):
+    return zlib.crc32(str(value).encode())
+
+
+def supports_update_join(db_connection):
+    # UPDATE ... FROM is available since SQLite 3.33
+    if db_connection.vendor == "sqlite":
+        return db_connection.Database.sqlite_version_info >= (3, 33)
+    return db_connection.vendor in ("postgresql", "mysql")
+
+
+def find_faker_lookups(expression):
+    """
+    Recursively collect all FakerLookup expressions contained in the given expression.
+    """
+    if isinstance(expression, FakerLookup):
+        yield expression
+    for source in getattr(expression, "get_source_expressions", list)():
+        if source is not None:
+            yield from find_faker_lookups(source)
+
+
+def exclude_unchanged_rows(queryset, values):
+    """
+    Restrict the queryset to rows at least one of the given scrubbers may change, e.g. skipping rows `IfNotEmpty`
+    leaves alone or `Null` has already cleared, so they are neither written nor reindexed.
+    Returns the queryset and the values to update it with.
+    """
+    conditions = []
+    for name, value in values.items():
+        condition = _get_change_condition(name, value)
+        if condition is None:
+            # every row is rewritten anyway
+            return queryset, values
+        conditions.append(condition)
+    if not conditions:
+        return queryset, values
+
+    queryset = queryset.filter(functools.reduce(operator.or_, conditions))
+    # if all scrubbers share their condition, the filter makes checking it once more per row redundant
+    if all(condition == conditions[0] for condition in conditions):
+        values = {
+            name: value.cases[0].result if isinstance(value, Case) and len(value.cases) == 1 else value
+            for name, value in values.items()
+        }
+    return queryset, values
+
+
+def _get_change_condition(name, value):
+    """
+    The condition of rows the scrubber of field `name` may change, or None if that can't be told.
+    """
+    if isinstance(value, Empty):
+        return ~Q((name, ""))
+    if isinstance(value, Null):
+        return Q((f"{name}__isnull", False))
+    # like IfNotEmpty, falling back to the current value
+    if isinstance(value, Case) and value.cases and isinstance(value.default, F) and value.default.name == name:
+        conditions = [when.condition for when in value.cases]
+        if all(isinstance(condition, Q) for condition in conditions):
+            return functools.reduce(operator.or_, conditions)
+    return None
+
+
+def update(queryset, values):
+    """
+    Drop-in replacement for `queryset.update(**values)`, which picks the statement matching the given scrubbers.
+    """
+    if any(lookup for value in values.values() for lookup in find_faker_lookups(value)):
+        return update_with_join(queryset, values)
+    return queryset.update(**values)
+
+
+def compile_update(queryset, values):
+    """
+    Compile the statement `update` runs for the given scrubbers into `(sql, params)`, or None if no row can match.
+    """
+    if any(lookup for value in values.values() for lookup in find_faker_lookups(value)):
+        return compile_update_with_join(queryset, values)
+
+    using = queryset._db or db_for_write(queryset.model)
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    # like QuerySet.update(), which doesn't select annotations either
+    query.annotations = {}
+    try:
+        return query.get_compiler(using).as_sql()
+    except EmptyResultSet:
+        return None
+
+
+def update_with_join(queryset, values):
+    """
+    Like `queryset.update(**values)`, but joins the data of all Faker providers referenced by FakerLookup expressions
+    once, pivoted by offset, instead of running one correlated subquery per provider and row.
+    The queryset needs to be annotated with `mod_pk`, the offset of each row.
+    """
+    compiled = compile_update_with_join(queryset, values)
+    if compiled is None:
+        return 0
+
+    using = queryset._db or db_for_write(queryset.model)
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        # values ranked by `rank_rows` have been cleared along with ranking the rows
+        if not any(lookup.rank_table for lookup in _find_unique_faker_lookups(values)):
+            clear_unique_values(queryset, values)
+        cursor.execute(*compiled)
+        return cursor.rowcount
+
+
+def clear_unique_values(queryset, values):
+    """
+    Set the fields scrubbed by UniqueFaker to placeholders unique by primary key, which none of the values UniqueFaker
+    assigns can be equal to. Unique constraints are checked row by row, so assigning the values would otherwise fail
+    as soon as a row is assigned the value of a row which is not updated yet, e.g. when scrubbing again.
+    """
+    names = [
+        name
+        for name, value in values.items()
+        if any(isinstance(lookup, UniqueFakerLookup) for lookup in find_faker_lookups(value))
+    ]
+    if names:
+        # generated values never contain the separator, suffixed ones contain it once
+        placeholder = Concat(Value(UniqueFaker.SEPARATOR * 2), Cast("pk", CharField()))
+        queryset.update(**dict.fromkeys(names, placeholder))
+
+
+def _find_unique_faker_lookups(values):
+    return [
+        lookup
+        for value in values.values()
+        for lookup in find_faker_lookups(value)
+        if isinstance(lookup, UniqueFakerLookup)
+    ]
+
+
+def compile_update_with_join(queryset, values):
+    """
+    Compile the statement run by `update_with_join` into `(sql, params)`, or None if no row can match.
+    """
+    using = queryset._db or db_for_write(queryset.model)
+    db_connection = connections[using]
+    qn = db_connection.ops.quote_name
+
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    compiler = query.get_compiler(using)
+
+    # UPDATE ... SET ..., compiled by django without the WHERE clause, which is appended after the join below
+    where = query.where
+    query.where = where.create()
+    set_sql, set_params = compiler.as_sql()
+    query.where = where
+    try:
+        where_sql, where_params = compiler.compile(where)
+    except FullResultSet:
+        where_sql, where_params = "", ()
+    except EmptyResultSet:
+        return None
+
+    lookups = [lookup for value in values.values() for lookup in find_faker_lookups(value)]
+    # tables joined into the update, as (table, its params, join condition, its params)
+    joins = []
+
+    plain_keys = {
+        lookup.provider_key: lookup.column for lookup in lookups if not isinstance(lookup, UniqueFakerLookup)
+    }
+    if plain_keys:
+        offset_sql, offset_params = compiler.compile(query.annotations["mod_pk"])
+        lookup_sql, lookup_params = _compile_fake_data_pivot(plain_keys, using)
+        joins.append(
+            (
+                f"({lookup_sql}) AS {qn(FakerLookup.TABLE_ALIAS)}",
+                lookup_params,
+                f"{qn(FakerLookup.TABLE_ALIAS)}.{qn(FakerLookup.OFFSET_COLUMN)} = {offset_sql}",
+                offset_params,
+            ),
+        )
+
+    unique_lookups = [lookup for lookup in lookups if isinstance(lookup, UniqueFakerLookup)]
+    if unique_lookups:
+        # rows are ranked across the whole table, so batches and shards of it get distinct ranks
+        pk_column = f"{qn(query.base_table)}.{qn(queryset.model._meta.pk.column)}"
+        rank_alias = qn(UniqueFakerLookup.RANK_TABLE_ALIAS)
+        rank_table = unique_lookups[0].rank_table
+        rank_source = qn(rank_table) if rank_table else f"({_compile_rank_select(queryset.model, qn)})"
+        rank_sql = f"{rank_source} AS {rank_alias}"
+        joins.append((rank_sql, (), f"{rank_alias}.{qn(UniqueFakerLookup.PK_COLUMN)} = {pk_column}", ()))
+
+        lookup_sql, lookup_params = _compile_fake_data_pivot(
+            {lookup.provider_key: lookup.column for lookup in unique_lookups},
+            using,
+        )
+        entries = int(unique_lookups[0].entries)
+        joins.append(
+            (
+                f"({lookup_sql}) AS {qn(UniqueFakerLookup.TABLE_ALIAS)}",
+                lookup_params,
+                f"{qn(UniqueFakerLookup.TABLE_ALIAS)}.{qn(FakerLookup.OFFSET_COLUMN)} = "
+                f"{rank_alias}.{qn(UniqueFakerLookup.RANK_COLUMN)} %% {entries}",
+                (),
+            ),
+        )
+
+    if db_connection.vendor == "mysql":
+        update_clause = f"UPDATE {qn(query.base_table)} SET"
+        join_clause = " ".join(f"INNER JOIN {table} ON {condition}" for table, _, condition, _ in joins)
+        sql = set_sql.replace(update_clause, f"UPDATE {qn(query.base_table)} {join_clause} SET", 1)
+        sql += f" WHERE {where_sql}" if where_sql else ""
+        join_params = [
+            param for _, table_params, _, condition_params in joins for param in (*table_params, *condition_params)
+        ]
+        params = (*join_params, *set_params, *where_params)
+    else:
+        tables = ", ".join(table for table, _, _, _ in joins)
+        conditions = " AND ".join(condition for _, _, condition, _ in joins)
+        sql = f"{set_sql} FROM {tables} WHERE {conditions}"
+        sql += f" AND ({where_sql})" if where_sql else ""
+        table_params = [param for _, table_params, _, _ in joins for param in table_params]
+        condition_params = [param for _, _, _, condition_params in joins for param in condition_params]
+        params = (*set_params, *table_params, *condition_params, *where_params)
+    return sql, params
+
+
+def _compile_rank_select(model, qn):
+    pk_column = f"{qn(model._meta.db_table)}.{qn(model._meta.pk.column)}"
+    # only quoted identifiers are interpolated
+    return (
+        f"SELECT {pk_column} AS {qn(UniqueFakerLookup.PK_COLUMN)}, "  # noqa: S608
+        f"ROW_NUMBER() OVER (ORDER BY {pk_column}) - 1 AS {qn(UniqueFakerLookup.RANK_COLUMN)} "
+        f"FROM {qn(model._meta.db_table)}"
+    )
+
+
+def get_rank_table(model, using):
+    """
+    The name of the table `rank_rows` materializes the ranks of the model's rows into.
+    """
+    return truncate_name(f"scrubber_rank_{model._meta.db_table}", connections[using].ops.max_name_length())
+
+
+def rank_rows(queryset, values, reuse=False):
+    """
+    Materialize the rank of every row of the queryset's table in primary key order into a table of its own, and join
+    the UniqueFakerLookup expressions among the given scrubbers with it from then on. Ranking once keeps the ranks
+    of a run stable across its batches and shards, even if rows are deleted in between, instead of ranking the whole
+    table again in every statement. Rows added afterwards have no rank and are left alone.
+    Along with ranking, the fields of the queryset's rows are cleared by `clear_unique_values` for all batches and
+    shards at once.
+    With `reuse`, ranks left over by an interrupted run are kept, so a resumed run assigns the same values.
+    Returns the name of the table, to be dropped with `drop_ranks`, or None if no scrubber needs ranks.
+    """
+    unique_lookups = _find_unique_faker_lookups(values)
+    if not unique_lookups:
+        return None
+
+    model = queryset.model
+    using = queryset._db or db_for_write(model)
+    db_connection = connections[using]
+    qn = db_connection.ops.quote_name
+    rank_table = get_rank_table(model, using)
+    with transaction.atomic(using=using), db_connection.cursor() as cursor:
+        if not reuse or rank_table not in db_connection.introspection.table_names(cursor):
+            cursor.execute(f"DROP TABLE IF EXISTS {qn(rank_table)}")
+            cursor.execute(f"CREATE TABLE {qn(rank_table)} AS {_compile_rank_select(model, qn)}")
+            cursor.execute(
+                f"CREATE UNIQUE INDEX {qn(truncate_name(f'{rank_table}_pk', db_connection.ops.max_name_length()))} "
+                f"ON {qn(rank_table)} ({qn(UniqueFakerLookup.PK_COLUMN)})",
+            )
+            clear_unique_values(queryset.using(using), values)
+    for lookup in unique_lookups:
+        lookup.rank_table = rank_table
+    return rank_table
+
+
+def plan_ranks(model, values, using):
+    """
+    Join the UniqueFakerLookup expressions among the given scrubbers with the table `rank_rows` materializes the
+    ranks into, without creating it, e.g. to show the statements a run executes.
+    Returns the name of the table, or None if no scrubber needs ranks.
+    """
+    unique_lookups = _find_unique_faker_lookups(values)
+    if not unique_lookups:
+        return None
+
+    rank_table = get_rank_table(model, using)
+    for lookup in unique_lookups:
+        lookup.rank_table = rank_table
+    return rank_table
+
+
+def drop_ranks(rank_table, using):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {connections[using].ops.quote_name(rank_table)}")
+
+
+def _compile_fake_data_pivot(provider_keys, using):
+    """
+    Compile a query of the data of the given providers into `(sql, params)`, one row per offset and one column per
+    provider, named as given by `provider_keys`.
+    """
+    from .models import FakeData, FakeDataProvider  # noqa: PLC0415
+
+    provider_ids = dict(
+        FakeDataProvider.objects.using(using).filter(key__in=provider_keys).values_list("key", "pk"),
+    )
+    # providers are only missing before their data is generated, e.g. for `--plan`, which must compile nevertheless
+    providers = (
+        Q(provider__in=provider_ids.values())
+        if len(provider_ids) == len(provider_keys)
+        else Q(provider__key__in=provider_keys)
+    )
+    return (
+        FakeData.objects.using(using)
+        .filter(providers)
+        .values(**{FakerLookup.OFFSET_COLUMN: F("provider_offset")})
+        .annotate(
+            **{
+                column: Max(Case(When(provider=provider_ids.get(provider_key), then="content")))
+                for provider_key, column in provider_keys.items()
+            },
+        )
+        .order_by()
+        .query.get_compiler(using)
+        .as_sql()
+    )
+
+
+def update_rows(model, fields, rows, using):
+    """
+    Set `fields` of the rows given as `(pk, values)` tuples, with a value per field. Runs a single
+    UPDATE ... FROM (VALUES ...) on PostgreSQL, and `bulk_update` elsewhere. Returns the number of updated rows.
+    """
+    if not rows:
+        return 0
+    db_connection = connections[using]
+    if db_connection.vendor != "postgresql":
+        objs = [
+            model(pk=pk, **{field.attname: value for field, value in zip(fields, values, strict=True)})
+            for pk, values in rows
+        ]
+        return model._base_manager.using(using).bulk_update(objs, [field.name for field in fields])
+
+    qn = db_connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    pk_field = model._meta.pk
+    alias = qn("scrubber_values")
+    pk_column = qn("scrubber_pk")
+    # typed placeholders, as VALUES doesn't know the types of its columns
+    row_sql = f"({', '.join(f'%s::{field.cast_db_type(db_connection)}' for field in (pk_field, *fields))})"
+    params = [
+        field.get_db_prep_save(value, db_connection)
+        for pk, values in rows
+        for field, value in zip((pk_field, *fields), (pk, *values), strict=True)
+    ]
+    assignments = ", ".join(f"{qn(field.column)} = {alias}.{qn(field.column)}" for field in fields)
+    columns = ", ".join(qn(field.column) for field in fields)
+    # only quoted identifiers and placeholders are interpolated
+    statement = (
+        f"UPDATE {table} SET {assignments} FROM (VALUES {', '.join([row_sql] * len(rows))}) "  # noqa: S608
+        f"AS {alias} ({pk_column}, {columns}) WHERE {table}.{qn(pk_field.column)} = {alias}.{pk_column}"
+    )
+    with transaction.mark_for_rollback_on_error(using=using), db_connection.cursor() as cursor:
+        cursor.execute(statement, params)
+        return cursor.rowcount
+
+
+def _copy_value(value):
+    # escaping for the text format of COPY
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def bulk_insert(objs, using):
+    """
+    Insert model instances of the same model without returning anything, using COPY on PostgreSQL and a multi-row
+    INSERT elsewhere.
+    """
+    if not objs:
+        return
+    model = type(objs[0])
+    db_connection = connections[using]
+    if db_connection.vendor != "postgresql":
+        model._default_manager.using(using).bulk_create(objs)
+        return
+
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    qn = db_connection.ops.quote_name
+    sql = f"COPY {qn(model._meta.db_table)} ({', '.join(qn(field.column) for field in fields)}) FROM STDIN"
+    data = "".join(
+        "\t".join(_copy_value(field.get_db_prep_save(getattr(obj, field.attname), db_connection)) for field in fields)
+        + "\n"
+        for obj in objs
+    )
+    with transaction.mark_for_rollback_on_error(using=using), db_connection.cursor() as cursor:
+        if hasattr(cursor, "copy"):
+            # psycopg 3
+            with cursor.copy(sql) as copy:
+                copy.write(data)
+        else:
+            cursor.copy_expert(sql, io.StringIO(data))
+
+
+def truncate(models, using):
+    """
+    Remove all rows of the given models' tables and reset their sequences, using TRUNCATE where available and a plain
+    DELETE elsewhere. Unlike `QuerySet.delete()`, rows are neither loaded nor are signals sent or deletions cascaded,
+    so tables referencing each other have to be truncated together.
+    """
+    db_connection = connections[using]
+    tables = [model._meta.db_table for model in models]
+    with transaction.atomic(using=using), db_connection.cursor() as cursor:
+        if db_connection.vendor == "postgresql":
+            # TRUNCATE refuses tables with deferred foreign key checks pending from the same transaction
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        for statement in db_connection.ops.sql_flush(no_style(), tables, reset_sequences=True):
+            cursor.execute(statement)
+        if db_connection.vendor == "postgresql":
+            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+
+def delete(queryset):
+    """
+    Delete the rows of the queryset with a single DELETE, like `truncate` without loading rows, sending signals or
+    cascading. Returns the number of deleted rows.
+    """
+    using = queryset._db or db_for_write(queryset.model)
+    with transaction.atomic(using=using):
+        # the statement QuerySet.delete() runs once the collector has figured out there is nothing else to delete
+        return queryset._raw_delete(using)
+
+
+def copy_and_swap(queryset, values):
+    """
+    Scrub a whole table by copying it with `values` applied into a new table, which then replaces the original one.
+    Indexes and constraints, including foreign keys referencing the table, as well as triggers, privileges, storage
+    parameters and the owner are recreated once the data is copied, see `find_uncopyable_features` for the rest.
+    PostgreSQL only; the queryset needs to be annotated with `mod_pk`, the offset of each row.
+    """
+    model = queryset.model
+    using = queryset._db or db_for_write(model)
+    db_connection = connections[using]
+    qn = db_connection.ops.quote_name
+    table = model._meta.db_table
+    copy_table = truncate_name(f"{table}_scrubbed", db_connection.ops.max_name_length())
+    if queryset.query.has_filters():
+        # rows the queryset doesn't select would be dropped along with the original table
+        raise ValueError(f"Copying {model._meta.label} requires an unfiltered queryset of all its rows")
+    fields, select_sql, select_params = compile_copy_select(queryset, values)
+
+    with transaction.atomic(using=using), db_connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+
+        # capture everything the copy doesn't inherit, before the original table is gone
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i WHERE i.indrelid = %s::regclass AND NOT EXISTS "
+            "(SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid AND c.conrelid = i.indrelid)",
+            [qn(table)],
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        # primary key and unique constraints first, as foreign keys of the table itself may depend on them
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'x', 'c', 'f') "
+            "ORDER BY strpos('puxcf', contype::text), conname",
+            [qn(table)],
+        )
+        constraints = cursor.fetchall()
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND conrelid <> confrelid AND contype = 'f'",
+            [qn(table)],
+        )
+        referencing_constraints = cursor.fetchall()
+        # sequences of serial columns are owned by the original table, identity columns get their own
+        cursor.execute(
+            "SELECT column_name, pg_get_serial_sequence(%s, column_name) FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s AND is_identity = 'NO' "
+            "AND pg_get_serial_sequence(%s, column_name) IS NOT NULL",
+            [qn(table), table, qn(table)],
+        )
+        serial_sequences = cursor.fetchall()
+        cursor.execute(
+            "SELECT pg_get_triggerdef(oid), tgname, tgenabled FROM pg_trigger WHERE tgrelid = %s::regclass "
+            "AND NOT tgisinternal ORDER BY tgname",
+            [qn(table)],
+        )
+        triggers = cursor.fetchall()
+        cursor.execute(
+            "SELECT CASE WHEN a.grantee = 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(a.grantee)) END, "
+            "a.privilege_type, a.is_grantable FROM pg_class c, aclexplode(c.relacl) a WHERE c.oid = %s::regclass",
+            [qn(table)],
+        )
+        privileges = cursor.fetchall()
+        cursor.execute(
+            "SELECT quote_ident(pg_get_userbyid(relowner)), relowner <> (SELECT oid FROM pg_roles WHERE rolname = "
+            "current_user), array_to_string(reloptions, ', ') FROM pg_class WHERE oid = %s::regclass",
+            [qn(table)],
+        )
+        owner, other_owner, storage_parameters = cursor.fetchone()
+
+        cursor.execute(
+            f"CREATE TABLE {qn(copy_table)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+            "INCLUDING GENERATED INCLUDING STORAGE INCLUDING COMMENTS)",
+        )
+        cursor.execute(
+            f"INSERT INTO {qn(copy_table)} ({', '.join(qn(field.column) for field in fields)}) {select_sql}",
+            select_params,
+        )
+        rows = cursor.rowcount
+
+        for referencing_table, name, _ in referencing_constraints:
+            cursor.execute(f"ALTER TABLE {referencing_table} DROP CONSTRAINT {qn(name)}")
+        for column, sequence in serial_sequences:
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {qn(copy_table)}.{qn(column)}")
+        cursor.execute(f"DROP TABLE {qn(table)}")
+        cursor.execute(f"ALTER TABLE {qn(copy_table)} RENAME TO {qn(table)}")
+
+        for name, definition in constraints:
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+        for definition in indexes:
+            cursor.execute(definition)
+        for referencing_table, name, definition in referencing_constraints:
+            cursor.execute(f"ALTER TABLE {referencing_table} ADD CONSTRAINT {qn(name)} {definition}")
+        if storage_parameters:
+            cursor.execute(f"ALTER TABLE {qn(table)} SET ({storage_parameters})")
+        for grantee, privilege, is_grantable in privileges:
+            grant_option = " WITH GRANT OPTION" if is_grantable else ""
+            cursor.execute(f"GRANT {privilege} ON {qn(table)} TO {grantee}{grant_option}")
+        if other_owner:
+            cursor.execute(f"ALTER TABLE {qn(table)} OWNER TO {owner}")
+        # created once the rows are copied, so they don't fire for the copy itself
+        for definition, name, enabled in triggers:
+            cursor.execute(definition)
+            if enabled != "O":
+                state = {"D": "DISABLE", "R": "ENABLE REPLICA", "A": "ENABLE ALWAYS"}[enabled]
+                cursor.execute(f"ALTER TABLE {qn(table)} {state} TRIGGER {qn(name)}")
+        for statement in db_connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(statement)
+
+    return rows
+
+
+def find_uncopyable_features(model, using):
+    """
+    Describe what `copy_and_swap` can't carry over to the copy of the model's table: row security and its policies,
+    privileges granted on single columns, and rules. Empty if the table can be copied.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relrowsecurity OR EXISTS (SELECT 1 FROM pg_policy p WHERE p.polrelid = c.oid), "
+            "EXISTS (SELECT 1 FROM pg_attribute a WHERE a.attrelid = c.oid AND a.attacl IS NOT NULL), "
+            "EXISTS (SELECT 1 FROM pg_rewrite r WHERE r.ev_class = c.oid AND r.rulename <> '_RETURN') "
+            "FROM pg_class c WHERE c.oid = %s::regclass",
+            [connections[using].ops.quote_name(model._meta.db_table)],
+        )
+        row_security, column_privileges, rules = cursor.fetchone()
+    return [
+        description
+        for description, present in (
+            ("row security policies", row_security),
+            ("column privileges", column_privileges),
+            ("rules", rules),
+        )
+        if present
+    ]
+
+
+def compile_copy_select(queryset, values):
+    """
+    Compile the SELECT filling the copy made by `copy_and_swap` into `(fields, sql, params)`, where `fields` are the
+    model fields matching the selected columns.
+    """
+    using = queryset._db or db_for_write(queryset.model)
+    # generated columns are computed by the database
+    fields = [field for field in queryset.model._meta.concrete_fields if not getattr(field, "generated", False)]
+    select_sql, select_params = (
+        queryset.using(using)
+        .values(
+            **{
+                f"scrubbed_{i}": _as_expression(values.get(field.name, F(field.attname)), field)
+                for i, field in enumerate(fields)
+            },
+        )
+        .order_by()
+        .query.get_compiler(using)
+        .as_sql()
+    )
+    return fields, select_sql, select_params
+
+
+def explain(sql, params, using):
+    """
+    Return the lines of the database's EXPLAIN output for the given statement, without running it.
+    """
+    db_connection = connections[using]
+    with db_connection.cursor() as cursor:
+        cursor.execute(f"{db_connection.ops.explain_query_prefix()} {sql}", params)
+        return ["  ".join(str(column) for column in row) for row in cursor.fetchall()]
+
+
+def _as_expression(value, field):
+    if hasattr(value, "resolve_expression"):
+        return value
+    return Value(value, output_field=field)
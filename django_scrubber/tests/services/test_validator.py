@@ -1,10 +1,15 @@
 import re
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import mock
 
-from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db.models import CharField
+from django.test import SimpleTestCase, TestCase, override_settings
 
 from django_scrubber import scrubbers
-from django_scrubber.services.validator import ScrubberValidatorService
+from django_scrubber.plan import ScrubPlan
+from django_scrubber.services.validator import ModelWhitelist, ScrubberValidatorService
 
 
 class ScrubberValidatorServiceTest(TestCase):
@@ -32,7 +37,7 @@ class ScrubberValidatorServiceTest(TestCase):
 
     @override_settings(SCRUBBER_MAPPING={"auth.User": "FullUserScrubbers"})
     @mock.patch(
-        "django_scrubber.management.commands.scrub_data._parse_scrubber_class_from_string",
+        "django_scrubber.plan._parse_scrubber_class_from_string",
         return_value=FullUserScrubbers,
     )
     def test_process_scrubber_mapper_all_fields(self, mocked_function):
@@ -46,7 +51,7 @@ class ScrubberValidatorServiceTest(TestCase):
 
     @override_settings(SCRUBBER_MAPPING={"auth.User": "PartUserScrubbers"})
     @mock.patch(
-        "django_scrubber.management.commands.scrub_data._parse_scrubber_class_from_string",
+        "django_scrubber.plan._parse_scrubber_class_from_string",
         return_value=PartUserScrubbers,
     )
     def test_process_scrubber_mapper_some_fields(self, mocked_function):
@@ -75,3 +80,67 @@ class ScrubberValidatorServiceTest(TestCase):
         model_list = tuple(result.keys())
         self.assertNotIn("auth.User", model_list)
         self.assertNotIn("auth.Permission", model_list)
+
+    def test_process_cache(self):
+        with TemporaryDirectory() as directory:
+            cache_path = str(Path(directory) / "validation.json")
+            service = ScrubberValidatorService()
+            result = service.process(cache_path=cache_path)
+
+            with (
+                mock.patch.object(ScrubPlan, "get_declared_fields") as mocked_method,
+                mock.patch.object(get_user_model()._meta, "get_fields") as mocked_get_fields,
+            ):
+                self.assertEqual(service.process(cache_path=cache_path), result)
+                self.assertEqual(service.process(cache_path=cache_path, changed_only=True), {})
+            mocked_method.assert_not_called()
+            mocked_get_fields.assert_not_called()
+
+            with mock.patch.object(get_user_model(), "Scrubbers", self.PartUserScrubbers, create=True):
+                changed_result = service.process(cache_path=cache_path, changed_only=True)
+
+        self.assertEqual(changed_result, {"auth.User": ["username", "email"]})
+
+    def test_process_cache_module_changed(self):
+        with TemporaryDirectory() as directory:
+            cache_path = str(Path(directory) / "validation.json")
+            service = ScrubberValidatorService()
+            service.process(cache_path=cache_path)
+
+            with mock.patch(
+                "django_scrubber.services.validator._get_file_digest",
+                side_effect=lambda module_name, file_digests: f"changed {module_name}",
+            ):
+                changed_result = service.process(cache_path=cache_path, changed_only=True)
+
+        self.assertIn("auth.User", changed_result)
+
+    def test_process_cache_field_added(self):
+        user_model = get_user_model()
+        field = CharField(max_length=20)
+        field.name = "nickname"
+        with TemporaryDirectory() as directory:
+            cache_path = str(Path(directory) / "validation.json")
+            service = ScrubberValidatorService()
+            service.process(cache_path=cache_path)
+
+            # e.g. added by add_to_class() in another app
+            with mock.patch.object(user_model._meta, "fields", (*user_model._meta.fields, field)):
+                changed_result = service.process(cache_path=cache_path, changed_only=True)
+
+        self.assertIn("auth.User", changed_result)
+
+
+class ModelWhitelistTest(SimpleTestCase):
+    def test_contains(self):
+        whitelist = ModelWhitelist(["auth.Group", re.compile("sessions.*"), re.compile("SITES.*", re.IGNORECASE)])
+
+        self.assertIn("auth.Group", whitelist)
+        self.assertIn("sessions.Session", whitelist)
+        self.assertIn("sites.Site", whitelist)
+        self.assertNotIn("auth.User", whitelist)
+        self.assertNotIn("auth.Group2", whitelist)
+
+    def test_invalid_pattern(self):
+        with self.assertRaisesMessage(ValueError, "Invalid pattern type"):
+            ModelWhitelist([42])
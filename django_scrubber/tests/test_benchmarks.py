@@ -0,0 +1,68 @@
+import warnings
+from io import StringIO
+
+from django.apps import apps
+from django.test import TestCase
+
+from benchmarks import scrubbers as benchmark
+from django_scrubber import scrubbers
+from example.models import DataToBeScrubbed
+
+
+class TestScrubbersBenchmark(TestCase):
+    def setUp(self):
+        # fake data initialized by other tests has been rolled back
+        scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+
+    def test_run(self):
+        results = benchmark.run(rows=30, pk_types=("int",), repeat=1, stdout=StringIO())
+
+        self.assertEqual(DataToBeScrubbed.objects.count(), 30)
+        self.assertEqual(set(results), {"int Hash", "int Faker", "int IfNotEmpty", "validator"})
+        self.assertGreater(results["int Hash"]["rows_per_second"], 0)
+        self.assertGreater(results["int Hash"]["queries"], 0)
+        self.assertIn("faker_seconds", results["int Faker"])
+        self.assertNotIn("faker_seconds", results["int Hash"])
+
+    def test_models(self):
+        with warnings.catch_warnings():
+            # models must not be registered again
+            warnings.simplefilter("error", RuntimeWarning)
+            model_classes = benchmark.get_models(benchmark.PK_TYPES)
+            self.assertEqual(benchmark.get_models(benchmark.PK_TYPES), model_classes)
+
+            self.assertIs(model_classes["int"], DataToBeScrubbed)
+            self.assertNotIn(model_classes["uuid"], apps.get_models())
+            with benchmark.register_models(model_classes.values()):
+                self.assertIs(apps.get_model("example", "UuidDataToBeScrubbed"), model_classes["uuid"])
+            with benchmark.register_models(model_classes.values()):
+                self.assertIs(apps.get_model("example", "CharDataToBeScrubbed"), model_classes["char"])
+
+        # they don't outlive the benchmark
+        self.assertNotIn(model_classes["uuid"], apps.get_models())
+        self.assertNotIn(model_classes["char"], apps.get_models())
+        self.assertIn(DataToBeScrubbed, apps.get_models())
+
+    def test_find_regressions(self):
+        baseline = {
+            "int Hash": {"rows_per_second": 1000, "statements": 1, "queries": 10},
+            "int Faker": {"rows_per_second": 1000, "faker_seconds": 1.0},
+        }
+
+        self.assertEqual(benchmark.find_regressions(baseline, baseline, 0.25), [])
+        self.assertEqual(
+            benchmark.find_regressions(
+                {
+                    "int Hash": {"rows_per_second": 800, "statements": 1, "queries": 11},
+                    "int Faker": {"rows_per_second": 700, "faker_seconds": 1.3},
+                    "validator": {"seconds": 1.0},
+                },
+                baseline,
+                0.25,
+            ),
+            [
+                "int Hash queries: 11 (baseline 10)",
+                "int Faker rows_per_second: 700 (baseline 1,000)",
+                "int Faker faker_seconds: 1.3000 (baseline 1.0000)",
+            ],
+        )
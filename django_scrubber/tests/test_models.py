@@ -13,6 +13,7 @@ from django_scrubber import models
 
 class TestDjangoScrubber(TestCase):
     def test_uniqueness(self):
-        models.FakeData.objects.create(provider="foo", provider_offset=0, content="bar")
+        provider = models.FakeDataProvider.objects.create(key="foo", fingerprint="")
+        models.FakeData.objects.create(provider=provider, provider_offset=0, content="bar")
         with self.assertRaises(IntegrityError):
-            models.FakeData.objects.create(provider="foo", provider_offset=0, content="baz")
+            models.FakeData.objects.create(provider=provider, provider_offset=0, content="baz")
@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from django_scrubber import plan as plan_module
+from django_scrubber import scrubbers
+from django_scrubber.plan import ScrubPlan
+
+User = get_user_model()
+EMAIL_SCRUBBER = scrubbers.Faker("email")
+
+
+class UserScrubbers:
+    first_name = scrubbers.Hash
+    last_name = scrubbers.Keep
+
+
+@override_settings(SCRUBBER_GLOBAL_SCRUBBERS={"email": EMAIL_SCRUBBER})
+class TestScrubPlan(TestCase):
+    def test_get_scrubbers(self):
+        with patch.object(User, "Scrubbers", UserScrubbers, create=True):
+            plan = ScrubPlan()
+
+            self.assertEqual(
+                plan.get_scrubbers(User),
+                {User._meta.get_field("first_name"): scrubbers.Hash, User._meta.get_field("email"): EMAIL_SCRUBBER},
+            )
+            self.assertEqual(plan.get_declared_fields(User), ("first_name", "last_name"))
+
+    def test_resolves_models_once(self):
+        plan = ScrubPlan()
+        with patch.object(plan_module, "_get_model_scrubbers", wraps=plan_module._get_model_scrubbers) as resolve:
+            plan.get_scrubbers(User)
+            plan.get_declared_fields(User)
+            plan.get_scrubbers(User)
+
+        self.assertEqual(resolve.call_count, 1)
@@ -1,26 +1,51 @@
+import json
+import zlib
 from datetime import timedelta
 from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock, skipIf
 from unittest.mock import patch
 from uuid import uuid4
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, UserManager
 from django.contrib.sessions.models import Session
 from django.core.management import call_command
-from django.db.models import Value
-from django.test import TestCase, override_settings
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.db.models import Q, Value
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 
-from django_scrubber import scrubbers
-from django_scrubber.management.commands.scrub_data import _get_model_scrubbers, _parse_scrubber_class_from_string
+from django_scrubber import scrubbers, sql
+from django_scrubber.management.commands.scrub_data import (
+    Command,
+    _filter_pk_range,
+    _get_queryset,
+    estimate_row_count,
+    get_shard_ranges,
+)
+from django_scrubber.models import FakeData, FakeDataProvider, ScrubRun, ScrubWatermark
+from django_scrubber.plan import _get_model_scrubbers, _parse_scrubber_class_from_string
+from example.models import DataFactory, DataToBeScrubbed
 
 User = get_user_model()
 
 
+class ActiveUserManager(UserManager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_active=True)
+
+
 class TestScrubData(TestCase):
     DEFAULT_USER_FIRST_NAME = "default_test_first_name"
     DEFAULT_SESSION_DATA = "default_test_session_data"
 
     def setUp(self):
+        # fake data initialized by other tests has been rolled back
+        scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+
         # model with integer pk
         self.user = User.objects.create(first_name=self.DEFAULT_USER_FIRST_NAME)
 
@@ -103,6 +128,475 @@ class TestScrubData(TestCase):
 
         self.assertNotEqual(self.session.session_data, self.DEFAULT_SESSION_DATA)
 
+    def test_scrub_data_in_batches(self):
+        users = [User.objects.create(username=f"user{i}", first_name=self.DEFAULT_USER_FIRST_NAME) for i in range(4)]
+        out = StringIO()
+
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}):
+            call_command("scrub_data", "--batch-size", "2", stdout=out)
+
+        for user in [self.user, *users]:
+            user.refresh_from_db()
+            self.assertRegex(user.first_name, "[a-f0-9]{32}")
+        self.assertIn("5 rows in 3 batches", out.getvalue())
+        self.assertIn("peak transaction size 2 rows", out.getvalue())
+
+    def test_scrub_data_in_batches_non_integer_primary_key(self):
+        for _ in range(2):
+            Session.objects.create(
+                session_key=uuid4(),
+                session_data=self.DEFAULT_SESSION_DATA,
+                expire_date=timezone.localtime() + timedelta(days=1),
+            )
+
+        class Scrubbers:
+            session_data = Value("this is a new value")
+
+        out = StringIO()
+        with self.settings(DEBUG=True), patch.object(Session, "Scrubbers", Scrubbers, create=True):
+            call_command("scrub_data", "--keep-sessions", "--batch-size", "2", stdout=out)
+
+        self.assertFalse(Session.objects.filter(session_data=self.DEFAULT_SESSION_DATA).exists())
+        self.assertIn("3 rows in 2 batches", out.getvalue())
+
+    def test_scrub_data_batch_size_meta_override(self):
+        class Scrubbers:
+            first_name = scrubbers.Hash
+
+            class Meta:
+                batch_size = 1
+
+        User.objects.create(username="other", first_name=self.DEFAULT_USER_FIRST_NAME)
+        out = StringIO()
+
+        with self.settings(DEBUG=True), patch.object(User, "Scrubbers", Scrubbers, create=True):
+            call_command("scrub_data", "--model", "auth.User", stdout=out)
+
+        self.assertFalse(User.objects.filter(first_name=self.DEFAULT_USER_FIRST_NAME).exists())
+        self.assertIn("2 rows in 3 batches", out.getvalue())
+
+    def test_scrub_data_invalid_batch_size(self):
+        with self.settings(DEBUG=True), self.assertRaises(CommandError):
+            call_command("scrub_data", "--batch-size", "0", stdout=StringIO())
+
+    @skipIf(connection.vendor != "sqlite", "SQLite only")
+    def test_scrub_data_jobs_ignored_on_sqlite(self):
+        out = StringIO()
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}):
+            call_command("scrub_data", "--jobs", "4", stdout=out)
+        self.user.refresh_from_db()
+
+        self.assertIn("SQLite does not support concurrent writes, ignoring --jobs", out.getvalue())
+        self.assertRegex(self.user.first_name, "[a-f0-9]{32}")
+
+    @skipIf(connection.vendor != "postgresql", "PostgreSQL only")
+    def test_scrub_data_copy_strategy(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, User._meta.db_table)
+            referencing_count = self._count_referencing_constraints(cursor)
+
+        out = StringIO()
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--model", "auth.User", "--strategy", "copy", stdout=out)
+        self.user.refresh_from_db()
+
+        self.assertNotEqual(self.user.first_name, self.DEFAULT_USER_FIRST_NAME)
+        self.assertIn("1 rows copied", out.getvalue())
+        # indexes, constraints and the primary key sequence survive the swap
+        with connection.cursor() as cursor:
+            self.assertEqual(connection.introspection.get_constraints(cursor, User._meta.db_table), constraints)
+            self.assertEqual(self._count_referencing_constraints(cursor), referencing_count)
+        self.assertGreater(User.objects.create(username="new").pk, self.user.pk)
+
+    @skipIf(connection.vendor != "postgresql", "PostgreSQL only")
+    def test_scrub_data_copy_strategy_keeps_hidden_rows(self):
+        inactive_user = User.objects.create(username="inactive", first_name="Inactive", is_active=False)
+        active_manager = ActiveUserManager()
+        active_manager.model = User
+
+        with (
+            patch.object(User, "objects", active_manager),
+            self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}),
+        ):
+            call_command("scrub_data", "--model", "auth.User", "--strategy", "copy", stdout=StringIO())
+        inactive_user.refresh_from_db()
+
+        self.assertRegex(inactive_user.first_name, "[a-f0-9]{32}")
+
+    @skipIf(connection.vendor != "postgresql", "PostgreSQL only")
+    def test_scrub_data_copy_strategy_recreates_triggers_and_privileges(self):
+        table = connection.ops.quote_name(User._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE FUNCTION scrubber_test_trigger() RETURNS trigger LANGUAGE plpgsql AS "
+                "$$ BEGIN NEW.last_name := 'triggered'; RETURN NEW; END $$",
+            )
+            cursor.execute(
+                f"CREATE TRIGGER scrubber_test BEFORE UPDATE ON {table} FOR EACH ROW "
+                "EXECUTE FUNCTION scrubber_test_trigger()",
+            )
+            cursor.execute(f"GRANT SELECT ON {table} TO PUBLIC")
+            cursor.execute(f"ALTER TABLE {table} SET (fillfactor = 70)")
+
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}):
+            call_command("scrub_data", "--model", "auth.User", "--strategy", "copy", stdout=StringIO())
+        self.user.refresh_from_db()
+
+        # the trigger didn't fire for the copy, but is back in place
+        self.assertEqual(self.user.last_name, "")
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.last_name, "triggered")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT has_table_privilege('public', %s, 'SELECT'), reloptions FROM pg_class "
+                "WHERE oid = %s::regclass",
+                [table, table],
+            )
+            self.assertEqual(cursor.fetchone(), (True, ["fillfactor=70"]))
+
+    @skipIf(connection.vendor != "postgresql", "PostgreSQL only")
+    def test_scrub_data_copy_strategy_refuses_row_security(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {connection.ops.quote_name(User._meta.db_table)} ENABLE ROW LEVEL SECURITY")
+
+        with (
+            self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}),
+            self.assertRaisesMessage(CommandError, "the copy strategy can't carry over its row security policies"),
+        ):
+            call_command("scrub_data", "--model", "auth.User", "--strategy", "copy", stdout=StringIO())
+
+    def _count_referencing_constraints(self, cursor):
+        cursor.execute("SELECT COUNT(*) FROM pg_constraint WHERE confrelid = %s::regclass", [User._meta.db_table])
+        return cursor.fetchone()[0]
+
+    @skipIf(connection.vendor == "postgresql", "Supported on PostgreSQL")
+    def test_scrub_data_copy_strategy_requires_postgresql(self):
+        with (
+            self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}),
+            self.assertRaisesMessage(CommandError, "the copy strategy requires PostgreSQL"),
+        ):
+            call_command("scrub_data", "--model", "auth.User", "--strategy", "copy", stdout=StringIO())
+
+    def test_scrub_data_invalid_strategy_option(self):
+        class Scrubbers:
+            first_name = scrubbers.Hash
+
+            class Meta:
+                strategy = "rewrite"
+
+        with (
+            self.settings(DEBUG=True),
+            patch.object(User, "Scrubbers", Scrubbers, create=True),
+            self.assertRaisesMessage(CommandError, "Unsupported strategy 'rewrite' for auth.User"),
+        ):
+            call_command("scrub_data", "--model", "auth.User", stdout=StringIO())
+
+    def test_scrub_data_plan(self):
+        out = StringIO()
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--model", "auth.User", "--plan", "--batch-size", "10", stdout=out)
+        self.user.refresh_from_db()
+
+        # nothing is modified or generated
+        self.assertEqual(self.user.first_name, self.DEFAULT_USER_FIRST_NAME)
+        self.assertTrue(Session.objects.exists())
+        self.assertFalse(FakeDataProvider.objects.exists())
+
+        output = out.getvalue()
+        self.assertRegex(output, r"~\d+ rows, strategy update, batches of 10 rows")
+        self.assertRegex(output, r"SQL: UPDATE .+auth_user")
+        self.assertIn("Plan:", output)
+
+    def test_scrub_data_plan_unique_faker(self):
+        out = StringIO()
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"username": scrubbers.UniqueFaker("user_name")}):
+            call_command("scrub_data", "--model", "auth.User", "--plan", stdout=out)
+
+        # the plan shows the statement joining the ranks the run materializes, without creating them
+        output = out.getvalue()
+        self.assertRegex(output, r"SQL: UPDATE .+scrubber_rank_auth_user")
+        self.assertNotIn("ROW_NUMBER", output)
+        self.assertIn("Ranks: materialized into scrubber_rank_auth_user by the run", output)
+        self.assertNotIn("Plan:", output)
+        self.assertNotIn("scrubber_rank_auth_user", connection.introspection.table_names())
+        self.assertFalse(FakeDataProvider.objects.exists())
+
+    def test_scrub_data_report_json(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "report.json"
+            with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+                call_command("scrub_data", "--report-json", str(path), "--remove-fake-data", stdout=StringIO())
+            report = json.loads(path.read_text())
+
+        self.assertEqual(report["models"]["auth.User"]["rows"], 1)
+        self.assertGreaterEqual(report["models"]["auth.User"]["statements"], 1)
+        self.assertIn("rows_per_second", report["models"]["auth.User"])
+        self.assertEqual(
+            list(report["faker_providers"].values()),
+            [{"duration": mock.ANY, "reused": False}],
+        )
+        self.assertEqual(set(report["truncation"]), {"sessions.Session", "fake_data"})
+        self.assertGreater(report["duration"], 0)
+
+    def test_get_shard_ranges(self):
+        for i in range(9):
+            User.objects.create(username=f"user{i}")
+
+        shard_ranges = get_shard_ranges(User, 3)
+
+        self.assertEqual(len(shard_ranges), 3)
+        self.assertEqual(shard_ranges[0][0], None)
+        self.assertEqual(shard_ranges[-1][1], None)
+        shard_pks = [set(_filter_pk_range(User.objects.all(), r).values_list("pk", flat=True)) for r in shard_ranges]
+        self.assertEqual(set.union(*shard_pks), set(User.objects.values_list("pk", flat=True)))
+        self.assertEqual(sum(len(pks) for pks in shard_pks), User.objects.count())
+
+    def test_get_shard_ranges_non_integer_primary_key(self):
+        for _ in range(5):
+            Session.objects.create(session_key=uuid4(), session_data="", expire_date=timezone.localtime())
+
+        shard_ranges = get_shard_ranges(Session, 2)
+
+        self.assertEqual(len(shard_ranges), 2)
+        self.assertEqual([_filter_pk_range(Session.objects.all(), r).count() for r in shard_ranges], [3, 3])
+
+    def test_scrub_data_records_run(self):
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--model", "auth.User", "--batch-size", "2", stdout=StringIO())
+
+        scrub_run = ScrubRun.objects.get()
+        self.assertIsNotNone(scrub_run.finished)
+        self.assertEqual(scrub_run.options["model"], "auth.User")
+        self.assertEqual(scrub_run.options["batch_size"], 2)
+        self.assertFalse(scrub_run.checkpoints.exists())
+
+    def test_scrub_data_resume(self):
+        for i in range(4):
+            User.objects.create(username=f"user{i}", first_name=self.DEFAULT_USER_FIRST_NAME)
+        update = sql.update
+
+        def interrupted_update(queryset, values):
+            if interrupted_update.calls:
+                raise CommandError("interrupted")
+            interrupted_update.calls += 1
+            return update(queryset, values)
+
+        interrupted_update.calls = 0
+
+        with self.settings(
+            DEBUG=True,
+            SCRUBBER_RANDOM_SEED=None,
+            SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")},
+        ):
+            with (
+                patch("django_scrubber.sql.update", side_effect=interrupted_update),
+                self.assertRaisesMessage(CommandError, "interrupted"),
+            ):
+                call_command("scrub_data", "--model", "auth.User", "--batch-size", "2", stdout=StringIO())
+            first_names = list(User.objects.order_by("pk").values_list("first_name", flat=True))
+            fake_data = set(FakeData.objects.values_list("pk", flat=True))
+
+            # a new process doesn't know about the initialized providers
+            scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+            with patch("django_scrubber.sql.update", wraps=update) as mocked_update:
+                call_command("scrub_data", "--resume", stdout=StringIO())
+
+        self.assertEqual(first_names[2:], [self.DEFAULT_USER_FIRST_NAME] * 3)
+        # only the remaining batches are scrubbed, with the data generated by the interrupted run
+        self.assertEqual(mocked_update.call_count, 2)
+        self.assertEqual(set(FakeData.objects.values_list("pk", flat=True)), fake_data)
+        resumed_first_names = list(User.objects.order_by("pk").values_list("first_name", flat=True))
+        self.assertEqual(resumed_first_names[:2], first_names[:2])
+        self.assertNotIn(self.DEFAULT_USER_FIRST_NAME, resumed_first_names)
+        self.assertIsNotNone(ScrubRun.objects.get().finished)
+
+    def test_scrub_data_resume_python_scrubber(self):
+        # in addition to the default user
+        for i in range(3):
+            User.objects.create(username=f"user{i}", first_name="foo")
+        update_rows = sql.update_rows
+
+        def interrupted_update_rows(*args):
+            if interrupted_update_rows.calls:
+                raise CommandError("interrupted")
+            interrupted_update_rows.calls += 1
+            return update_rows(*args)
+
+        interrupted_update_rows.calls = 0
+
+        with self.settings(
+            DEBUG=True,
+            SCRUBBER_PYTHON_CHUNK_SIZE=2,
+            SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.PythonScrubber(str.upper)},
+        ):
+            with (
+                patch("django_scrubber.sql.update_rows", side_effect=interrupted_update_rows),
+                self.assertRaisesMessage(CommandError, "interrupted"),
+            ):
+                call_command("scrub_data", "--model", "auth.User", stdout=StringIO())
+            self.assertEqual(
+                list(User.objects.order_by("pk").values_list("first_name", flat=True)),
+                [self.DEFAULT_USER_FIRST_NAME.upper(), "FOO", "foo", "foo"],
+            )
+
+            with patch("django_scrubber.sql.update_rows", wraps=update_rows) as mocked_update_rows:
+                call_command("scrub_data", "--resume", stdout=StringIO())
+
+        self.assertEqual(mocked_update_rows.call_count, 1)
+        self.assertEqual(
+            list(User.objects.order_by("pk").values_list("first_name", flat=True)),
+            [self.DEFAULT_USER_FIRST_NAME.upper(), "FOO", "FOO", "FOO"],
+        )
+
+    def test_scrub_data_resume_without_interrupted_run(self):
+        with self.settings(DEBUG=True), self.assertRaisesMessage(CommandError, "no interrupted run to resume"):
+            call_command("scrub_data", "--resume", stdout=StringIO())
+
+    def test_scrub_data_resume_after_finished_run(self):
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            with (
+                patch("django_scrubber.sql.update", side_effect=CommandError("interrupted")),
+                self.assertRaisesMessage(CommandError, "interrupted"),
+            ):
+                call_command("scrub_data", "--model", "auth.User", stdout=StringIO())
+            call_command("scrub_data", "--model", "auth.User", stdout=StringIO())
+
+            # the interrupted run is outdated by the finished one
+            with self.assertRaisesMessage(CommandError, "no interrupted run to resume, the last run has finished"):
+                call_command("scrub_data", "--resume", stdout=StringIO())
+
+    def test_scrub_data_incremental(self):
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--model", "auth.User", "--incremental", stdout=StringIO())
+            self.assertEqual(ScrubWatermark.objects.get(model="auth.User").value, str(self.user.pk))
+
+            User.objects.update(first_name=self.DEFAULT_USER_FIRST_NAME)
+            new_user = User.objects.create(username="new", first_name=self.DEFAULT_USER_FIRST_NAME)
+            call_command("scrub_data", "--model", "auth.User", "--incremental", "--batch-size", "1", stdout=StringIO())
+        self.user.refresh_from_db()
+        new_user.refresh_from_db()
+
+        self.assertEqual(self.user.first_name, self.DEFAULT_USER_FIRST_NAME)
+        self.assertNotEqual(new_user.first_name, self.DEFAULT_USER_FIRST_NAME)
+        self.assertEqual(ScrubWatermark.objects.get(model="auth.User").value, str(new_user.pk))
+
+    def test_scrub_data_incremental_field(self):
+        class Scrubbers:
+            first_name = scrubbers.Faker("first_name")
+
+            class Meta:
+                incremental_field = "date_joined"
+
+        User.objects.filter(pk=self.user.pk).update(date_joined=timezone.now() - timedelta(days=1))
+        changed_user = User.objects.create(username="changed", first_name=self.DEFAULT_USER_FIRST_NAME)
+        with self.settings(DEBUG=True), patch.object(User, "Scrubbers", Scrubbers, create=True):
+            call_command("scrub_data", "--model", "auth.User", "--incremental", stdout=StringIO())
+            User.objects.update(first_name=self.DEFAULT_USER_FIRST_NAME)
+            User.objects.filter(pk=self.user.pk).update(date_joined=timezone.now() + timedelta(days=1))
+            call_command("scrub_data", "--model", "auth.User", "--incremental", stdout=StringIO())
+        self.user.refresh_from_db()
+        changed_user.refresh_from_db()
+
+        self.assertNotEqual(self.user.first_name, self.DEFAULT_USER_FIRST_NAME)
+        self.assertEqual(changed_user.first_name, self.DEFAULT_USER_FIRST_NAME)
+        self.assertEqual(ScrubWatermark.objects.get(model="auth.User").field, "date_joined")
+
+    def test_scrub_data_incremental_non_integer_pk(self):
+        with (
+            self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"session_data": scrubbers.Hash}),
+            self.assertRaisesMessage(CommandError, "can't be scrubbed incrementally by its non-integer primary key"),
+        ):
+            call_command(
+                "scrub_data",
+                "--model",
+                "sessions.Session",
+                "--keep-sessions",
+                "--incremental",
+                stdout=StringIO(),
+            )
+        self.assertFalse(ScrubWatermark.objects.exists())
+
+    def test_scrub_data_truncate_models(self):
+        DataFactory.create_batch(2, first_name="Foo")
+        out = StringIO()
+        with self.settings(
+            DEBUG=True,
+            SCRUBBER_TRUNCATE_MODELS=("example.DataToBeScrubbed",),
+            SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")},
+        ):
+            call_command("scrub_data", stdout=out)
+
+        self.assertFalse(DataToBeScrubbed.objects.exists())
+        self.assertFalse(Session.objects.exists())
+        self.assertIn("Truncated example.DataToBeScrubbed", out.getvalue())
+        self.assertNotIn("Scrubbing example.DataToBeScrubbed", out.getvalue())
+
+    def test_scrub_data_purge_filter(self):
+        class Scrubbers:
+            first_name = scrubbers.Hash
+
+            class Meta:
+                def purge():
+                    return Q(date_past__lt=timezone.localdate() - timedelta(days=30))
+
+        old = DataFactory.create(first_name="Foo", date_past=timezone.localdate() - timedelta(days=60))
+        recent = DataFactory.create(first_name="Foo", date_past=timezone.localdate())
+        out = StringIO()
+        with self.settings(DEBUG=True), patch.object(DataToBeScrubbed, "Scrubbers", Scrubbers, create=True):
+            call_command("scrub_data", "--plan", stdout=out)
+            self.assertIn("Purging example.DataToBeScrubbed: (AND: ('date_past__lt'", out.getvalue())
+            self.assertEqual(DataToBeScrubbed.objects.count(), 2)
+
+            call_command("scrub_data", "--model", "example.DataToBeScrubbed", stdout=out)
+
+        self.assertFalse(DataToBeScrubbed.objects.filter(pk=old.pk).exists())
+        recent.refresh_from_db()
+        self.assertNotEqual(recent.first_name, "Foo")
+        self.assertIn("Purged 1 rows of example.DataToBeScrubbed", out.getvalue())
+
+    def test_pk_offset_hash(self):
+        for i in range(10):
+            Session.objects.create(session_key=f"key{i}", session_data="", expire_date=timezone.localtime())
+
+        for pk_offset_hash in ("md5", "builtin"):
+            with self.subTest(pk_offset_hash), self.settings(SCRUBBER_PK_OFFSET_HASH=pk_offset_hash):
+                offsets = list(_get_queryset(Session).order_by("pk").values_list("mod_pk", flat=True))
+                self.assertEqual(offsets, list(_get_queryset(Session).order_by("pk").values_list("mod_pk", flat=True)))
+                self.assertTrue(all(0 <= offset < 1000 for offset in offsets))  # noqa: PLR2004
+        self.assertGreater(len(set(offsets)), 1)
+
+    @skipIf(connection.vendor != "sqlite", "SQLite only")
+    def test_sqlite_functions_registered(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT SCRUBBER_CRC32(%s)", ["key"])
+            self.assertEqual(cursor.fetchone()[0], zlib.crc32(b"key"))
+
+    @override_settings(SCRUBBER_PK_OFFSET_HASH="sha1")
+    def test_pk_offset_hash_invalid(self):
+        with self.assertRaisesMessage(CommandError, "SCRUBBER_PK_OFFSET_HASH must be one of md5, builtin"):
+            _get_queryset(Session)
+
+    def test_get_shard_ranges_single_shard(self):
+        self.assertEqual(get_shard_ranges(User, 1), [(None, None)])
+
+    def test_estimate_row_count(self):
+        self.assertEqual(estimate_row_count(Session) if connection.vendor == "sqlite" else 1, 1)
+        self.assertGreaterEqual(estimate_row_count(User), 0)
+
+    @skipIf(connection.vendor != "postgresql", "PostgreSQL only")
+    def test_estimate_row_count_not_analyzed(self):
+        # tables of the test database have never been analyzed, so their statistics are unknown rather than empty
+        DataFactory.create_batch(2)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = to_regclass(%s)",
+                [DataToBeScrubbed._meta.db_table],
+            )
+            self.assertLess(cursor.fetchone()[0], 0)
+
+        self.assertEqual(estimate_row_count(DataToBeScrubbed), 2)
+
     def test_scrub_invalid_field(self):
         class Scrubbers:
             this_does_not_exist_382784 = scrubbers.Null
@@ -121,10 +615,10 @@ class TestScrubData(TestCase):
     def test_get_model_scrubbers_mapper_from_settings_used(self):
         with (
             patch(
-                "django_scrubber.management.commands.scrub_data._parse_scrubber_class_from_string",
+                "django_scrubber.plan._parse_scrubber_class_from_string",
                 return_value={},
             ) as mocked_method,
-            patch("django_scrubber.management.commands.scrub_data._get_fields", return_value=[]),
+            patch("django_scrubber.plan._get_fields", return_value=[]),
         ):
             test_scrubbers = _get_model_scrubbers(User)
         mocked_method.assert_called_once()
@@ -141,3 +635,209 @@ class TestScrubData(TestCase):
     def test_parse_scrubber_class_from_string_path_no_separator(self):
         with self.assertRaises(ImportError):
             _parse_scrubber_class_from_string("broken_path")
+
+
+class TestScrubDataConcurrently(TransactionTestCase):
+    def setUp(self):
+        # fake data initialized by other tests has been rolled back
+        scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+
+    def test_scrub_data_jobs(self):
+        user = User.objects.create(first_name="Foo")
+        data = DataFactory.create(first_name="Foo")
+
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--jobs", "2", stdout=StringIO())
+        user.refresh_from_db()
+        data.refresh_from_db()
+
+        self.assertNotEqual(user.first_name, "Foo")
+        self.assertNotEqual(data.first_name, "Foo")
+
+    def test_scrub_data_shards(self):
+        users = [User.objects.create(username=f"user{i}", first_name="Foo") for i in range(10)]
+
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}):
+            call_command("scrub_data", "--model", "auth.User", "--shards", "4", stdout=StringIO())
+
+        for user in users:
+            user.refresh_from_db()
+            self.assertRegex(user.first_name, "[a-f0-9]{32}")
+
+    def test_scrub_data_shards_match_serial_run(self):
+        for i in range(10):
+            User.objects.create(username=f"user{i}", first_name="Foo")
+
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--model", "auth.User", stdout=StringIO())
+            serial_names = dict(User.objects.values_list("pk", "first_name"))
+            User.objects.update(first_name="Foo")
+            call_command("scrub_data", "--model", "auth.User", "--shards", "3", "--batch-size", "2", stdout=StringIO())
+
+        self.assertEqual(dict(User.objects.values_list("pk", "first_name")), serial_names)
+
+    @skipIf(connection.vendor == "sqlite", "SQLite does not enforce max_length")
+    def test_scrub_data_jobs_reports_failed_models(self):
+        user = User.objects.create(first_name="Foo")
+        DataFactory.create(first_name="Foo")
+
+        class Scrubbers:
+            # exceeds max_length of 8 characters
+            first_name = Value("far too long for this field")
+
+        err = StringIO()
+        with (
+            self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}),
+            patch.object(DataToBeScrubbed, "Scrubbers", Scrubbers, create=True),
+            self.assertRaisesMessage(CommandError, "Scrubbing failed for 1 model(s): example.DataToBeScrubbed"),
+        ):
+            call_command("scrub_data", "--jobs", "2", stdout=StringIO(), stderr=err)
+        user.refresh_from_db()
+
+        # other models are scrubbed regardless
+        self.assertRegex(user.first_name, "[a-f0-9]{32}")
+        self.assertIn("Scrubbing example.DataToBeScrubbed failed", err.getvalue())
+
+    @skipIf(connection.vendor == "sqlite", "SQLite does not scrub concurrently")
+    def test_scrub_data_jobs_reports_unexpected_errors(self):
+        user = User.objects.create(first_name="Foo")
+        DataFactory.create(first_name="Foo")
+        update = sql.update
+
+        def failing_update(queryset, values):
+            if queryset.model is DataToBeScrubbed:
+                raise ValueError("boom")
+            return update(queryset, values)
+
+        err = StringIO()
+        with (
+            self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}),
+            patch("django_scrubber.sql.update", side_effect=failing_update),
+            self.assertRaisesMessage(CommandError, "Scrubbing failed for 1 model(s): example.DataToBeScrubbed"),
+        ):
+            call_command("scrub_data", "--jobs", "2", stdout=StringIO(), stderr=err)
+        user.refresh_from_db()
+
+        self.assertRegex(user.first_name, "[a-f0-9]{32}")
+        self.assertIn("Scrubbing example.DataToBeScrubbed failed: ValueError('boom')", err.getvalue())
+
+    def test_scrub_data_report_json_sharded(self):
+        for i in range(4):
+            User.objects.create(username=f"user{i}")
+
+        out = StringIO()
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Hash}):
+            call_command("scrub_data", "--model", "auth.User", "--shards", "2", "--report-json", "-", stdout=out)
+        report = json.loads(out.getvalue()[out.getvalue().index("{\n") :])
+
+        self.assertEqual(report["models"]["auth.User"]["rows"], 4)
+
+
+class TestScrubDataPurge(TransactionTestCase):
+    def test_scrub_data_truncate_referenced_models(self):
+        user = User.objects.create(username="foo")
+        user.groups.add(Group.objects.create(name="Foo"))
+        out = StringIO()
+        with self.settings(DEBUG=True, SCRUBBER_TRUNCATE_MODELS=("auth.Group",)):
+            call_command("scrub_data", "--model", "auth.Group", "--keep-sessions", stdout=out)
+
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(User.groups.through.objects.exists())
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+        self.assertIn("Truncated auth.User_groups", out.getvalue())
+
+    def test_scrub_data_truncate_referenced_by_other_model(self):
+        group = Group.objects.create(name="Foo")
+        with (
+            self.settings(DEBUG=True, SCRUBBER_TRUNCATE_MODELS=("auth.Group", "contenttypes.ContentType")),
+            self.assertRaisesMessage(CommandError, "auth.Permission references contenttypes.ContentType"),
+        ):
+            call_command("scrub_data", "--keep-sessions", stdout=StringIO())
+
+        self.assertTrue(Group.objects.filter(pk=group.pk).exists())
+
+
+class TestScrubDataDatabases(TransactionTestCase):
+    databases = frozenset({"default", "other"})
+
+    def setUp(self):
+        # fake data initialized by other tests has been rolled back
+        scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+        for alias in self.databases:
+            User.objects.using(alias).create(username="foo", first_name="Foo")
+
+    def _scrub(self, *args, **kwargs):
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--model", "auth.User", *args, **kwargs)
+
+    def test_scrub_data_databases(self):
+        out = StringIO()
+        self._scrub("--database", "default", "--database", "other", "--report-json", "-", stdout=out)
+        report = json.loads(out.getvalue()[out.getvalue().index("{\n") :])
+
+        for alias in ("default", "other"):
+            self.assertNotEqual(User.objects.using(alias).get().first_name, "Foo")
+            # every database gets its own Faker data and runs
+            self.assertTrue(FakeData.objects.using(alias).exists())
+            self.assertIsNotNone(ScrubRun.objects.using(alias).get().finished)
+            self.assertEqual(report["databases"][alias]["models"]["auth.User"]["rows"], 1)
+            self.assertIn(f"  {alias}: 1 rows of 1 models", out.getvalue())
+            self.assertIn(f"[{alias}] Scrubbing auth.User", out.getvalue())
+        # the same data is generated for both databases
+        self.assertEqual(
+            list(FakeData.objects.using("default").order_by("provider_offset").values_list("content", flat=True)),
+            list(FakeData.objects.using("other").order_by("provider_offset").values_list("content", flat=True)),
+        )
+
+    def test_scrub_data_single_database(self):
+        self._scrub("--database", "other", stdout=StringIO())
+
+        self.assertEqual(User.objects.using("default").get().first_name, "Foo")
+        self.assertNotEqual(User.objects.using("other").get().first_name, "Foo")
+        self.assertFalse(FakeData.objects.using("default").exists())
+
+    def test_scrub_data_databases_reports_failed_databases(self):
+        update = sql.update
+
+        def failing_update(queryset, values):
+            if queryset.db == "other":
+                raise DatabaseError("boom")
+            return update(queryset, values)
+
+        out = StringIO()
+        err = StringIO()
+        with (
+            patch("django_scrubber.sql.update", side_effect=failing_update),
+            self.assertRaisesMessage(CommandError, "Scrubbing failed for 1 database(s): other"),
+        ):
+            self._scrub("--database", "default", "--database", "other", stdout=out, stderr=err)
+
+        # other databases are scrubbed regardless
+        self.assertNotEqual(User.objects.using("default").get().first_name, "Foo")
+        self.assertIn("other: failed", out.getvalue())
+        self.assertIn("Scrubbing database other failed", err.getvalue())
+
+    def test_scrub_data_databases_reports_unexpected_errors(self):
+        realize_scrubbers = Command._realize_scrubbers
+
+        def failing_realize_scrubbers(command, model_class):
+            if command.database == "other":
+                raise ValueError("boom")
+            return realize_scrubbers(command, model_class)
+
+        out = StringIO()
+        err = StringIO()
+        with (
+            patch.object(Command, "_realize_scrubbers", autospec=True, side_effect=failing_realize_scrubbers),
+            self.assertRaisesMessage(CommandError, "Scrubbing failed for 1 database(s): other"),
+        ):
+            self._scrub("--database", "default", "--database", "other", stdout=out, stderr=err)
+
+        self.assertNotEqual(User.objects.using("default").get().first_name, "Foo")
+        self.assertIn("default: 1 rows of 1 models", out.getvalue())
+        self.assertIn("other: failed (ValueError('boom'))", out.getvalue())
+        self.assertIn("Scrubbing database other failed: ValueError('boom')", err.getvalue())
+
+    def test_scrub_data_unknown_database(self):
+        with self.assertRaisesMessage(CommandError, "Unknown database alias(es): foo"):
+            self._scrub("--database", "foo", stdout=StringIO())
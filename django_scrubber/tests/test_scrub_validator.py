@@ -2,6 +2,7 @@ from io import StringIO
 from unittest import mock
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase, override_settings
 
 from django_scrubber.services.validator import ScrubberValidatorService
@@ -46,3 +47,7 @@ class TestScrubValidator(TestCase):
 
         mocked_method.assert_called_once()
         self.assertIn("No unscrubbed fields detected. Yeah!", out.getvalue())
+
+    def test_scrub_validator_changed_only_requires_cache(self):
+        with self.assertRaisesMessage(CommandError, "--changed-only requires --cache"):
+            call_command("scrub_validation", "--changed-only", stdout=StringIO())
@@ -1,20 +1,35 @@
-from datetime import timedelta
+import re
+from datetime import date, timedelta
 from io import StringIO
 from unittest import mock, skipUnless
 
 import django
+from django.contrib.auth import get_user_model
 from django.contrib.sessions.models import Session
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Concat
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from django_scrubber import scrubbers
-from django_scrubber.models import FakeData
+from django_scrubber import ScrubberInitError, scrubbers, sql
+from django_scrubber.models import FakeData, FakeDataProvider
 from example.models import DataFactory, DataToBeScrubbed
 
+User = get_user_model()
+
+
+def redact_emails(value, first_name):
+    return re.sub(r"\S+@\S+", f"{first_name}@example.com", value) if value else value
+
 
 class TestScrubbers(TestCase):
+    def setUp(self):
+        # fake data initialized by other tests has been rolled back
+        scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+
     def test_empty_scrubber(self):
         data = DataFactory.create(first_name="Foo")
         with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Empty}):
@@ -123,6 +138,18 @@ class TestScrubbers(TestCase):
             self.assertGreater(today, data.date_past)
             self.assertLess(today - timedelta(days=31), data.date_past)
 
+    def test_faker_scrubber_typed_content(self):
+        data = DataFactory.create(date_past=timezone.localtime().date())
+        faker_scrubber = scrubbers.Faker("past_date", start_date="-30d")
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"date_past": faker_scrubber}):
+            call_command("scrub_data", stdout=StringIO())
+        data.refresh_from_db()
+
+        fakedata = FakeData.objects.filter(provider__key=faker_scrubber.provider_key)
+        self.assertFalse(fakedata.filter(content_date__isnull=True).exists())
+        self.assertIn(data.date_past, fakedata.values_list("content_date", flat=True))
+        self.assertFalse(FakeData.objects.filter(provider__key="company", content_date__isnull=False).exists())
+
     def test_faker_scrubber_run_twice(self):
         """
         Use this as an example of what happens when you want to run the same Faker scrubbers twice
@@ -136,6 +163,426 @@ class TestScrubbers(TestCase):
         self.assertNotEqual(data.company, "Foo")
         self.assertNotEqual(data.company, "")
 
+    def test_faker_provider_key_is_stable(self):
+        self.assertEqual(scrubbers.Faker("ean", length=8).provider_key, scrubbers.Faker("ean", length=8).provider_key)
+        self.assertNotEqual(
+            scrubbers.Faker("ean", length=8).provider_key,
+            scrubbers.Faker("ean", length=13).provider_key,
+        )
+        self.assertRegex(scrubbers.Faker("ean", length=8).provider_key, r"^ean - [0-9a-f]{16}$")
+
+    def test_faker_reuses_unchanged_data(self):
+        scrubbers.Faker("company")._initialize_data()
+        provider_key = scrubbers.Faker("company").provider_key
+        content = list(FakeData.objects.filter(provider__key=provider_key).values_list("content", flat=True))
+        self.assertTrue(FakeDataProvider.objects.filter(key=provider_key).exists())
+
+        with mock.patch("django_scrubber.scrubbers._get_faker_instance") as mock_faker:
+            scrubbers.Faker("company")._initialize_data()
+        mock_faker.assert_not_called()
+
+        self.assertEqual(
+            list(FakeData.objects.filter(provider__key=provider_key).values_list("content", flat=True)),
+            content,
+        )
+
+    def test_faker_regenerates_stale_data(self):
+        scrubbers.Faker("company")._initialize_data()
+        provider_key = scrubbers.Faker("company").provider_key
+
+        with self.settings(SCRUBBER_ENTRIES_PER_PROVIDER=10):
+            scrubbers.Faker("company")._initialize_data()
+
+        self.assertEqual(FakeData.objects.filter(provider__key=provider_key).count(), 10)
+        self.assertEqual(FakeDataProvider.objects.filter(key=provider_key).count(), 1)
+
+    def test_faker_regenerates_incomplete_data(self):
+        scrubbers.Faker("company")._initialize_data()
+        provider_key = scrubbers.Faker("company").provider_key
+        FakeData.objects.filter(provider__key=provider_key, provider_offset__gte=10).delete()
+
+        scrubbers.Faker("company")._initialize_data()
+
+        self.assertEqual(FakeData.objects.filter(provider__key=provider_key).count(), 1000)
+
+    @override_settings(SCRUBBER_RANDOM_SEED=None)
+    def test_faker_always_regenerates_without_seed(self):
+        scrubbers.Faker("company")._initialize_data()
+
+        with mock.patch("django_scrubber.scrubbers._get_faker_instance", wraps=scrubbers._get_faker_instance) as m:
+            scrubbers.Faker("company")._initialize_data()
+        m.assert_called_once()
+
+    @override_settings(SCRUBBER_FAKER_PROCESSES=2, SCRUBBER_FAKER_CHUNK_SIZE=100, SCRUBBER_ENTRIES_PER_PROVIDER=250)
+    def test_faker_parallel_generation_is_reproducible(self):
+        faker_scrubber = scrubbers.Faker("company")
+        faker_scrubber._initialize_data()
+        content = list(FakeData.objects.filter(provider__key=faker_scrubber.provider_key).order_by("provider_offset"))
+
+        self.assertEqual([item.provider_offset for item in content], list(range(250)))
+        self.assertGreater(len({item.content for item in content}), 1)
+
+        # same data, independent of the number of processes
+        FakeData.objects.all().delete()
+        with self.settings(SCRUBBER_FAKER_PROCESSES=1):
+            faker_scrubber._initialize_data()
+        self.assertEqual(
+            list(
+                FakeData.objects.filter(provider__key=faker_scrubber.provider_key)
+                .order_by("provider_offset")
+                .values_list("content", flat=True),
+            ),
+            [item.content for item in content],
+        )
+
+    @override_settings(SCRUBBER_FAKER_PROCESSES=2, SCRUBBER_FAKER_CHUNK_SIZE=100, SCRUBBER_ENTRIES_PER_PROVIDER=200)
+    def test_faker_parallel_generation_scrub_data(self):
+        data = DataFactory.create(company="Foo", last_name="Foo")
+        with self.settings(
+            DEBUG=True,
+            SCRUBBER_GLOBAL_SCRUBBERS={
+                "company": scrubbers.Faker("company"),
+                "last_name": scrubbers.Faker("last_name"),
+            },
+        ):
+            call_command("scrub_data", stdout=StringIO())
+        data.refresh_from_db()
+
+        self.assertNotEqual(data.company, "Foo")
+        self.assertNotEqual(data.last_name, "Foo")
+
+    @override_settings(SCRUBBER_FAKER_INSERT_BATCH_SIZE=100, SCRUBBER_ENTRIES_PER_PROVIDER=250)
+    def test_faker_stores_data_in_batches(self):
+        faker_scrubber = scrubbers.Faker("company")
+        with mock.patch("django_scrubber.sql.bulk_insert", wraps=sql.bulk_insert) as mock_bulk_insert:
+            faker_scrubber._initialize_data()
+
+        self.assertEqual([len(call.args[0]) for call in mock_bulk_insert.call_args_list], [100, 100, 50])
+        self.assertEqual(
+            list(
+                FakeData.objects.filter(provider__key=faker_scrubber.provider_key)
+                .order_by("provider_offset")
+                .values_list("provider_offset", flat=True),
+            ),
+            list(range(250)),
+        )
+
+    @override_settings(SCRUBBER_FAKER_PROCESSES=2)
+    def test_faker_fingerprint_ignores_insert_batch_size(self):
+        faker_scrubber = scrubbers.Faker("company")
+        fingerprint = faker_scrubber._get_fingerprint("en_US")
+
+        with self.settings(SCRUBBER_FAKER_INSERT_BATCH_SIZE=10):
+            self.assertEqual(faker_scrubber._get_fingerprint("en_US"), fingerprint)
+        with self.settings(SCRUBBER_FAKER_CHUNK_SIZE=10):
+            self.assertNotEqual(faker_scrubber._get_fingerprint("en_US"), fingerprint)
+
+    def test_bulk_insert(self):
+        provider = FakeDataProvider.objects.create(key="foo", fingerprint="")
+        sql.bulk_insert(
+            [
+                FakeData(provider=provider, provider_offset=0, content="tab\there\\ and\r\nnewline"),
+                FakeData(provider=provider, provider_offset=1, content=r"\N", content_int=1),
+                FakeData(provider=provider, provider_offset=2, content="2020-02-29", content_date=date(2020, 2, 29)),
+            ],
+            "default",
+        )
+
+        self.assertEqual(
+            list(
+                FakeData.objects.filter(provider=provider)
+                .order_by("provider_offset")
+                .values_list("content", "content_int", "content_date"),
+            ),
+            [
+                ("tab\there\\ and\r\nnewline", None, None),
+                (r"\N", 1, None),
+                ("2020-02-29", None, date(2020, 2, 29)),
+            ],
+        )
+
+    def test_faker_deferred_initialization(self):
+        faker_scrubber = scrubbers.Faker("company")
+
+        with scrubbers.Faker.deferred_initialization():
+            faker_scrubber(DataToBeScrubbed._meta.get_field("company"))
+            self.assertFalse(FakeData.objects.filter(provider__key=faker_scrubber.provider_key).exists())
+
+        self.assertTrue(FakeData.objects.filter(provider__key=faker_scrubber.provider_key).exists())
+        self.assertIsNone(scrubbers.Faker.DEFERRED_PROVIDERS)
+
+    def _scrub_with_strategy(self, strategy, *args, inline_max_entries=0):
+        with self.settings(
+            DEBUG=True,
+            SCRUBBER_FAKER_UPDATE_STRATEGY=strategy,
+            SCRUBBER_FAKER_INLINE_MAX_ENTRIES=inline_max_entries,
+            SCRUBBER_GLOBAL_SCRUBBERS={
+                "company": scrubbers.Faker("company"),
+                "last_name": scrubbers.Faker("last_name"),
+                "description": scrubbers.IfNotEmpty(scrubbers.Faker("sentence")),
+                "date_past": scrubbers.Faker("past_date", start_date="-30d"),
+            },
+        ):
+            call_command("scrub_data", "--model", "example.DataToBeScrubbed", *args, stdout=StringIO())
+        return list(
+            DataToBeScrubbed.objects.order_by("pk").values_list("company", "last_name", "description", "date_past"),
+        )
+
+    def test_faker_join_strategy_matches_subquery_strategy(self):
+        for i in range(5):
+            DataFactory.create(company="Foo", last_name="Foo", description="" if i % 2 else "Foo")
+
+        expected = self._scrub_with_strategy("subquery")
+        DataToBeScrubbed.objects.update(company="Foo", last_name="Foo")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._scrub_with_strategy("join"), expected)
+        update_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("UPDATE") and DataToBeScrubbed._meta.db_table in query["sql"]
+        ]
+        self.assertEqual(len(update_queries), 1)
+        self.assertIn("scrubber_fake_data", update_queries[0])
+
+        DataToBeScrubbed.objects.update(company="Foo", last_name="Foo")
+        self.assertEqual(self._scrub_with_strategy("join", "--batch-size", "2"), expected)
+
+        self.assertNotIn(("Foo", "Foo"), [row[:2] for row in expected])
+        self.assertEqual([row[2] for row in expected][1::2], ["", ""])
+
+    def test_faker_inline_matches_subquery_strategy(self):
+        for i in range(5):
+            DataFactory.create(company="Foo", last_name="Foo", description="" if i % 2 else "Foo")
+
+        expected = self._scrub_with_strategy("subquery")
+        DataToBeScrubbed.objects.update(company="Foo", last_name="Foo")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._scrub_with_strategy("subquery", inline_max_entries=1000), expected)
+        update_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("UPDATE") and DataToBeScrubbed._meta.db_table in query["sql"]
+        ]
+        self.assertEqual(len(update_queries), 1)
+        self.assertNotIn("django_scrubber_fakedata", update_queries[0])
+
+    def test_faker_inline_expression(self):
+        field = DataToBeScrubbed._meta.get_field("company")
+        with self.settings(SCRUBBER_FAKER_INLINE_MAX_ENTRIES=1000):
+            self.assertIsInstance(scrubbers.Faker("company")(field).source_expressions[0], scrubbers.FakerInline)
+
+        # falls back to the table for larger amounts of data
+        with self.settings(SCRUBBER_FAKER_INLINE_MAX_ENTRIES=999):
+            self.assertNotIsInstance(scrubbers.Faker("company")(field).source_expressions[0], scrubbers.FakerInline)
+
+    def test_faker_join_strategy_expression(self):
+        with self.settings(SCRUBBER_FAKER_UPDATE_STRATEGY="join"):
+            expression = scrubbers.Faker("company")(DataToBeScrubbed._meta.get_field("company"))
+
+        self.assertIsInstance(expression.source_expressions[0], scrubbers.FakerLookup)
+
+    def _scrub_unique(self, *args):
+        with self.settings(
+            DEBUG=True,
+            SCRUBBER_ENTRIES_PER_PROVIDER=3,
+            SCRUBBER_GLOBAL_SCRUBBERS={
+                "username": scrubbers.UniqueFaker("user_name"),
+                "first_name": scrubbers.Faker("first_name"),
+            },
+        ):
+            call_command("scrub_data", "--model", "auth.User", *args, stdout=StringIO())
+        return list(User.objects.order_by("pk").values_list("username", flat=True))
+
+    def test_unique_faker(self):
+        for i in range(7):
+            User.objects.create(username=f"user{i}", first_name="Foo")
+
+        with CaptureQueriesContext(connection) as queries:
+            usernames = self._scrub_unique()
+        update_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("UPDATE") and User._meta.db_table in query["sql"]
+        ]
+        # clearing the values, then assigning them
+        self.assertEqual(len(update_queries), 2)
+
+        self.assertEqual(len(set(usernames)), 7)
+        pool = usernames[:3]
+        self.assertEqual(usernames[3:], [f"{pool[0]}~1", f"{pool[1]}~1", f"{pool[2]}~1", f"{pool[0]}~2"])
+        self.assertFalse(User.objects.filter(first_name="Foo").exists())
+
+        # ranks are taken across the whole table, not per batch
+        User.objects.update(username=Concat(Value("user"), "pk"))
+        self.assertEqual(self._scrub_unique("--batch-size", "2"), usernames)
+        # ranks only live as long as the run
+        self.assertNotIn(sql.get_rank_table(User, "default"), connection.introspection.table_names())
+
+    def test_unique_faker_ranked_once(self):
+        users = [User.objects.create(username=f"user{i}") for i in range(5)]
+        with self.settings(SCRUBBER_ENTRIES_PER_PROVIDER=3):
+            values = {"username": scrubbers.UniqueFaker("user_name")(User._meta.get_field("username"))}
+        rank_table = sql.rank_rows(User.objects.all(), values)
+
+        # deleting rows between batches doesn't shift the ranks of the remaining ones onto values already assigned
+        with CaptureQueriesContext(connection) as queries:
+            sql.update(User.objects.filter(pk__lte=users[2].pk), values)
+            users[0].delete()
+            sql.update(User.objects.filter(pk__gt=users[2].pk), values)
+        sql.drop_ranks(rank_table, "default")
+
+        self.assertEqual(len(set(User.objects.values_list("username", flat=True))), 4)
+        self.assertFalse(any("ROW_NUMBER" in query["sql"] for query in queries))
+        self.assertNotIn(rank_table, connection.introspection.table_names())
+
+    def test_unique_faker_scrub_again(self):
+        for i in range(5):
+            User.objects.create(username=f"user{i}")
+        with self.settings(SCRUBBER_RANDOM_SEED=42):
+            usernames = self._scrub_unique()
+
+            # rows not updated yet hold values assigned to earlier rows
+            User.objects.filter(username=usernames[0]).update(username="first")
+            User.objects.filter(username=usernames[-1]).update(username=usernames[0])
+            self.assertEqual(self._scrub_unique(), usernames)
+            self.assertEqual(self._scrub_unique("--batch-size", "2"), usernames)
+        self.assertEqual(User.objects.filter(username__startswith="~~").count(), 0)
+
+    def test_unique_faker_max_length(self):
+        with self.settings(SCRUBBER_ENTRIES_PER_PROVIDER=20):
+            lookup = scrubbers.UniqueFaker("user_name")(DataToBeScrubbed._meta.get_field("first_name"))
+
+        contents = list(FakeData.objects.filter(provider__key=lookup.provider_key).values_list("content", flat=True))
+        self.assertEqual(len(contents), 20)
+        # distinct within the field's max_length
+        self.assertEqual(len(set(contents)), 20)
+        max_length = DataToBeScrubbed._meta.get_field("first_name").max_length
+        self.assertTrue(all(len(content) <= max_length for content in contents))
+
+    @skipUnless(connection.vendor == "postgresql", "PostgreSQL only")
+    def test_unique_faker_suffix_too_long(self):
+        for _ in range(4):
+            DataFactory.create(first_name="Foo")
+
+        # suffixed values are refused rather than cut off
+        with (
+            self.settings(
+                DEBUG=True,
+                SCRUBBER_ENTRIES_PER_PROVIDER=3,
+                SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.UniqueFaker("pystr", min_chars=8, max_chars=8)},
+            ),
+            self.assertRaisesMessage(CommandError, "DataError while scrubbing"),
+        ):
+            call_command("scrub_data", "--model", "example.DataToBeScrubbed", stdout=StringIO())
+
+    def test_unique_faker_incremental(self):
+        User.objects.create(username="user")
+
+        with self.assertRaisesMessage(CommandError, "auth.User can't be scrubbed incrementally, as UniqueFaker"):
+            self._scrub_unique("--incremental")
+
+    def test_unique_faker_pool_too_small(self):
+        with self.settings(SCRUBBER_ENTRIES_PER_PROVIDER=3), self.assertRaises(ScrubberInitError):
+            scrubbers.UniqueFaker("boolean")(User._meta.get_field("username"))
+
+    def test_unique_faker_distinct_pool(self):
+        with self.settings(SCRUBBER_ENTRIES_PER_PROVIDER=100):
+            scrubbers.UniqueFaker("random_int", max=150)(User._meta.get_field("username"))
+
+        pool = FakeData.objects.filter(provider__key__contains=" - unique ")
+        contents = list(pool.values_list("content", flat=True))
+        self.assertEqual(len(contents), 100)
+        self.assertEqual(len(set(contents)), 100)
+
+    def _scrub_in_python(self, **settings):
+        with self.settings(
+            DEBUG=True,
+            SCRUBBER_PYTHON_CHUNK_SIZE=2,
+            SCRUBBER_GLOBAL_SCRUBBERS={
+                "first_name": scrubbers.Empty,
+                "description": scrubbers.PythonScrubber(redact_emails, fields=("first_name",)),
+            },
+            **settings,
+        ):
+            call_command("scrub_data", "--model", "example.DataToBeScrubbed", stdout=StringIO())
+        return list(DataToBeScrubbed.objects.order_by("pk").values_list("first_name", "description"))
+
+    def test_python_scrubber(self):
+        for description in ("Mail foo@bar.com", "Nothing to see", None, "a@b.c or d@e.f", ""):
+            DataFactory.create(first_name="Foo", description=description)
+
+        with CaptureQueriesContext(connection) as queries:
+            scrubbed = self._scrub_in_python()
+        update_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("UPDATE") and DataToBeScrubbed._meta.db_table in query["sql"]
+        ]
+
+        # other fields are scrubbed before
+        self.assertEqual(
+            scrubbed,
+            [
+                ("", "Mail @example.com"),
+                ("", "Nothing to see"),
+                ("", None),
+                ("", "@example.com or @example.com"),
+                ("", ""),
+            ],
+        )
+        # the SQL-based scrubbers, then only the chunks holding changed rows
+        self.assertEqual(len(update_queries), 3)
+        # every chunk is read by a query of its own, the last one finding no rows left
+        chunk_queries = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT") and "LIMIT 2" in query["sql"] and "description" in query["sql"]
+        ]
+        self.assertEqual(len(chunk_queries), 4)
+
+    def test_python_scrubber_processes(self):
+        for i in range(5):
+            DataFactory.create(first_name="Foo", description=f"user{i}@example.org")
+
+        scrubbed = self._scrub_in_python(SCRUBBER_PYTHON_PROCESSES=2)
+
+        self.assertEqual(scrubbed, [("", "@example.com")] * 5)
+
+    def test_python_scrubber_processes_unpicklable(self):
+        DataFactory.create(description="foo@example.org")
+
+        with (
+            self.settings(
+                DEBUG=True,
+                SCRUBBER_PYTHON_PROCESSES=2,
+                SCRUBBER_GLOBAL_SCRUBBERS={"description": scrubbers.PythonScrubber(lambda value: value)},
+            ),
+            self.assertRaisesMessage(CommandError, "example.DataToBeScrubbed.description can't be passed"),
+        ):
+            call_command("scrub_data", "--model", "example.DataToBeScrubbed", stdout=StringIO())
+        self.assertTrue(DataToBeScrubbed.objects.filter(description="foo@example.org").exists())
+
+    def test_python_scrubber_update_rows(self):
+        data = [DataFactory.create(first_name="Foo", company="Foo") for _ in range(3)]
+        fields = [DataToBeScrubbed._meta.get_field("first_name"), DataToBeScrubbed._meta.get_field("company")]
+
+        rows = sql.update_rows(
+            DataToBeScrubbed,
+            fields,
+            [(data[0].pk, ("Bar", "Baz")), (data[2].pk, ("", "Qux"))],
+            "default",
+        )
+
+        self.assertEqual(rows, 2)
+        self.assertEqual(
+            list(DataToBeScrubbed.objects.order_by("pk").values_list("first_name", "company")),
+            [("Bar", "Baz"), ("Foo", "Foo"), ("", "Qux")],
+        )
+
+    def test_faker_unknown_strategy(self):
+        with self.settings(SCRUBBER_FAKER_UPDATE_STRATEGY="foo"), self.assertRaises(ScrubberInitError):
+            scrubbers.Faker("company")(DataToBeScrubbed._meta.get_field("company"))
+
     @mock.patch("django_scrubber.scrubbers.logger")
     def test_faker_scrubber_exceeding_character_limit(self, mock_logging: mock.Mock):
         """
@@ -200,16 +647,20 @@ class TestScrubbers(TestCase):
         Ensure that scrubbing does not delete stored faker data unless explicitly requested.
         """
         # Create faker data object
-        FakeData.objects.create(provider="company", content="Foo", provider_offset=1)
+        FakeData.objects.create(
+            provider=FakeDataProvider.objects.create(key="company", fingerprint=""),
+            content="Foo",
+            provider_offset=1,
+        )
 
         # Sanity check
-        self.assertTrue(FakeData.objects.filter(provider="company", content="Foo").exists())
+        self.assertTrue(FakeData.objects.filter(provider__key="company", content="Foo").exists())
 
         # Call command
         call_command("scrub_data", stdout=StringIO())
 
         # Assertion that faker data still exists
-        self.assertTrue(FakeData.objects.filter(provider="company", content="Foo").exists())
+        self.assertTrue(FakeData.objects.filter(provider__key="company", content="Foo").exists())
 
     @override_settings(DEBUG=True)
     def test_faker_scrubber_run_clear_faker_data_works(self):
@@ -217,16 +668,21 @@ class TestScrubbers(TestCase):
         Ensures that fake data is cleared when requested
         """
         # Create faker data object
-        FakeData.objects.create(provider="company", content="Foo", provider_offset=1)
+        FakeData.objects.create(
+            provider=FakeDataProvider.objects.create(key="company", fingerprint=""),
+            content="Foo",
+            provider_offset=1,
+        )
 
         # Sanity check
-        self.assertTrue(FakeData.objects.filter(provider="company", content="Foo").exists())
+        self.assertTrue(FakeData.objects.filter(provider__key="company", content="Foo").exists())
 
         # Call command
         call_command("scrub_data", remove_fake_data=True, stdout=StringIO())
 
         # Assertion that the faker data was removed
-        self.assertFalse(FakeData.objects.filter(provider="company", content="Foo").exists())
+        self.assertFalse(FakeData.objects.filter(provider__key="company", content="Foo").exists())
+        self.assertFalse(FakeDataProvider.objects.exists())
 
     @skipUnless(connection.vendor == "postgresql", "ArrayField requires PostgreSQL")
     def test_faker_array_scrubber(self):
@@ -241,6 +697,46 @@ class TestScrubbers(TestCase):
             self.assertIsInstance(item, str)
             self.assertTrue(len(item) > 0)
 
+    @skipUnless(connection.vendor == "postgresql", "ArrayField requires PostgreSQL")
+    def test_faker_array_scrubber_per_row(self):
+        for _ in range(4):
+            DataFactory.create(tags=["old"])
+
+        def scrub():
+            with (
+                self.settings(
+                    DEBUG=True,
+                    SCRUBBER_ENTRIES_PER_PROVIDER=10,
+                    SCRUBBER_GLOBAL_SCRUBBERS={"tags": scrubbers.FakerArray("city", count=3)},
+                ),
+                CaptureQueriesContext(connection) as queries,
+            ):
+                call_command("scrub_data", "--model", "example.DataToBeScrubbed", stdout=StringIO())
+            update_queries = [
+                query for query in queries if query["sql"].startswith(f'UPDATE "{DataToBeScrubbed._meta.db_table}"')
+            ]
+            self.assertEqual(len(update_queries), 1)
+            return list(DataToBeScrubbed.objects.order_by("pk").values_list("tags", flat=True))
+
+        tags = scrub()
+        self.assertEqual(len({tuple(row_tags) for row_tags in tags}), 4)
+        for row_tags in tags:
+            self.assertEqual(len(row_tags), 3)
+        # drawn from the stored data of the provider
+        self.assertLessEqual(
+            {tag for row_tags in tags for tag in row_tags},
+            set(FakeData.objects.filter(provider__key__startswith="city").values_list("content", flat=True)),
+        )
+
+        # reproducible
+        DataToBeScrubbed.objects.update(tags=["old"])
+        self.assertEqual(scrub(), tags)
+
+    def test_faker_array_scrubber_count_exceeding_entries(self):
+        field = mock.Mock(base_field=DataToBeScrubbed._meta.get_field("first_name"))
+        with self.settings(SCRUBBER_ENTRIES_PER_PROVIDER=2), self.assertRaises(ScrubberInitError):
+            scrubbers.FakerArray("city", count=3)(field)
+
     @skipUnless(connection.vendor == "postgresql", "ArrayField requires PostgreSQL")
     def test_faker_array_scrubber_infers_provider(self):
         data = DataFactory.create(tags=["old1", "old2"])
@@ -296,3 +792,41 @@ class TestScrubbers(TestCase):
 
         self.assertNotEqual(data.description, "bla")
         self.assertEqual(data.description[:11], "Lorem ipsum")
+
+    def test_exclude_unchanged_rows_ifnotempty(self):
+        for description in (None, "", "bla"):
+            DataFactory.create(description=description)
+        field = DataToBeScrubbed._meta.get_field("description")
+
+        queryset, values = sql.exclude_unchanged_rows(
+            DataToBeScrubbed.objects.all(),
+            {"description": scrubbers.IfNotEmpty(scrubbers.Lorem)(field)},
+        )
+
+        self.assertEqual(list(queryset.values_list("description", flat=True)), ["bla"])
+        self.assertIsInstance(values["description"].expression, scrubbers.Lorem)
+        self.assertEqual(sql.update(queryset, values), 1)
+
+    def test_exclude_unchanged_rows_empty_and_null(self):
+        DataFactory.create(first_name="", date_past=None)
+        DataFactory.create(first_name="Foo", date_past=None)
+        DataFactory.create(first_name="", date_past=timezone.localtime().date())
+        values = {
+            "first_name": scrubbers.Empty(DataToBeScrubbed._meta.get_field("first_name")),
+            "date_past": scrubbers.Null(DataToBeScrubbed._meta.get_field("date_past")),
+        }
+
+        queryset, realized_values = sql.exclude_unchanged_rows(DataToBeScrubbed.objects.all(), values)
+
+        self.assertEqual(queryset.count(), 2)
+        self.assertEqual(realized_values, values)
+
+    def test_exclude_unchanged_rows_unconditional(self):
+        DataFactory.create(description="")
+        field = DataToBeScrubbed._meta.get_field("description")
+        values = {"description": scrubbers.IfNotEmpty(scrubbers.Lorem)(field), "first_name": scrubbers.Lorem("x")}
+
+        queryset, realized_values = sql.exclude_unchanged_rows(DataToBeScrubbed.objects.all(), values)
+
+        self.assertEqual(queryset.count(), 1)
+        self.assertIs(realized_values, values)
@@ -0,0 +1,104 @@
+import json
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from django_scrubber import scrubbers, signals
+from django_scrubber.tracing import Tracer
+
+User = get_user_model()
+
+
+class TestTracing(TestCase):
+    def setUp(self):
+        # fake data initialized by other tests has been rolled back
+        scrubbers.Faker.INITIALIZED_PROVIDERS.clear()
+        User.objects.create(username="foo", first_name="Foo")
+
+    def _scrub(self, *args):
+        with self.settings(DEBUG=True, SCRUBBER_GLOBAL_SCRUBBERS={"first_name": scrubbers.Faker("first_name")}):
+            call_command("scrub_data", "--model", "auth.User", *args, stdout=StringIO())
+
+    def test_signals(self):
+        received = []
+
+        def receiver(signal, sender, **kwargs):
+            received.append((signal, sender))
+
+        all_signals = (
+            signals.scrub_started,
+            signals.scrub_finished,
+            signals.model_scrub_started,
+            signals.model_scrub_finished,
+            signals.faker_provider_started,
+            signals.faker_provider_finished,
+            signals.statement_executed,
+        )
+        for signal in all_signals:
+            signal.connect(receiver)
+        try:
+            self._scrub()
+        finally:
+            for signal in all_signals:
+                signal.disconnect(receiver)
+
+        received_signals = [signal for signal, _ in received]
+        self.assertEqual(received_signals[0], signals.scrub_started)
+        self.assertEqual(received_signals[-1], signals.scrub_finished)
+        self.assertLess(
+            received_signals.index(signals.faker_provider_finished),
+            received_signals.index(signals.model_scrub_started),
+        )
+        self.assertIn((signals.statement_executed, User), received)
+        self.assertIn((signals.model_scrub_finished, User), received)
+
+    def test_model_scrub_finished_on_failure(self):
+        finished = []
+
+        def receiver(sender, **kwargs):
+            finished.append(kwargs)
+
+        signals.model_scrub_finished.connect(receiver)
+        try:
+            with (
+                mock.patch("django_scrubber.sql.update", side_effect=CommandError("boom")),
+                self.assertRaisesMessage(CommandError, "boom"),
+            ):
+                self._scrub()
+        finally:
+            signals.model_scrub_finished.disconnect(receiver)
+
+        self.assertEqual(len(finished), 1)
+        self.assertIsNone(finished[0]["rows"])
+        self.assertEqual(str(finished[0]["error"]), "boom")
+
+    def test_tracer(self):
+        with TemporaryDirectory() as directory:
+            trace_path = Path(directory) / "trace.json"
+            textfile_path = Path(directory) / "scrubber.prom"
+            self._scrub("--trace", str(trace_path), "--prometheus-textfile", str(textfile_path))
+            trace = json.loads(trace_path.read_text())
+            textfile = textfile_path.read_text()
+
+        categories = {event["cat"] for event in trace["traceEvents"]}
+        self.assertEqual(categories, {"run", "model", "statement", "faker"})
+        model_span = next(event for event in trace["traceEvents"] if event["cat"] == "model")
+        self.assertEqual(model_span["name"], "auth.User")
+        self.assertEqual(model_span["args"]["rows"], 1)
+
+        self.assertIn("# TYPE django_scrubber_rows_total counter", textfile)
+        self.assertIn('django_scrubber_rows_total{model="auth.User"} 1.0', textfile)
+        self.assertIn("django_scrubber_run_success 1.0", textfile)
+
+    def test_tracer_disconnects(self):
+        with Tracer() as tracer:
+            pass
+        self._scrub()
+
+        self.assertEqual(tracer.events, [])
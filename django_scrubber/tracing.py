@@ -0,0 +1,135 @@
+"""
+Built-in receiver of the scrubbing signals, recording spans and counters of a run.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import ClassVar
+
+from . import signals
+
+
+class Tracer:
+    """
+    Records runs, models (or shards of them), statements and Faker providers as spans while connected, i.e. within a
+    `with` block. Spans are written in the Trace Event Format understood by chrome://tracing and Perfetto, where they
+    nest by time on the thread they happened on.
+
+    Also aggregates counters, which are written as a Prometheus textfile, e.g. for node_exporter's textfile collector.
+    """
+
+    METRICS: ClassVar[dict[str, tuple[str, str]]] = {
+        "django_scrubber_rows_total": ("counter", "Rows scrubbed."),
+        "django_scrubber_statements_total": ("counter", "Statements run while scrubbing."),
+        "django_scrubber_model_duration_seconds_total": ("counter", "Time spent scrubbing."),
+        "django_scrubber_statement_duration_seconds_total": ("counter", "Time spent running statements."),
+        "django_scrubber_model_failures_total": ("counter", "Failed attempts to scrub a model or a shard of it."),
+        "django_scrubber_faker_provider_duration_seconds_total": ("counter", "Time spent initializing Faker data."),
+        "django_scrubber_run_duration_seconds": ("gauge", "Duration of the last run."),
+        "django_scrubber_run_success": ("gauge", "Whether the last run succeeded."),
+        "django_scrubber_last_run_timestamp_seconds": ("gauge", "Unix time the last run finished at."),
+    }
+
+    def __init__(self):
+        self.events = []
+        # values by metric and labels
+        self.metrics = defaultdict(lambda: defaultdict(float))
+        self._origin = time.monotonic()
+        self._lock = threading.Lock()
+        self._receivers = (
+            (signals.scrub_finished, self._on_scrub_finished),
+            (signals.model_scrub_finished, self._on_model_scrub_finished),
+            (signals.faker_provider_finished, self._on_faker_provider_finished),
+            (signals.statement_executed, self._on_statement_executed),
+        )
+
+    def __enter__(self):
+        for signal, receiver in self._receivers:
+            signal.connect(receiver, weak=False)
+        return self
+
+    def __exit__(self, *exc_info):
+        for signal, receiver in self._receivers:
+            signal.disconnect(receiver)
+
+    def _add_span(self, name, category, duration, args):
+        # signals are sent once done, so spans are recorded backwards from now
+        end = time.monotonic()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (end - duration - self._origin) * 1_000_000,
+            "dur": duration * 1_000_000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def _increment(self, metric, value, **labels):
+        with self._lock:
+            self.metrics[metric][tuple(sorted(labels.items()))] += value
+
+    def _on_scrub_finished(self, sender, duration, error, **kwargs):
+        self._add_span("scrub_data", "run", duration, {"error": str(error) if error else None})
+        with self._lock:
+            self.metrics["django_scrubber_run_duration_seconds"][()] = duration
+            self.metrics["django_scrubber_run_success"][()] = 0 if error else 1
+            self.metrics["django_scrubber_last_run_timestamp_seconds"][()] = time.time()
+
+    def _on_model_scrub_finished(self, sender, pk_range, rows, duration, statements, error, **kwargs):
+        model = sender._meta.label
+        self._add_span(
+            model,
+            "model",
+            duration,
+            {
+                "pk_range": [str(bound) if bound is not None else None for bound in pk_range],
+                "rows": rows,
+                "statements": statements,
+                "error": str(error) if error else None,
+            },
+        )
+        self._increment("django_scrubber_rows_total", rows or 0, model=model)
+        self._increment("django_scrubber_statements_total", statements, model=model)
+        self._increment("django_scrubber_model_duration_seconds_total", duration, model=model)
+        if error:
+            self._increment("django_scrubber_model_failures_total", 1, model=model)
+
+    def _on_faker_provider_finished(self, sender, provider_key, duration, reused, **kwargs):
+        self._add_span(provider_key, "faker", duration, {"reused": reused})
+        self._increment("django_scrubber_faker_provider_duration_seconds_total", duration, provider=provider_key)
+
+    def _on_statement_executed(self, sender, sql, many, duration, **kwargs):
+        self._add_span(sql.split(None, 1)[0] if sql else "", "statement", duration, {"sql": sql, "many": many})
+        self._increment("django_scrubber_statement_duration_seconds_total", duration, model=sender._meta.label)
+
+    def write_trace(self, path):
+        Path(path).write_text(json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms"}))
+
+    def write_prometheus_textfile(self, path):
+        lines = []
+        for metric, (metric_type, description) in self.METRICS.items():
+            if metric not in self.metrics:
+                continue
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {metric_type}"]
+            for labels, value in sorted(self.metrics[metric].items()):
+                label_values = ",".join(f'{name}="{_escape_label_value(label)}"' for name, label in labels)
+                sample = f"{metric}{{{label_values}}}" if labels else metric
+                lines.append(f"{sample} {float(value)!r}")
+
+        # collectors may read the file at any time, so replace it at once
+        path = Path(path)
+        temporary_path = path.with_name(f".{path.name}.tmp")
+        temporary_path.write_text("\n".join(lines) + "\n")
+        temporary_path.replace(path)
+
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
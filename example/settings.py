@@ -64,6 +64,12 @@ if os.environ.get("GITHUB_WORKFLOW", None):
             },
         }
 
+# a second database, to test scrubbing several ones
+DATABASES["other"] = {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": ":memory:",
+}
+
 INSTALLED_APPS = [
     "django.contrib.auth",
     "django.contrib.contenttypes",